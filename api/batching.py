@@ -0,0 +1,192 @@
+"""
+Micro-batching of concurrent requests to a slow backend
+
+Callers ``submit`` one item and await its result. Items are collected until
+``max_batch_size`` are pending or the oldest has waited ``max_wait``
+seconds. The whole batch is then handed to a dispatch coroutine, which
+returns one result (or exception) per item, and the results are routed
+back to the waiting callers. Batches are dispatched without waiting for
+earlier ones to finish, up to ``max_in_flight`` items at a time; a batch
+that would exceed it is held until enough earlier items complete, and new
+submissions keep queueing for the next batch meanwhile. Identical items
+within a batch are sent once.
+
+Whether batching saves work depends on the dispatch coroutine. When the
+backend takes a whole batch in one call (e.g. one iNaturalist request for
+many ids) the per-call cost is amortized. When dispatch just runs one
+independent call per item concurrently (LLaVA predictions on Replicate)
+nothing is amortized: batching then only shapes concurrency -- bounding
+calls in flight and deduplicating identical items -- and each item pays up
+to ``max_wait`` of extra latency.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T", bound=Hashable)
+R = TypeVar("R")
+
+# Latency samples kept for the percentile metrics
+METRIC_SAMPLES = 1000
+
+
+def percentile(samples: List[float], fraction: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Collects submitted items into batches for one dispatch call
+
+    Args:
+        dispatch: Coroutine taking a list of distinct items and returning a
+            list of results (or exception instances) in the same order
+        max_batch_size: Most items dispatched together
+        max_wait: Longest time (seconds) the first item of a batch waits
+            for others to join
+        max_in_flight: Most items dispatched and not yet finished across
+            all batches (None for no limit); also caps the batch size
+        name: Label used in log messages and metrics
+    """
+
+    def __init__(
+        self,
+        dispatch: Callable[[List[T]], Awaitable[List[Any]]],
+        max_batch_size: int = 8,
+        max_wait: float = 0.05,
+        max_in_flight: Optional[int] = None,
+        name: str = "batch",
+    ):
+        self.dispatch = dispatch
+        self.max_in_flight = None if max_in_flight is None else max(1, max_in_flight)
+        self.max_batch_size = max(1, min(max_batch_size, self.max_in_flight or max_batch_size))
+        self.max_wait = max_wait
+        self.name = name
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._in_flight: set = set()
+        self._capacity: Optional[asyncio.Condition] = None
+        self._in_flight_items = 0
+        self._peak_in_flight_items = 0
+
+        self._started: Optional[float] = None
+        self._batches = 0
+        self._items = 0
+        self._unique_items = 0
+        self._failures = 0
+        self._batch_sizes: Deque[int] = deque(maxlen=METRIC_SAMPLES)
+        self._queue_waits: Deque[float] = deque(maxlen=METRIC_SAMPLES)
+        self._dispatch_times: Deque[float] = deque(maxlen=METRIC_SAMPLES)
+
+    async def submit(self, item: T) -> R:
+        """Queue an item and wait for its result (exceptions are re-raised)"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._capacity = asyncio.Condition()
+            self._worker = asyncio.create_task(self._collect())
+        if self._started is None:
+            self._started = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            if self.max_in_flight is not None:
+                async with self._capacity:
+                    await self._capacity.wait_for(
+                        lambda: self._in_flight_items + len(batch) <= self.max_in_flight
+                    )
+            self._in_flight_items += len(batch)
+            self._peak_in_flight_items = max(self._peak_in_flight_items, self._in_flight_items)
+            task = asyncio.create_task(self._run(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _run(self, batch: List[Tuple[T, asyncio.Future, float]]) -> None:
+        dispatched = time.perf_counter()
+        waiters: Dict[T, List[asyncio.Future]] = {}
+        for item, future, enqueued in batch:
+            waiters.setdefault(item, []).append(future)
+            self._queue_waits.append(dispatched - enqueued)
+        items = list(waiters)
+
+        try:
+            results = await self.dispatch(items)
+            if len(results) != len(items):
+                raise RuntimeError(f"{self.name} dispatch returned {len(results)} results for {len(items)} items")
+        except Exception as e:
+            results = [e] * len(items)
+        finally:
+            self._in_flight_items -= len(batch)
+            async with self._capacity:
+                self._capacity.notify_all()
+
+        self._batches += 1
+        self._items += len(batch)
+        self._unique_items += len(items)
+        self._batch_sizes.append(len(batch))
+        self._dispatch_times.append(time.perf_counter() - dispatched)
+        for item, result in zip(items, results):
+            for future in waiters[item]:
+                if future.done():  # the caller went away
+                    continue
+                if isinstance(result, BaseException):
+                    self._failures += 1
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Throughput, batch sizes and added latency since the first submission"""
+        elapsed = time.perf_counter() - self._started if self._started is not None else 0.0
+        waits = list(self._queue_waits)
+        dispatch_times = list(self._dispatch_times)
+
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            "name": self.name,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": ms(self.max_wait),
+            "batches": self._batches,
+            "items": self._items,
+            "deduplicated_items": self._items - self._unique_items,
+            "failures": self._failures,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "in_flight_batches": len(self._in_flight),
+            "max_in_flight": self.max_in_flight,
+            "in_flight_items": self._in_flight_items,
+            "peak_in_flight_items": self._peak_in_flight_items,
+            "mean_batch_size": round(sum(self._batch_sizes) / len(self._batch_sizes), 2) if self._batch_sizes else None,
+            "throughput_per_second": round(self._items / elapsed, 3) if elapsed > 0 else None,
+            # Time spent waiting for a batch to fill, on top of inference
+            "added_latency_ms": {"p50": ms(percentile(waits, 0.5)), "p95": ms(percentile(waits, 0.95)),
+                                 "max": ms(max(waits) if waits else None)},
+            "dispatch_ms": {"p50": ms(percentile(dispatch_times, 0.5)), "p95": ms(percentile(dispatch_times, 0.95))},
+        }
+
+    async def close(self) -> None:
+        """Stop collecting and wait for dispatched batches to finish"""
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
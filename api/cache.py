@@ -0,0 +1,247 @@
+"""
+Response cache backends
+
+``MemoryLRUCache`` keeps entries in the worker process and suits a single
+uvicorn worker. ``SQLiteCache`` keeps them in a WAL-mode SQLite file so all
+workers on one host share a warm cache instead of each repeating the same
+upstream calls. Both implement ``CacheBackend`` and store JSON-compatible
+values with a per-entry TTL and a size bound.
+
+Endpoints use the async ``aget``/``aset``, which run the SQLite backend in
+a worker thread so a slow disk or another worker's write lock never
+stalls the event loop.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+DEFAULT_TTL = float(os.getenv("CACHE_TTL_SECONDS", "300"))
+DEFAULT_DB_PATH = os.path.join(tempfile.gettempdir(), "nw-plants-cache.sqlite3")
+
+# A hit refreshes an entry's LRU timestamp only when it is older than this,
+# so reads almost never need the SQLite write lock (seconds)
+ACCESS_UPDATE_INTERVAL = 60.0
+
+# How long a cache write waits for another worker's write lock before it is
+# dropped (seconds); short, so a contended write does not tie up a thread
+WRITE_TIMEOUT = 0.25
+
+
+def cache_key(prefix: str, **params: Any) -> str:
+    """
+    Build a stable cache key from a prefix and query parameters
+
+    Example:
+        cache_key("plants", region="oregon", per_page=50)
+    """
+    encoded = json.dumps(params, sort_keys=True, default=str, separators=(",", ":"))
+    digest = hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+    return f"{prefix}:{digest}"
+
+
+class CacheBackend:
+    """Interface shared by all cache backends"""
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired"""
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a JSON-compatible value for ``ttl`` seconds"""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        """Remove a single entry"""
+        raise NotImplementedError
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """``get`` for use on the event loop"""
+        return self.get(key)
+
+    async def aset(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """``set`` for use on the event loop"""
+        self.set(key, value, ttl)
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        raise NotImplementedError
+
+
+class MemoryLRUCache(CacheBackend):
+    """In-process LRU cache bounded by entry count"""
+
+    def __init__(self, max_entries: int = 1024, default_ttl: float = DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires = time.time() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Cache shared by every worker process on the host
+
+    Entries live in a WAL-mode SQLite database, so readers never block the
+    writer and each set is a single atomic transaction. Reads do not write:
+    the ``accessed`` timestamp used for LRU eviction is refreshed at most
+    once per ACCESS_UPDATE_INTERVAL, and expired rows are removed by the
+    next set. When the stored payload exceeds ``max_bytes`` the least
+    recently used entries are evicted.
+
+    The cache is an optimization, so database errors (e.g. "database is
+    locked" under heavy contention) are logged and treated as a miss or a
+    skipped write rather than failing the request.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_DB_PATH,
+        max_bytes: int = 64 * 1024 * 1024,
+        default_ttl: float = DEFAULT_TTL,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=WRITE_TIMEOUT, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires REAL NOT NULL,
+                accessed REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value, expires, accessed FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                value, expires, accessed = row
+                if expires < now:
+                    return None
+                if now - accessed > ACCESS_UPDATE_INTERVAL:
+                    self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            print(f"Cache read failed ({e}), treating as a miss")
+            return None
+        return json.loads(value)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        payload = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        if len(payload) > self.max_bytes:
+            return
+        now = time.time()
+        expires = now + (self.default_ttl if ttl is None else ttl)
+        try:
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO entries (key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+                        (key, payload, len(payload), expires, now),
+                    )
+                    self._evict(now)
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error as e:
+            print(f"Cache write skipped ({e})")
+
+    async def aget(self, key: str) -> Optional[Any]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        await asyncio.to_thread(self.set, key, value, ttl)
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM entries WHERE expires < ?", (now,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        stale = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            stale.append((key,))
+            freed += size
+            if total - freed <= self.max_bytes:
+                break
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+
+
+def create_cache() -> CacheBackend:
+    """
+    Build the cache backend selected by the environment
+
+    CACHE_BACKEND picks "memory" or "sqlite"; when unset, the shared SQLite
+    backend is used as soon as uvicorn runs more than one worker.
+    """
+    backend = os.getenv("CACHE_BACKEND")
+    if backend is None:
+        workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+        backend = "sqlite" if workers > 1 else "memory"
+
+    if backend == "sqlite":
+        return SQLiteCache(
+            path=os.getenv("CACHE_DB", DEFAULT_DB_PATH),
+            max_bytes=int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+        )
+    if backend == "memory":
+        return MemoryLRUCache(max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "1024")))
+    raise ValueError(f"Unknown CACHE_BACKEND: {backend}")
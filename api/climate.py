@@ -0,0 +1,78 @@
+"""
+Climate zone classification for Pacific Northwest coordinates
+"""
+
+import numpy as np
+
+# Zone names in code order (the code is the index, used by columnar storage)
+CLIMATE_ZONES = (
+    "East Cascades (Dry/Rain Shadow)",
+    "Puget Sound Lowlands",
+    "Coastal",
+    "West Cascades (Wet)",
+)
+
+# climate_type query values mapped to the zone name they match
+CLIMATE_FILTERS = {
+    "coastal": "Coastal",
+    "cascade-west": "West Cascades",
+    "cascade-east": "East Cascades",
+    "puget-sound": "Puget Sound"
+}
+
+
+def determine_climate_zone(lon: float, lat: float) -> str:
+    """
+    Classify climate zone based on Cascade Range position and latitude
+    
+    Args:
+        lon: Longitude coordinate
+        lat: Latitude coordinate
+        
+    Returns:
+        Climate zone classification string
+    """
+    # East of Cascade Range (rain shadow)
+    if lon > -121.0:
+        return "East Cascades (Dry/Rain Shadow)"
+    
+    # West of Cascades - further classification
+    # Puget Sound lowlands
+    if lat > 47.0 and lon < -122.0:
+        return "Puget Sound Lowlands"
+    
+    # Coastal region
+    if lat < 45.0 and lon < -123.0:
+        return "Coastal"
+    
+    # Default to west Cascades
+    return "West Cascades (Wet)"
+
+
+def climate_zone_codes(lon: np.ndarray, lat: np.ndarray) -> np.ndarray:
+    """
+    Vectorized ``determine_climate_zone`` returning indices into CLIMATE_ZONES
+
+    Args:
+        lon: Longitude array
+        lat: Latitude array
+
+    Returns:
+        uint8 array of zone codes
+    """
+    codes = np.full(np.shape(lon), 3, dtype=np.uint8)
+    codes[(lat < 45.0) & (lon < -123.0)] = 2
+    codes[(lat > 47.0) & (lon < -122.0)] = 1
+    codes[lon > -121.0] = 0
+    return codes
+
+
+def matching_zone_codes(climate_type: str) -> np.ndarray:
+    """Zone codes selected by a climate_type filter value ("all" selects every zone)"""
+    if climate_type == "all":
+        return np.arange(len(CLIMATE_ZONES), dtype=np.uint8)
+    name = CLIMATE_FILTERS.get(climate_type, "")
+    return np.array(
+        [code for code, zone in enumerate(CLIMATE_ZONES) if name and name in zone],
+        dtype=np.uint8,
+    )
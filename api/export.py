@@ -0,0 +1,319 @@
+"""
+Streaming bulk exports of observations
+
+GeoJSON FeatureCollections and NumPy ``.npz`` archives are produced chunk by
+chunk, so memory use stays flat no matter how many rows are exported. Both
+are compressed on the fly with zstd or gzip, per Accept-Encoding.
+"""
+
+import json
+import os
+import zipfile
+import zlib
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from .climate import CLIMATE_ZONES
+from .compression import choose_encoding
+from .inaturalist import PLACE_IDS, inaturalist_get
+from .observations import REGIONS, ObservationTable, parse_location
+from .ratelimit import Priority, RateLimitExceeded
+
+try:
+    import zstandard
+except ImportError:  # listed in requirements.txt; gzip only without it
+    zstandard = None
+
+# Rows serialized per chunk
+CHUNK_ROWS = 5000
+
+UPSTREAM_PAGE_SIZE = 200
+
+# Upper bound on iNaturalist pages one upstream export may fetch (all
+# regions together), so a single download cannot drain the shared budget
+EXPORT_MAX_PAGES = int(os.getenv("EXPORT_MAX_PAGES", "50"))
+
+# Longest an upstream export waits for each rate limiter token (seconds)
+EXPORT_MAX_WAIT = float(os.getenv("EXPORT_MAX_WAIT_SECONDS", "10"))
+
+_FEATURES_START = b'{"type":"FeatureCollection","features":['
+_FEATURES_END = b"]}"
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick "zstd" or "gzip" from an Accept-Encoding header, honouring q-values (None for identity)"""
+    return choose_encoding(accept_encoding, ["zstd", "gzip"] if zstandard is not None else ["gzip"])
+
+
+class _Encoder:
+    """Incremental gzip/zstd compressor with a pass-through identity mode"""
+
+    def __init__(self, encoding: Optional[str]):
+        self._compressor = None
+        if encoding == "gzip":
+            self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        elif encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=3).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) if self._compressor else data
+
+    def flush(self) -> bytes:
+        return self._compressor.flush() if self._compressor else b""
+
+
+def encode_chunks(chunks: Iterable[bytes], encoding: Optional[str]) -> Iterator[bytes]:
+    """Compress a stream of byte chunks"""
+    encoder = _Encoder(encoding)
+    for chunk in chunks:
+        data = encoder.compress(chunk)
+        if data:
+            yield data
+    tail = encoder.flush()
+    if tail:
+        yield tail
+
+
+async def aencode_chunks(chunks: AsyncIterator[bytes], encoding: Optional[str]) -> AsyncIterator[bytes]:
+    """Compress an async stream of byte chunks"""
+    encoder = _Encoder(encoding)
+    async for chunk in chunks:
+        data = encoder.compress(chunk)
+        if data:
+            yield data
+    tail = encoder.flush()
+    if tail:
+        yield tail
+
+
+def _feature(obs_id: int, lat: float, lon: float, properties: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "type": "Feature",
+        "id": obs_id,
+        "geometry": {"type": "Point", "coordinates": [lon, lat]},
+        "properties": properties,
+    }
+
+
+def _join_features(features: List[Dict[str, Any]], first: bool) -> bytes:
+    body = ",".join(json.dumps(feature, separators=(",", ":")) for feature in features)
+    return (body if first else "," + body).encode("utf-8")
+
+
+def iter_geojson(table: ObservationTable, rows: np.ndarray) -> Iterator[bytes]:
+    """
+    Stream the selected rows of the local store as a GeoJSON FeatureCollection
+
+    Args:
+        table: Observation table to read from
+        rows: Indices of the rows to export
+    """
+    yield _FEATURES_START
+    for start in range(0, len(rows), CHUNK_ROWS):
+        chunk = table.filter(rows[start:start + CHUNK_ROWS])
+        features = [
+            _feature(obs.id, obs.latitude, obs.longitude, {
+                **obs.model_dump(exclude={"id", "latitude", "longitude"}),
+                "taxon_id": taxon_id,
+            })
+            for obs, taxon_id in zip(
+                chunk.to_observations(),
+                np.asarray(chunk.taxa.taxon_ids, dtype=np.int64)[chunk.column("taxon")].tolist(),
+            )
+        ]
+        yield _join_features(features, first=start == 0)
+    yield _FEATURES_END
+
+
+async def _upstream_pages(
+    params: Dict[str, Any],
+    regions: List[str],
+    store: ObservationTable,
+    max_pages: int,
+) -> AsyncIterator[Tuple[str, List[Dict[str, Any]]]]:
+    """Yield (region, observations) pages, region by region, until max_pages are fetched"""
+    pages = 0
+    for region in regions:
+        cursor = 0
+        while pages < max_pages:
+            response = await inaturalist_get(
+                "/observations",
+                params={
+                    **params,
+                    "place_id": PLACE_IDS[region],
+                    "per_page": UPSTREAM_PAGE_SIZE,
+                    "order": "asc",
+                    "order_by": "id",
+                    "id_above": cursor
+                },
+                priority=Priority.BACKGROUND,
+                max_wait=EXPORT_MAX_WAIT
+            )
+            pages += 1
+            response.raise_for_status()
+            observations = response.json().get("results", [])
+            if not observations:
+                break
+            store.append_records(observations, region=region)
+            cursor = max(obs["id"] for obs in observations)
+            yield region, observations
+            if len(observations) < UPSTREAM_PAGE_SIZE:
+                break
+
+
+def _upstream_features(region: str, observations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    features = []
+    for obs in observations:
+        coords = parse_location(obs)
+        if coords is None:
+            continue
+        taxon = obs.get("taxon") or {}
+        features.append(_feature(obs["id"], coords[0], coords[1], {
+            "scientific_name": taxon.get("name", "Unknown"),
+            "common_name": taxon.get("preferred_common_name"),
+            "taxon_id": taxon.get("id"),
+            "taxon_rank": taxon.get("rank"),
+            "observed_on": obs.get("observed_on") or "",
+            "place_guess": obs.get("place_guess") or "",
+            "quality_grade": obs.get("quality_grade") or "",
+            "region": region,
+        }))
+    return features
+
+
+async def open_geojson_upstream(
+    params: Dict[str, Any],
+    regions: List[str],
+    store: ObservationTable,
+    max_pages: int,
+) -> AsyncIterator[bytes]:
+    """
+    Start streaming observations paged from iNaturalist as a GeoJSON FeatureCollection
+
+    Pages are fetched one at a time with an ``id_above`` cursor in the
+    BACKGROUND rate limiter lane, waiting at most EXPORT_MAX_WAIT per token,
+    and added to the local store as they pass. The first page is fetched
+    before this returns, so the common failures surface as an HTTP error
+    instead of a broken download. If a later page fails, the collection is
+    closed early and marked with ``"truncated": true`` and an ``"error"``
+    member, so the document stays valid JSON.
+
+    Args:
+        params: iNaturalist query parameters (taxon, dates, ...)
+        regions: Keys of PLACE_IDS, exported in order
+        store: Observation store that receives every fetched page
+        max_pages: Pages to fetch in total, capped at EXPORT_MAX_PAGES
+
+    Raises:
+        RateLimitExceeded: If no token is available for the first page
+        httpx.HTTPError: If the first page cannot be fetched
+    """
+    pages = _upstream_pages(params, regions, store, min(max_pages, EXPORT_MAX_PAGES))
+    try:
+        first_page = await anext(pages)
+    except StopAsyncIteration:
+        first_page = None
+    return _geojson_pages(first_page, pages)
+
+
+async def _geojson_pages(
+    first_page: Optional[Tuple[str, List[Dict[str, Any]]]],
+    pages: AsyncIterator[Tuple[str, List[Dict[str, Any]]]],
+) -> AsyncIterator[bytes]:
+    yield _FEATURES_START
+    first = True
+    error = None
+    if first_page is not None:
+        features = _upstream_features(*first_page)
+        if features:
+            yield _join_features(features, first)
+            first = False
+        try:
+            async for region, observations in pages:
+                features = _upstream_features(region, observations)
+                if features:
+                    yield _join_features(features, first)
+                    first = False
+        except (RateLimitExceeded, httpx.HTTPError) as e:
+            print(f"Upstream export truncated: {e}")
+            error = str(e)
+    if error is None:
+        yield _FEATURES_END
+    else:
+        yield b"]," + json.dumps({"truncated": True, "error": error})[1:].encode("utf-8")
+
+
+class _StreamSink:
+    """Write-only, non-seekable file object that hands written bytes to a generator"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_npz(table: ObservationTable, rows: np.ndarray) -> Iterator[bytes]:
+    """
+    Stream the selected rows as a NumPy ``.npz`` archive (one .npy per column)
+
+    The zip is written with data descriptors, so it never needs to seek, and
+    each column is copied out CHUNK_ROWS rows at a time. Load with
+    ``np.load(path)``; ``climate_zone`` and ``region`` are codes into the
+    ``climate_zone_names`` and ``region_names`` arrays.
+    """
+    return (chunk for chunk in _npz_chunks(table, rows) if chunk)
+
+
+def _npz_chunks(table: ObservationTable, rows: np.ndarray) -> Iterator[bytes]:
+    taxon_ids = np.asarray(table.taxa.taxon_ids, dtype=np.int64)
+    columns = {
+        "id": ("id", None),
+        "latitude": ("latitude", None),
+        "longitude": ("longitude", None),
+        "observed_on": ("observed", None),
+        "climate_zone": ("zone", None),
+        "region": ("region", None),
+        "taxon_id": ("taxon", taxon_ids),
+    }
+    lookups = {
+        "climate_zone_names": np.array(CLIMATE_ZONES),
+        "region_names": np.array(REGIONS),
+    }
+
+    sink = _StreamSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for name, (column, decode) in columns.items():
+            source = table.column(column)
+            dtype = source.dtype if decode is None else decode.dtype
+            header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (len(rows),)}
+            with archive.open(f"{name}.npy", mode="w", force_zip64=True) as member:
+                np.lib.format.write_array_header_1_0(member, header)
+                for start in range(0, len(rows), CHUNK_ROWS):
+                    values = table.column(column)[rows[start:start + CHUNK_ROWS]]
+                    if decode is not None:
+                        values = decode[values]
+                    member.write(values.astype(dtype, copy=False).tobytes())
+                    yield sink.drain()
+            yield sink.drain()
+        for name, values in lookups.items():
+            with archive.open(f"{name}.npy", mode="w") as member:
+                np.lib.format.write_array(member, values, allow_pickle=False)
+            yield sink.drain()
+    yield sink.drain()
@@ -0,0 +1,268 @@
+"""
+Plant identification backends
+
+PlantNet (botanical specialist) is tried first, the LLaVA vision model on
+Replicate second, and mock results are returned when neither is available.
+PIL and replicate are only needed here, so main imports this module lazily
+on the first /api/identify request or from a background warmup task.
+
+LLaVA requests from concurrent uploads go through a micro-batcher. Each
+image is still its own Replicate prediction, so batching does not make a
+prediction cheaper: it shapes concurrency, keeping at most
+LLAVA_MAX_IN_FLIGHT predictions running (further uploads queue) and sending
+identical images once.
+"""
+
+import asyncio
+import base64
+import io
+import os
+import traceback
+from typing import Any, List, Optional
+
+import httpx
+import replicate
+from PIL import Image
+
+from .batching import MicroBatcher
+from .llava_parser import LlavaOutput, parse_stream, parse_text, to_matches
+from .models import PlantIdentificationMatch
+from .profiling import trace_stage
+from .recording import upstream_transport
+
+PLANTNET_URL = "https://my-api.plantnet.org/v2/identify/all"
+
+# PlantNet matches below this score fall through to the vision model
+PLANTNET_MIN_CONFIDENCE = 0.3
+
+# "replicate", or "stub" for a local stand-in that answers after
+# LLAVA_STUB_SECONDS (load tests without Replicate credentials)
+LLAVA_BACKEND = os.getenv("LLAVA_BACKEND", "replicate")
+LLAVA_STUB_SECONDS = float(os.getenv("LLAVA_STUB_SECONDS", "2.0"))
+
+LLAVA_BATCH_SIZE = int(os.getenv("LLAVA_BATCH_SIZE", "8"))
+LLAVA_BATCH_WAIT_MS = float(os.getenv("LLAVA_BATCH_WAIT_MS", "50"))
+# Most LLaVA predictions running at once across all batches
+LLAVA_MAX_IN_FLIGHT = int(os.getenv("LLAVA_MAX_IN_FLIGHT", "8"))
+
+LLAVA_MODEL = "yorickvp/llava-13b:80537f9eead1a5bfa72d5ac6ea6414379be41d4d4f6679fd776e9535d1eb58bb"
+
+LLAVA_PROMPT = """Analyze this plant photo and identify the species.
+
+Focus on:
+- Leaf shape, arrangement, and margins
+- Flower/fruit characteristics if visible
+- Growth form (tree, shrub, forb, grass)
+- Bark texture if applicable
+
+Provide:
+1. Most likely species (scientific name)
+2. Common name(s)
+3. Confidence level (0-100%)
+4. Key identifying features you observed
+5. Alternative possibilities if uncertain
+
+Only suggest species native to the Pacific Northwest (Washington, Oregon, Idaho, Northern California).
+If not a PNW native plant, indicate that clearly.
+Format as JSON with keys: species, common_name, confidence, features, alternatives, is_native"""
+
+# Returned when both backends fail (billing not active, quota exceeded, etc.)
+MOCK_RESULTS = [
+    PlantIdentificationMatch(
+        scientific_name="Pseudotsuga menziesii",
+        common_name="Douglas Fir",
+        confidence=0.85,
+        description="Tall coniferous tree with distinctive drooping cones and flat needles. Bark is thick and deeply furrowed.",
+        is_native=True,
+        taxon_id=47375
+    ),
+    PlantIdentificationMatch(
+        scientific_name="Thuja plicata",
+        common_name="Western Red Cedar",
+        confidence=0.72,
+        description="Large evergreen tree with scale-like leaves and fibrous reddish bark. Commonly found in moist forests.",
+        is_native=True,
+        taxon_id=135773
+    )
+]
+
+_client: Optional[httpx.AsyncClient] = None
+
+# Replicate client used through its async API; reads REPLICATE_API_TOKEN on first use
+replicate_client = replicate.Client(transport=upstream_transport("replicate"))
+
+STUB_RESPONSE = (
+    'The photo shows flat needles and drooping cones. '
+    '{"species": "Pseudotsuga menziesii", "common_name": "Douglas Fir", "confidence": "80%", '
+    '"features": ["Flat needles", "Three-pointed cone bracts"], '
+    '"alternatives": ["Abies grandis"], "is_native": "yes"}'
+)
+
+
+def get_client() -> httpx.AsyncClient:
+    """HTTP client for PlantNet, created on first use"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(timeout=30.0, transport=upstream_transport("plantnet"))
+    return _client
+
+
+async def close() -> None:
+    """Finish pending LLaVA batches and close the PlantNet client (application shutdown)"""
+    global _client
+    await llava_batcher.close()
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def load_image(contents: bytes) -> Image.Image:
+    """
+    Decode and verify uploaded image bytes
+
+    Raises:
+        ValueError: If the bytes are not a readable image
+    """
+    try:
+        img = Image.open(io.BytesIO(contents))
+        img.verify()  # Verify it's a valid image
+        return Image.open(io.BytesIO(contents))  # Re-open after verify
+    except Exception as e:
+        raise ValueError(str(e)) from e
+
+
+async def identify_with_plantnet(image_data: bytes, filename: str) -> List[PlantIdentificationMatch]:
+    """
+    Identify plant using PlantNet API (botanical specialist)
+    Free tier: 500 identifications/day
+    Accuracy: 85-95% for species with good photos
+    """
+    api_key = os.getenv('PLANTNET_API_KEY')
+    if not api_key or api_key == 'your_plantnet_api_key_here':
+        raise ValueError("PLANTNET_API_KEY not configured")
+
+    # Prepare multipart form data
+    files = {'images': (filename, image_data, 'image/jpeg')}
+    params = {
+        'api-key': api_key,
+        'include-related-images': 'false'
+    }
+
+    # Call PlantNet API
+    response = await get_client().post(PLANTNET_URL, params=params, files=files)
+    response.raise_for_status()
+
+    data = response.json()
+
+    # Parse results
+    results = []
+    for result in data.get('results', [])[:3]:  # Top 3 matches
+        species_info = result.get('species', {})
+        score = result.get('score', 0)
+
+        # Get common names
+        common_names = species_info.get('commonNames', [])
+        common_name = common_names[0] if common_names else species_info.get('scientificNameWithoutAuthor', 'Unknown')
+
+        # Build description from family and genus
+        family = species_info.get('family', {}).get('scientificNameWithoutAuthor', 'Unknown family')
+        genus = species_info.get('genus', {}).get('scientificNameWithoutAuthor', '')
+        description = f"Family: {family}"
+        if genus:
+            description += f"\nGenus: {genus}"
+
+        results.append(PlantIdentificationMatch(
+            scientific_name=species_info.get('scientificNameWithoutAuthor', 'Unknown'),
+            common_name=common_name,
+            confidence=score,
+            description=description,
+            is_native=True,  # TODO: Cross-reference with PNW native species list
+            taxon_id=result.get('gbif', {}).get('id', 0)
+        ))
+
+    return results
+
+
+def encode_image(img: Image.Image) -> str:
+    """JPEG data URI of an image for the Replicate API"""
+    img_byte_arr = io.BytesIO()
+    img.save(img_byte_arr, format='JPEG')
+    img_base64 = base64.b64encode(img_byte_arr.getvalue()).decode('utf-8')
+    return f"data:image/jpeg;base64,{img_base64}"
+
+
+async def _predict(data_uri: str) -> LlavaOutput:
+    if LLAVA_BACKEND == "stub":
+        await asyncio.sleep(LLAVA_STUB_SECONDS)
+        return parse_text(STUB_RESPONSE)
+    output = await replicate_client.async_run(
+        LLAVA_MODEL,
+        input={
+            "image": data_uri,
+            "prompt": LLAVA_PROMPT,
+            "max_tokens": 1024,
+            "temperature": 0.2
+        }
+    )
+    # Stops reading the token stream once the JSON answer is complete
+    return await parse_stream(output)
+
+
+async def run_llava_batch(data_uris: List[str]) -> List[Any]:
+    """Run one prediction per image concurrently; failures are returned in place"""
+    return await asyncio.gather(*(_predict(uri) for uri in data_uris), return_exceptions=True)
+
+
+llava_batcher: MicroBatcher[str, LlavaOutput] = MicroBatcher(
+    run_llava_batch,
+    max_batch_size=LLAVA_BATCH_SIZE,
+    max_wait=LLAVA_BATCH_WAIT_MS / 1000,
+    max_in_flight=LLAVA_MAX_IN_FLIGHT,
+    name="llava"
+)
+
+
+async def identify_with_llava(img: Image.Image) -> List[PlantIdentificationMatch]:
+    """
+    Identify plant using the LLaVA vision model via Replicate
+
+    Raises:
+        ValueError: If REPLICATE_API_TOKEN is not configured
+    """
+    if LLAVA_BACKEND != "stub":
+        api_token = os.getenv('REPLICATE_API_TOKEN')
+        if not api_token or api_token == 'your_replicate_api_token_here':
+            raise ValueError("REPLICATE_API_TOKEN not set or invalid")
+
+    data_uri = await asyncio.to_thread(encode_image, img)
+    output = await llava_batcher.submit(data_uri)
+    if output.error:
+        print(f"LLaVA answer not parsed ({output.error}), returning raw text")
+    return to_matches(output)
+
+
+async def identify(contents: bytes, filename: str, img: Image.Image) -> List[PlantIdentificationMatch]:
+    """
+    Identify a plant image with the best available backend
+
+    Strategy:
+    1. Try PlantNet API first (botanical specialist, 85-95% accuracy)
+    2. Fallback to LLaVA vision model if PlantNet fails
+    3. Return mock data if both fail (for development)
+    """
+    try:
+        print("Attempting PlantNet identification...")
+        with trace_stage("plantnet"):
+            results = await identify_with_plantnet(contents, filename)
+        if results and results[0].confidence > PLANTNET_MIN_CONFIDENCE:
+            print(f"PlantNet success: {results[0].scientific_name} ({results[0].confidence:.2%})")
+            return results
+    except Exception as plantnet_error:
+        print(f"PlantNet failed: {plantnet_error}, falling back to LLaVA...")
+
+    try:
+        with trace_stage("llava"):
+            return await identify_with_llava(img)
+    except Exception:
+        print(f"Vision model error (using mock data): {traceback.format_exc()}")
+        return list(MOCK_RESULTS)
@@ -0,0 +1,147 @@
+"""
+Shared iNaturalist API client
+
+All upstream iNaturalist calls go through ``inaturalist_get`` so they share
+one connection pool and one rate limit budget (iNaturalist asks clients to
+stay around 60 requests/minute).
+"""
+
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+from .profiling import trace_stage
+from .ratelimit import DEFAULT_DB_PATH, Priority, TokenBucketLimiter, parse_retry_after
+from .recording import upstream_transport
+
+INATURALIST_API_BASE = "https://api.inaturalist.org/v1"
+PLACE_IDS = {
+    "washington": 14,
+    "oregon": 41,
+    "idaho": 42,
+    "california": 43
+}
+
+# Number of times a 429 response is retried after honoring Retry-After
+MAX_THROTTLE_RETRIES = 2
+
+# Longest Retry-After we are willing to sleep through inside a request
+MAX_RETRY_AFTER = 30.0
+
+# How long each lane may queue for a token before giving up (None = forever)
+MAX_WAIT = {
+    Priority.INTERACTIVE: 10.0,
+    Priority.BACKGROUND: None,
+    Priority.PREFETCH: None,
+}
+
+limiter = TokenBucketLimiter(
+    "inaturalist",
+    rate_per_minute=float(os.getenv("INAT_RATE_LIMIT_PER_MINUTE", "60")),
+    burst=float(os.getenv("INAT_RATE_LIMIT_BURST", "10")),
+    path=os.getenv("RATE_LIMIT_DB", DEFAULT_DB_PATH),
+)
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the process-wide iNaturalist HTTP client"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=INATURALIST_API_BASE,
+            timeout=30.0,
+            transport=upstream_transport("inaturalist")
+        )
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared client (called on application shutdown)"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def _should_retry(response: httpx.Response, priority: Priority) -> bool:
+    """
+    Handle a possible 429 response; True if the request should be retried
+
+    A 429 blocks the shared bucket for the advertised Retry-After.
+    """
+    if response.status_code != 429:
+        return False
+    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+    if retry_after is None:
+        retry_after = 1.0 / limiter.rate
+    await limiter.penalize(retry_after)
+    return not (retry_after > MAX_RETRY_AFTER and priority == Priority.INTERACTIVE)
+
+
+async def inaturalist_get(
+    path: str,
+    params: Optional[Dict[str, Any]] = None,
+    priority: Priority = Priority.INTERACTIVE,
+    max_wait: Optional[float] = None,
+) -> httpx.Response:
+    """
+    GET an iNaturalist API path through the shared rate limiter
+
+    A 429 response blocks the shared bucket for the advertised Retry-After
+    and is retried a bounded number of times; the final response is returned
+    as-is so callers keep using ``raise_for_status``.
+
+    Args:
+        path: API path relative to INATURALIST_API_BASE (e.g. "/observations")
+        params: Query parameters
+        priority: Rate limiter lane for this call
+        max_wait: Longest wait for a token in seconds (defaults to the
+            lane's MAX_WAIT)
+
+    Raises:
+        RateLimitExceeded: If no token is available within the max wait
+    """
+    if max_wait is None:
+        max_wait = MAX_WAIT[priority]
+    for attempt in range(MAX_THROTTLE_RETRIES + 1):
+        with trace_stage("ratelimit_wait"):
+            await limiter.acquire(priority, max_wait=max_wait)
+        with trace_stage("inaturalist_request"):
+            response = await get_client().get(path, params=params)
+        if not await _should_retry(response, priority):
+            break
+
+    return response
+
+
+@asynccontextmanager
+async def inaturalist_stream(
+    path: str,
+    params: Optional[Dict[str, Any]] = None,
+    priority: Priority = Priority.INTERACTIVE,
+) -> AsyncIterator[httpx.Response]:
+    """
+    Streaming variant of ``inaturalist_get``
+
+    Yields the response once its headers have arrived, so the body can be
+    consumed with ``aiter_text()`` while it downloads. Error responses are
+    read in full first, so ``raise_for_status`` and ``response.text`` work
+    as usual.
+
+    Raises:
+        RateLimitExceeded: If no token is available within the lane's max wait
+    """
+    for attempt in range(MAX_THROTTLE_RETRIES + 1):
+        with trace_stage("ratelimit_wait"):
+            await limiter.acquire(priority, max_wait=MAX_WAIT[priority])
+        async with get_client().stream("GET", path, params=params) as response:
+            if response.is_error:
+                await response.aread()
+            if await _should_retry(response, priority) and attempt < MAX_THROTTLE_RETRIES:
+                continue
+            yield response
+            return
@@ -0,0 +1,249 @@
+"""
+Incremental JSON scanning
+
+Upstream responses are parsed while they download instead of after the
+whole body has arrived. The scanner walks the outer structure itself and
+hands each complete value to ``json.JSONDecoder.raw_decode``, so the
+per-character work stays in C. A value that is cut off at the end of a
+chunk is simply retried once more data has been fed.
+
+``ArrayItemScanner`` extracts the items of an array from an upstream API
+response; ``FirstObjectScanner`` finds the first JSON object in free-form
+model output.
+"""
+
+import json
+import re
+from typing import Any, List
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+_decoder = json.JSONDecoder()
+
+
+class IncompleteJSON(ValueError):
+    """Raised when a stream ends in the middle of the scanned document"""
+
+
+class ArrayItemScanner:
+    """
+    Yield the items of one array member of a top-level JSON object
+
+    ``ArrayItemScanner("results")`` fed the chunks of
+    ``{"total_results": 2, "results": [{...}, {...}]}`` returns each result
+    as soon as its closing brace has been fed; other members are skipped.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self._buffer = ""
+        self._pos = 0
+        self._state = "start"
+        self._member = None
+
+    def feed(self, text: str) -> List[Any]:
+        """Add the next chunk of text; return the items it completed"""
+        self._buffer = self._buffer[self._pos:] + text
+        self._pos = 0
+        return self._scan(final=False)
+
+    def close(self) -> List[Any]:
+        """
+        Finish the stream and return any remaining items
+
+        Raises:
+            IncompleteJSON: If the document is truncated or malformed
+        """
+        items = self._scan(final=True)
+        if self._state != "done":
+            raise IncompleteJSON(f"JSON ended unexpectedly while reading {self._state!r}")
+        return items
+
+    def _skip_whitespace(self) -> bool:
+        """Advance past whitespace; False if the buffer is exhausted"""
+        self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+        return self._pos < len(self._buffer)
+
+    def _decode(self, final: bool):
+        """Decode the value at the current position, or return None if it is incomplete"""
+        try:
+            value, end = _decoder.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError:
+            if final:
+                raise IncompleteJSON(f"Malformed or truncated JSON at offset {self._pos}")
+            return None
+        # A number at the very end of the buffer may continue in the next chunk
+        if end == len(self._buffer) and not final:
+            return None
+        self._pos = end
+        return (value,)
+
+    def _expect(self, char: str) -> None:
+        if self._buffer[self._pos] != char:
+            raise ValueError(f"Expected {char!r} at offset {self._pos}, found {self._buffer[self._pos]!r}")
+        self._pos += 1
+
+    def _scan(self, final: bool) -> List[Any]:
+        items = []
+        while self._state != "done" and self._skip_whitespace():
+            char = self._buffer[self._pos]
+            if self._state == "start":
+                self._expect("{")
+                self._state = "key"
+            elif self._state == "key":
+                if char == "}":
+                    self._pos += 1
+                    self._state = "done"
+                    continue
+                decoded = self._decode(final)
+                if decoded is None:
+                    break
+                self._member = decoded[0]
+                self._state = "colon"
+            elif self._state == "colon":
+                self._expect(":")
+                self._state = "value"
+            elif self._state == "value":
+                if self._member == self.key and char == "[":
+                    self._pos += 1
+                    self._state = "item"
+                    continue
+                if self._decode(final) is None:
+                    break
+                self._state = "next_member"
+            elif self._state == "next_member":
+                if char == "}":
+                    self._pos += 1
+                    self._state = "done"
+                    continue
+                self._expect(",")
+                self._state = "key"
+            elif self._state == "item":
+                if char == "]":
+                    self._pos += 1
+                    self._state = "next_member"
+                    continue
+                decoded = self._decode(final)
+                if decoded is None:
+                    break
+                items.append(decoded[0])
+                self._state = "next_item"
+            elif self._state == "next_item":
+                if char == "]":
+                    self._pos += 1
+                    self._state = "next_member"
+                    continue
+                self._expect(",")
+                self._state = "item"
+        return items
+
+
+# Characters that change the nesting state inside and outside strings
+_OUTSIDE_STRING = re.compile(r'[{}"]')
+_INSIDE_STRING = re.compile(r'["\\]')
+
+
+class FirstObjectScanner:
+    """
+    Find the first JSON object embedded in free text
+
+    Built for model output that wraps a JSON answer in prose or markdown
+    fences. Text is fed as it streams in; ``feed`` returns the object once
+    its closing brace arrives, so the caller can stop reading the stream.
+    Braces inside strings are ignored, and a balanced ``{...}`` span that is
+    not valid JSON (e.g. "{species}" in prose) is skipped.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self.value = None
+        self._reset(0)
+
+    def _reset(self, search_from: int) -> None:
+        self._search_from = search_from
+        self._start = -1
+        self._cursor = 0
+        self._depth = 0
+        self._in_string = False
+
+    @property
+    def text(self) -> str:
+        return self._buffer
+
+    def feed(self, text: str):
+        """Add the next chunk; return the first object once complete (else None)"""
+        if self.value is None:
+            self._buffer += text
+            self._scan(final=False)
+        return self.value
+
+    def close(self):
+        """End of stream; return the first complete object, or None if there is none"""
+        if self.value is None:
+            self._scan(final=True)
+        return self.value
+
+    def _scan(self, final: bool) -> None:
+        buffer = self._buffer
+        while self.value is None:
+            if self._start < 0:
+                start = buffer.find("{", self._search_from)
+                if start < 0:
+                    self._search_from = len(buffer)
+                    return
+                self._start = start
+                self._cursor = start
+                self._depth = 0
+                self._in_string = False
+
+            end = self._balanced_end(buffer)
+            if end < 0:
+                if not final:
+                    return
+                # Never closed: look for a later object instead
+                self._reset(self._start + 1)
+                continue
+
+            try:
+                value = json.loads(buffer[self._start:end])
+            except json.JSONDecodeError:
+                value = None
+            if isinstance(value, dict):
+                self.value = value
+                return
+            self._reset(self._start + 1)
+
+    def _balanced_end(self, buffer: str) -> int:
+        """Resume the brace count of the current candidate; index after its closing brace or -1"""
+        pos = self._cursor
+        while True:
+            if self._in_string:
+                match = _INSIDE_STRING.search(buffer, pos)
+                if match is None:
+                    self._cursor = len(buffer)
+                    return -1
+                pos = match.end()
+                if match.group() == "\\":
+                    if pos >= len(buffer):
+                        # Escape split across chunks: revisit the backslash
+                        self._cursor = pos - 1
+                        return -1
+                    pos += 1
+                else:
+                    self._in_string = False
+                continue
+            match = _OUTSIDE_STRING.search(buffer, pos)
+            if match is None:
+                self._cursor = len(buffer)
+                return -1
+            pos = match.end()
+            char = match.group()
+            if char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._cursor = pos
+                    return pos
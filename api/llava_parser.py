@@ -0,0 +1,215 @@
+"""
+Parser for LLaVA identification answers
+
+The vision model is asked for JSON but wraps it in prose or markdown
+fences, streams it token by token, and varies the field types ("90%", 90,
+0.9 or "high" for confidence; a string or a list for features). The output
+stream is scanned for the first balanced JSON object and consumption stops
+as soon as it closes. The object is then validated against a schema whose
+validators run once per field and normalize these variants. Output without
+a usable object falls back to a raw-text result.
+"""
+
+import re
+from typing import Any, AsyncIterable, Iterable, List, NamedTuple, Optional, Union
+
+from pydantic import AliasChoices, BaseModel, Field, ValidationError, field_validator
+
+from .jsonstream import FirstObjectScanner
+from .models import PlantIdentificationMatch
+
+DEFAULT_CONFIDENCE = 0.75
+
+# Alternatives are reported with a fraction of the primary confidence
+ALTERNATIVE_CONFIDENCE_FACTOR = 0.7
+MAX_ALTERNATIVES = 2
+
+# Raw-text fallback description length
+RAW_TEXT_CHARS = 500
+
+CONFIDENCE_WORDS = {
+    "very high": 0.95,
+    "high": 0.85,
+    "moderate": 0.6,
+    "medium": 0.6,
+    "low": 0.3,
+    "very low": 0.1,
+}
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+NATIVE_WORDS = {"yes", "true", "native", "y"}
+
+
+def normalize_confidence(value: Any) -> float:
+    """
+    Map a model-reported confidence to [0, 1]
+
+    Accepts fractions (0.9), percentages (90, "90%", "85.5 %") and words
+    ("high"); anything unreadable becomes DEFAULT_CONFIDENCE.
+    """
+    if isinstance(value, bool) or value is None:
+        return DEFAULT_CONFIDENCE
+    if isinstance(value, (int, float)):
+        number = float(value)
+        percent = number > 1.0
+    else:
+        text = str(value).strip().lower()
+        for word, number in sorted(CONFIDENCE_WORDS.items(), key=lambda item: -len(item[0])):
+            if text.startswith(word):
+                return number
+        match = _NUMBER.search(text)
+        if match is None:
+            return DEFAULT_CONFIDENCE
+        number = float(match.group())
+        percent = "%" in text or number > 1.0
+    if percent:
+        number /= 100
+    return min(max(number, 0.0), 1.0)
+
+
+def _as_text_list(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, (str, dict)):
+        value = [value]
+    items = []
+    for item in value:
+        if isinstance(item, dict):
+            # {"species": ..., "common_name": ...} style alternatives
+            item = item.get("species") or item.get("scientific_name") or item.get("name") or next(iter(item.values()), "")
+        text = str(item).strip()
+        if text:
+            items.append(text)
+    return items
+
+
+class LlavaAnswer(BaseModel):
+    """Schema of the JSON object the model is asked to produce"""
+
+    species: str = Field(validation_alias=AliasChoices("species", "scientific_name", "species_name"), min_length=1)
+    common_name: str = "Unknown"
+    confidence: float = DEFAULT_CONFIDENCE
+    features: List[str] = []
+    alternatives: List[str] = []
+    is_native: bool = False
+
+    @field_validator("species", mode="before")
+    @classmethod
+    def _species(cls, value: Any) -> Any:
+        return value.strip() if isinstance(value, str) else value
+
+    @field_validator("common_name", mode="before")
+    @classmethod
+    def _common_name(cls, value: Any) -> str:
+        names = _as_text_list(value)
+        return names[0] if names else "Unknown"
+
+    @field_validator("confidence", mode="before")
+    @classmethod
+    def _confidence(cls, value: Any) -> float:
+        return normalize_confidence(value)
+
+    @field_validator("features", "alternatives", mode="before")
+    @classmethod
+    def _text_list(cls, value: Any) -> List[str]:
+        return _as_text_list(value)
+
+    @field_validator("is_native", mode="before")
+    @classmethod
+    def _is_native(cls, value: Any) -> bool:
+        if isinstance(value, bool):
+            return value
+        return str(value).strip().lower() in NATIVE_WORDS
+
+
+class LlavaOutput(NamedTuple):
+    """Result of parsing one model output"""
+
+    text: str  # output consumed before the answer closed (all of it if there was none)
+    answer: Optional[LlavaAnswer]
+    error: Optional[str]
+
+
+def _finish(scanner: FirstObjectScanner) -> LlavaOutput:
+    value = scanner.close()
+    if value is None:
+        return LlavaOutput(scanner.text, None, "no JSON object in model output")
+    try:
+        return LlavaOutput(scanner.text, LlavaAnswer.model_validate(value), None)
+    except ValidationError as e:
+        return LlavaOutput(scanner.text, None, f"answer failed validation: {e.error_count()} error(s)")
+
+
+def parse_text(text: str) -> LlavaOutput:
+    """Parse a complete model output"""
+    scanner = FirstObjectScanner()
+    scanner.feed(text)
+    return _finish(scanner)
+
+
+async def parse_stream(chunks: Union[AsyncIterable[Any], Iterable[Any]]) -> LlavaOutput:
+    """
+    Parse streamed model output, consuming it only until the answer object closes
+
+    Args:
+        chunks: Output tokens as produced by Replicate (async or plain
+            iterator of strings, or one string)
+    """
+    scanner = FirstObjectScanner()
+    if isinstance(chunks, str):
+        scanner.feed(chunks)
+    elif hasattr(chunks, "__aiter__"):
+        try:
+            async for chunk in chunks:
+                if scanner.feed(str(chunk)) is not None:
+                    break
+        finally:
+            aclose = getattr(chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
+    else:
+        for chunk in chunks:
+            if scanner.feed(str(chunk)) is not None:
+                break
+    return _finish(scanner)
+
+
+def to_matches(output: LlavaOutput) -> List[PlantIdentificationMatch]:
+    """Identification matches for a parsed output (raw text if there is no valid answer)"""
+    answer = output.answer
+    if answer is None:
+        return [
+            PlantIdentificationMatch(
+                scientific_name="Vision Model Analysis",
+                common_name="Analysis Result",
+                confidence=DEFAULT_CONFIDENCE,
+                description=output.text[:RAW_TEXT_CHARS] if output.text else "No description available",
+                is_native=True,
+                taxon_id=0
+            )
+        ]
+
+    features_text = "\n".join(f"• {feature}" for feature in answer.features) or "No specific features listed"
+    results = [
+        PlantIdentificationMatch(
+            scientific_name=answer.species,
+            common_name=answer.common_name,
+            confidence=answer.confidence,
+            description=features_text,
+            is_native=answer.is_native,
+            taxon_id=0
+        )
+    ]
+    for alternative in answer.alternatives[:MAX_ALTERNATIVES]:
+        results.append(
+            PlantIdentificationMatch(
+                scientific_name=alternative,
+                common_name="Alternative match",
+                confidence=answer.confidence * ALTERNATIVE_CONFIDENCE_FACTOR,
+                description="Alternative identification possibility",
+                is_native=True,
+                taxon_id=0
+            )
+        )
+    return results
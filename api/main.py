@@ -1,29 +1,134 @@
 """
 NW Native Plant Explorer - FastAPI Backend
 Main application entry point
+
+Run from the repository root: uvicorn api.main:app (or python -m api.main)
 """
 
-from fastapi import FastAPI, Query, HTTPException, File, UploadFile
+# Imported first so startup milestones include the framework imports
+from .startup import cached_import_time_report, startup_timer
+
+from fastapi import Depends, FastAPI, Header, Query, HTTPException, File, UploadFile, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from typing import AsyncIterator, List, Literal, Optional
+from contextlib import asynccontextmanager
+import asyncio
+import hmac
+import importlib
+import json
 import httpx
+import numpy as np
 from datetime import datetime
-import io
-from PIL import Image
-import replicate
 import os
-import base64
-import requests
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+from .cache import cache_key, create_cache
+from .climate import matching_zone_codes
+from .compression import CompressionMiddleware
+from .export import (
+    EXPORT_MAX_PAGES,
+    aencode_chunks,
+    encode_chunks,
+    iter_geojson,
+    iter_npz,
+    negotiate_encoding,
+    open_geojson_upstream,
+)
+from .inaturalist import PLACE_IDS, close_client, inaturalist_get, inaturalist_stream
+from .jsonstream import ArrayItemScanner
+from .models import (
+    NearbySpeciesResult,
+    PlantIdentificationResult,
+    PhenologyHistogram,
+    PlantObservation,
+    SpeciesPage,
+    TaxonSuggestion,
+)
+from .nearby import SpatialIndex
+from .observations import REGIONS, observation_store, plant_observation
+from .phenology import MONTH_LABELS, WEEK_BINS, phenology
+from .photos import MEDIA_TYPES, PhotoNotFound, PhotoProxy, PhotoUnreadable, width_bucket
+from .profiling import (
+    MAX_PROFILE_SECONDS,
+    ProfilerBusy,
+    SlowRequestMiddleware,
+    sample_stacks,
+    slow_traces,
+    trace_stage,
+)
+from .ratelimit import RateLimitExceeded
+from .recording import close_archive
+from .sync import SYNC_ENABLED, run_sync_loop
+from .taxa import prefetch_taxa, taxon_index
+
+# Seed the taxon search index from iNaturalist at startup (PREFETCH lane)
+TAXA_PREFETCH = os.getenv("TAXA_PREFETCH", "true").lower() in ("1", "true", "yes")
+
+# Import the identification backends (PIL, replicate) in the background at
+# startup instead of on the first /api/identify request
+IDENTIFY_WARMUP = os.getenv("IDENTIFY_WARMUP", "true").lower() in ("1", "true", "yes")
+
+# Shared secret for the /api/debug/* endpoints (sent as X-Admin-Token);
+# the endpoints do not exist while it is unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+startup_timer.mark("imports")
+
+_identification = None
+
+
+async def load_identification():
+    """
+    Import api.identification on first use
+
+    The import runs in a worker thread so a cold request does not stall
+    the event loop while PIL and replicate load.
+    """
+    global _identification
+    if _identification is None:
+        module = await asyncio.to_thread(importlib.import_module, ".identification", __package__)
+        startup_timer.mark("identification_loaded")
+        _identification = module
+    return _identification
+
+
+async def warm_identification():
+    try:
+        await load_identification()
+    except Exception as e:
+        print(f"Identification warmup failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown hooks"""
+    tasks = []
+    if SYNC_ENABLED:
+        tasks.append(asyncio.create_task(run_sync_loop()))
+    if TAXA_PREFETCH:
+        tasks.append(asyncio.create_task(prefetch_taxa()))
+    if IDENTIFY_WARMUP:
+        tasks.append(asyncio.create_task(warm_identification()))
+    startup_timer.mark("app_ready")
+    yield
+    for task in tasks:
+        task.cancel()
+    await photo_proxy.close()
+    await close_client()
+    if _identification is not None:
+        await _identification.close()
+    close_archive()
+
+
 app = FastAPI(
     title="NW Native Plant Explorer API",
     description="API for discovering native plants in the Pacific Northwest using iNaturalist data",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # CORS middleware for frontend integration
@@ -35,79 +140,68 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Constants
-INATURALIST_API_BASE = "https://api.inaturalist.org/v1"
-PLACE_IDS = {
-    "washington": 14,
-    "oregon": 41,
-    "idaho": 42,
-    "california": 43
-}
-
-# Pydantic models
-class PlantObservation(BaseModel):
-    """Model for a single plant observation"""
-    id: int = Field(description="iNaturalist observation ID")
-    scientific_name: str = Field(description="Scientific name (e.g., Pseudotsuga menziesii)")
-    common_name: Optional[str] = Field(None, description="Common name (e.g., Douglas Fir)")
-    photo_url: Optional[str] = Field(None, description="URL to observation photo")
-    latitude: float = Field(description="Latitude coordinate")
-    longitude: float = Field(description="Longitude coordinate")
-    observed_on: str = Field(description="Observation date (YYYY-MM-DD)")
-    place_guess: str = Field(description="Human-readable location description")
-    climate_zone: str = Field(description="Classified climate zone based on coordinates")
-    quality_grade: str = Field(description="Observation quality: research, needs_id, or casual")
-    taxon_rank: Optional[str] = Field(None, description="Taxonomic rank: species, genus, etc.")
-
-
-class ErrorResponse(BaseModel):
-    """Error response model"""
-    detail: str
-    status_code: int
-
-
-class PlantIdentificationMatch(BaseModel):
-    """Model for a single plant identification match"""
-    scientific_name: str = Field(description="Scientific name of the plant")
-    common_name: Optional[str] = Field(None, description="Common name of the plant")
-    confidence: float = Field(description="Confidence score (0-1)")
-    description: Optional[str] = Field(None, description="Brief description")
-    is_native: bool = Field(False, description="Whether plant is native to PNW")
-    taxon_id: Optional[int] = Field(None, description="iNaturalist taxon ID")
-
-
-class PlantIdentificationResult(BaseModel):
-    """Model for plant identification response"""
-    results: List[PlantIdentificationMatch] = Field(description="List of identification matches")
-    processing_time: Optional[float] = Field(None, description="Processing time in seconds")
-
-
-def determine_climate_zone(lon: float, lat: float) -> str:
-    """
-    Classify climate zone based on Cascade Range position and latitude
-    
-    Args:
-        lon: Longitude coordinate
-        lat: Latitude coordinate
-        
-    Returns:
-        Climate zone classification string
+# brotli/gzip for JSON responses above COMPRESSION_MIN_BYTES
+app.add_middleware(CompressionMiddleware)
+
+# Stage timings and stacks of requests slower than SLOW_REQUEST_MS
+app.add_middleware(SlowRequestMiddleware)
+
+# Response cache shared by all endpoints (SQLite-backed when running multiple workers)
+cache = create_cache()
+
+# Bloom-time histograms, the taxon search index and the spatial index follow
+# every observation added to the local store
+phenology.attach(observation_store)
+taxon_index.attach(observation_store)
+spatial_index = SpatialIndex(observation_store)
+spatial_index.attach()
+
+# Thumbnails are served from our origin through a size-bounded disk cache
+photo_proxy = PhotoProxy(observation_store)
+PHOTO_MAX_AGE = 60 * 60 * 24 * 365
+
+# Statistics change slowly, so they are cached longer than observation queries
+STATS_CACHE_TTL = 900
+
+def resolve_regions(requested: List[str]) -> List[str]:
     """
-    # East of Cascade Range (rain shadow)
-    if lon > -121.0:
-        return "East Cascades (Dry/Rain Shadow)"
+    Expand a region query parameter into known region names
     
-    # West of Cascades - further classification
-    # Puget Sound lowlands
-    if lat > 47.0 and lon < -122.0:
-        return "Puget Sound Lowlands"
-    
-    # Coastal region
-    if lat < 45.0 and lon < -123.0:
-        return "Coastal"
+    Raises:
+        HTTPException: 422 if an unknown region is requested
+    """
+    if "all" in requested:
+        return list(PLACE_IDS)
+    unknown = [name for name in requested if name not in PLACE_IDS]
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown region(s): {', '.join(unknown)}"
+        )
+    return sorted(set(requested), key=list(PLACE_IDS).index)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """
+    Dependency guarding the debug endpoints
     
-    # Default to west Cascades
-    return "West Cascades (Wet)"
+    Raises:
+        HTTPException: 404 if ADMIN_TOKEN is not configured, 403 if the
+            X-Admin-Token header does not match it
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+def rate_limited_error(error: RateLimitExceeded) -> HTTPException:
+    """Map a client-side rate limit rejection to a 503 with Retry-After"""
+    return HTTPException(
+        status_code=503,
+        detail=f"iNaturalist rate limit reached: {str(error)}",
+        headers={"Retry-After": str(max(1, round(error.retry_after)))}
+    )
 
 
 @app.get("/", tags=["Root"])
@@ -119,6 +213,14 @@ async def root():
         "description": "Discover native plants of the Pacific Northwest",
         "endpoints": {
             "/api/plants": "Query plant observations by region and filters",
+            "/api/plants/stream": "Same as /api/plants, streamed as NDJSON",
+            "/api/species": "Native species in a region, aggregated by taxon",
+            "/api/phenology": "Observations by month or week of year (bloom time)",
+            "/api/nearby": "Nearest distinct native species to a point",
+            "/api/taxa/suggest": "Autocomplete taxon names from the local index",
+            "/api/photos/{observation_id}": "Resized, cached observation photo",
+            "/api/export/observations.geojson": "Bulk GeoJSON export (streamed)",
+            "/api/export/observations.npz": "Bulk NumPy columnar export (streamed)",
             "/api/health": "Health check endpoint",
             "/docs": "Interactive API documentation"
         },
@@ -136,12 +238,34 @@ async def health_check():
     }
 
 
+def plants_params(taxon: Optional[str], per_page: int) -> dict:
+    """iNaturalist query parameters for /api/plants (place_id is set per region)"""
+    params = {
+        "taxon_id": 47126,  # Plantae (Plants)
+        "quality_grade": "research",
+        "native": True,
+        "per_page": per_page,
+        "order": "desc",
+        "order_by": "created_at"
+    }
+    
+    # Add taxon search if provided; a name known to the local index becomes
+    # an exact taxon_id filter instead of a free-text query
+    if taxon:
+        taxon_id = taxon_index.resolve(taxon)
+        if taxon_id is not None:
+            params["taxon_id"] = taxon_id
+        else:
+            params["q"] = taxon
+    return params
+
+
 @app.get("/api/plants", response_model=List[PlantObservation], tags=["Plants"])
 async def get_plants(
-    region: str = Query(
-        "washington",
-        enum=["washington", "oregon", "idaho", "california"],
-        description="Pacific Northwest state/region"
+    region: List[str] = Query(
+        ["washington"],
+        enum=["all", "washington", "oregon", "idaho", "california"],
+        description="Pacific Northwest state/region; repeat for several or use 'all'"
     ),
     climate_type: str = Query(
         "all",
@@ -164,94 +288,326 @@ async def get_plants(
     
     Returns plant observations filtered by region, climate zone, and optional search term.
     All observations are research-grade and marked as native to the region.
+    
+    Several regions are queried concurrently and merged newest first, with
+    duplicates removed and per_page applied to the merged result.
     """
+    regions = resolve_regions(region)
     
-    # Build query parameters for iNaturalist API
-    params = {
-        "place_id": PLACE_IDS[region],
-        "taxon_id": 47126,  # Plantae (Plants)
-        "quality_grade": "research",
-        "native": True,
-        "per_page": per_page,
-        "order": "desc",
-        "order_by": "created_at"
-    }
+    key = cache_key("plants", region=regions, climate_type=climate_type, taxon=taxon, per_page=per_page)
+    cached = await cache.aget(key)
+    if cached is not None:
+        return cached
     
-    # Add taxon search if provided
-    if taxon:
-        params["q"] = taxon
+    params = plants_params(taxon, per_page)
+    
+    async def fetch_region(region_name: str) -> List[dict]:
+        # Query iNaturalist API (shared client, rate limited)
+        response = await inaturalist_get(
+            "/observations",
+            params={**params, "place_id": PLACE_IDS[region_name]}
+        )
+        response.raise_for_status()
+        results = response.json().get("results", [])
+        
+        # Keep every observation seen in the local columnar store
+        with trace_stage("store_append"):
+            observation_store.append_records(results, region=region_name)
+        return results
     
     try:
-        # Query iNaturalist API
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(
-                f"{INATURALIST_API_BASE}/observations",
-                params=params
-            )
-            response.raise_for_status()
-            
-        data = response.json()
-        observations = data.get("results", [])
+        region_results = await asyncio.gather(*(fetch_region(name) for name in regions))
+        
+        # Merge newest first: observation ids increase with creation time, so
+        # id order matches the created_at order requested upstream
+        merged = {}
+        for results in region_results:
+            for obs in results:
+                if obs.get("id") is not None:
+                    merged.setdefault(obs["id"], obs)
+        observations = [merged[obs_id] for obs_id in sorted(merged, reverse=True)[:per_page]]
         
         # Parse and enrich observations
-        plant_observations = []
+        plant_observations = [
+            plant_obs for plant_obs in (plant_observation(obs, climate_type) for obs in observations)
+            if plant_obs is not None
+        ]
+        
+        await cache.aset(key, [obs.model_dump() for obs in plant_observations])
+        return plant_observations
         
+    except Exception as e:
+        raise plants_error(e)
+
+
+def plants_error(error: Exception) -> HTTPException:
+    """Map a failure while fetching observations to an HTTP error"""
+    if isinstance(error, RateLimitExceeded):
+        return rate_limited_error(error)
+    if isinstance(error, httpx.HTTPStatusError):
+        return HTTPException(
+            status_code=error.response.status_code,
+            detail=f"iNaturalist API error: {error.response.text}"
+        )
+    if isinstance(error, httpx.RequestError):
+        return HTTPException(
+            status_code=503,
+            detail=f"Failed to connect to iNaturalist API: {str(error)}"
+        )
+    return HTTPException(
+        status_code=500,
+        detail=f"Internal server error: {str(error)}"
+    )
+
+
+async def stream_region_observations(region_name: str, params: dict) -> AsyncIterator[dict]:
+    """
+    Yield one region's observations while the iNaturalist response downloads
+    
+    Every parsed chunk is added to the local store before its observations
+    are yielded, so rows reach the store even when the merge stops reading
+    (and cancels this stream) once it has enough results.
+    """
+    scanner = ArrayItemScanner("results")
+    async with inaturalist_stream(
+        "/observations",
+        params={**params, "place_id": PLACE_IDS[region_name]}
+    ) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_text():
+            observations = scanner.feed(chunk)
+            if observations:
+                # Keep every observation seen in the local columnar store
+                with trace_stage("store_append"):
+                    observation_store.append_records(observations, region=region_name)
+            for obs in observations:
+                yield obs
+        observations = scanner.close()
+        if observations:
+            with trace_stage("store_append"):
+                observation_store.append_records(observations, region=region_name)
         for obs in observations:
-            # Extract location
-            location_str = obs.get("location")
-            if not location_str:
-                continue
-                
-            try:
-                lat, lon = map(float, location_str.split(","))
-            except (ValueError, AttributeError):
-                continue
-            
-            # Determine climate zone
-            climate_zone = determine_climate_zone(lon, lat)
-            
-            # Apply climate filter if specified
-            if climate_type != "all":
-                zone_filter_map = {
-                    "coastal": "Coastal",
-                    "cascade-west": "West Cascades",
-                    "cascade-east": "East Cascades",
-                    "puget-sound": "Puget Sound"
-                }
-                if zone_filter_map.get(climate_type, "") not in climate_zone:
-                    continue
-            
-            # Extract taxon information
-            taxon_data = obs.get("taxon", {})
-            scientific_name = taxon_data.get("name", "Unknown")
-            common_name = taxon_data.get("preferred_common_name")
-            taxon_rank = taxon_data.get("rank")
-            
-            # Extract photo URL (use medium size)
-            photos = obs.get("photos", [])
-            photo_url = None
-            if photos:
-                photo_url = photos[0].get("url", "").replace("square", "medium")
-            
-            # Create observation object
-            plant_obs = PlantObservation(
-                id=obs.get("id"),
-                scientific_name=scientific_name,
-                common_name=common_name,
-                photo_url=photo_url,
-                latitude=lat,
-                longitude=lon,
-                observed_on=obs.get("observed_on", ""),
-                place_guess=obs.get("place_guess", ""),
-                climate_zone=climate_zone,
-                quality_grade=obs.get("quality_grade", ""),
-                taxon_rank=taxon_rank
-            )
-            
-            plant_observations.append(plant_obs)
+            yield obs
+
+
+async def merge_newest_first(streams: List[AsyncIterator[dict]], limit: int) -> AsyncIterator[dict]:
+    """
+    Merge per-region observation streams by descending id
+    
+    Each region is downloaded by its own task into a queue, so all regions
+    transfer concurrently while the merge waits only for the regions whose
+    next observation could come first. Observation ids increase with
+    creation time, so every upstream stream is already in id order.
+    """
+    done = object()
+    queues = [asyncio.Queue() for _ in streams]
+    
+    async def pump(stream, queue):
+        try:
+            async for obs in stream:
+                if obs.get("id") is not None:
+                    await queue.put(obs)
+            await queue.put(done)
+        except Exception as e:
+            await queue.put(e)
+    
+    async def next_item(queue):
+        item = await queue.get()
+        if isinstance(item, Exception):
+            raise item
+        return None if item is done else item
+    
+    tasks = [asyncio.create_task(pump(stream, queue)) for stream, queue in zip(streams, queues)]
+    try:
+        heads = [await next_item(queue) for queue in queues]
+        seen = set()
+        while len(seen) < limit:
+            live = [i for i, head in enumerate(heads) if head is not None]
+            if not live:
+                break
+            i = max(live, key=lambda index: heads[index]["id"])
+            obs = heads[i]
+            heads[i] = await next_item(queues[i])
+            if obs["id"] not in seen:
+                seen.add(obs["id"])
+                yield obs
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+@app.get("/api/plants/stream", tags=["Plants"])
+async def stream_plants(
+    region: List[str] = Query(
+        ["washington"],
+        enum=["all", "washington", "oregon", "idaho", "california"],
+        description="Pacific Northwest state/region; repeat for several or use 'all'"
+    ),
+    climate_type: str = Query(
+        "all",
+        enum=["all", "coastal", "cascade-west", "cascade-east", "puget-sound"],
+        description="Filter by climate zone"
+    ),
+    taxon: Optional[str] = Query(
+        None,
+        description="Search by common name or scientific name (e.g., 'fern' or 'Polystichum')"
+    ),
+    per_page: int = Query(
+        50,
+        ge=1,
+        le=200,
+        description="Number of results to return (max 200)"
+    )
+):
+    """
+    Streaming variant of /api/plants as newline-delimited JSON
+    
+    Each line is one PlantObservation, written as soon as it has been
+    parsed out of the upstream response, so the first results arrive before
+    iNaturalist has finished sending the page. Results and ordering match
+    /api/plants and share its cache. An error after the first line is
+    reported as a final {"error": ...} line.
+    """
+    regions = resolve_regions(region)
+    
+    key = cache_key("plants", region=regions, climate_type=climate_type, taxon=taxon, per_page=per_page)
+    cached = await cache.aget(key)
+    if cached is not None:
+        body = "".join(json.dumps(obs, separators=(",", ":")) + "\n" for obs in cached)
+        return Response(content=body, media_type="application/x-ndjson")
+    
+    params = plants_params(taxon, per_page)
+    merged = merge_newest_first([stream_region_observations(name, params) for name in regions], per_page)
+    
+    # Wait for the first observation so upstream failures still map to an
+    # HTTP error status instead of a broken 200 stream
+    try:
+        first = await anext(merged, None)
+    except Exception as e:
+        await merged.aclose()
+        raise plants_error(e)
+    
+    async def ndjson_lines():
+        results = []
+        try:
+            obs = first
+            while obs is not None:
+                plant_obs = plant_observation(obs, climate_type)
+                if plant_obs is not None:
+                    results.append(plant_obs.model_dump())
+                    yield plant_obs.model_dump_json() + "\n"
+                obs = await anext(merged, None)
+        except Exception as e:
+            print(f"Plant stream failed: {e}")
+            yield json.dumps({"error": plants_error(e).detail}) + "\n"
+            return
+        finally:
+            await merged.aclose()
+        await cache.aset(key, results)
+    
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
+@app.get("/api/species", response_model=SpeciesPage, tags=["Plants"])
+async def get_species(
+    region: Literal["washington", "oregon", "idaho", "california"] = Query(
+        "washington",
+        description="Pacific Northwest state/region"
+    ),
+    climate_type: Literal["all", "coastal", "cascade-west", "cascade-east", "puget-sound"] = Query(
+        "all",
+        description="Filter by climate zone"
+    ),
+    page: int = Query(1, ge=1, description="Page number (1-based)"),
+    per_page: int = Query(
+        50,
+        ge=1,
+        le=200,
+        description="Number of species to return (max 200)"
+    )
+):
+    """
+    List native species observed in a region, aggregated by taxon
+    
+    For the whole region, counts and representative photos come from
+    iNaturalist's species_counts endpoint. Climate zones are derived from
+    coordinates, which iNaturalist cannot filter on, so zone-filtered queries
+    are aggregated over the local observation store instead. Observation
+    dates and centroids are taken from the local store when it holds the taxon.
+    """
+    key = cache_key("species", region=region, climate_type=climate_type, page=page, per_page=per_page)
+    cached = await cache.aget(key)
+    if cached is not None:
+        return cached
+    
+    if climate_type != "all":
+        mask = observation_store.mask(region=region, zone_codes=matching_zone_codes(climate_type))
+        species = observation_store.species_summary(mask)
+        offset = (page - 1) * per_page
+        result = SpeciesPage(
+            results=species[offset:offset + per_page],
+            total_results=len(species),
+            page=page,
+            per_page=per_page,
+            source="local"
+        )
+        await cache.aset(key, result.model_dump())
+        return result
+    
+    try:
+        response = await inaturalist_get(
+            "/observations/species_counts",
+            params={
+                "place_id": PLACE_IDS[region],
+                "taxon_id": 47126,  # Plantae (Plants)
+                "quality_grade": "research",
+                "native": True,
+                "page": page,
+                "per_page": per_page
+            }
+        )
+        response.raise_for_status()
+        data = response.json()
+        counts = data.get("results", [])
         
-        return plant_observations
+        # Dates and centroids for the taxa on this page from the local store
+        taxon_codes = [observation_store.taxa.lookup(item.get("taxon", {}).get("id")) for item in counts]
+        mask = observation_store.mask(region=region) & np.isin(observation_store.column("taxon"), taxon_codes)
+        local = {summary["taxon_id"]: summary for summary in observation_store.species_summary(mask)}
+        
+        species = []
+        for item in counts:
+            taxon_data = item.get("taxon", {})
+            photo = taxon_data.get("default_photo") or {}
+            summary = {
+                "taxon_id": taxon_data.get("id"),
+                "scientific_name": taxon_data.get("name", "Unknown"),
+                "common_name": taxon_data.get("preferred_common_name"),
+                "rank": taxon_data.get("rank"),
+                "observation_count": item.get("count", 0),
+                "photo_url": photo.get("medium_url") or photo.get("url")
+            }
+            taxon_index.add(summary["taxon_id"], summary["scientific_name"], summary["common_name"],
+                            summary["rank"], summary["observation_count"])
+            stored = local.get(summary["taxon_id"])
+            if stored:
+                for field in ("first_observed", "last_observed", "centroid_latitude", "centroid_longitude"):
+                    summary[field] = stored[field]
+                summary["photo_url"] = summary["photo_url"] or stored["photo_url"]
+            species.append(summary)
         
+        result = SpeciesPage(
+            results=species,
+            total_results=data.get("total_results", len(species)),
+            page=page,
+            per_page=per_page,
+            source="inaturalist"
+        )
+        await cache.aset(key, result.model_dump())
+        return result
+        
+    except RateLimitExceeded as e:
+        raise rate_limited_error(e)
     except httpx.HTTPStatusError as e:
         raise HTTPException(
             status_code=e.response.status_code,
@@ -269,43 +625,294 @@ async def get_plants(
         )
 
 
+@app.get("/api/nearby", response_model=NearbySpeciesResult, tags=["Plants"])
+async def get_nearby_species(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude of the query point"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude of the query point"),
+    k: int = Query(50, ge=1, le=200, description="Number of distinct species to return")
+):
+    """
+    Native species observed nearest to a point ("plants near me")
+    
+    Uses a KD-tree over every observation in the local store. Species seen in
+    the same climate zone as the query point are ranked ahead of slightly
+    closer species from other zones.
+    """
+    return await asyncio.to_thread(spatial_index.nearest_species, lat, lon, k=k)
+
+
+@app.get("/api/taxa/suggest", response_model=List[TaxonSuggestion], tags=["Plants"])
+async def suggest_taxa(
+    q: str = Query(..., min_length=1, description="Partial scientific or common name"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of suggestions")
+):
+    """
+    Autocomplete taxon names from the local search index
+    
+    Prefix matches on any word of the scientific or common name come first,
+    followed by typo-tolerant (trigram) matches. No upstream call is made.
+    """
+    return [entry.to_dict() for entry in taxon_index.suggest(q, limit=limit)]
+
+
+@app.get("/api/phenology", response_model=PhenologyHistogram, tags=["Plants"])
+async def get_phenology(
+    taxon_id: Optional[int] = Query(
+        None,
+        ge=1,
+        description="iNaturalist taxon ID (omit for all native plants)"
+    ),
+    region: Literal["all", "washington", "oregon", "idaho", "california"] = Query(
+        "all",
+        description="Pacific Northwest state/region"
+    ),
+    climate_type: Literal["all", "coastal", "cascade-west", "cascade-east", "puget-sound"] = Query(
+        "all",
+        description="Filter by climate zone"
+    ),
+    bins: Literal["month", "week"] = Query(
+        "month",
+        description="Histogram resolution"
+    )
+):
+    """
+    Observation counts by month or week of year (bloom-time patterns)
+    
+    Served from aggregate tables maintained as observations are synced into
+    the local store, so no observations are scanned per request.
+    """
+    counts = phenology.histogram(
+        bins=bins,
+        taxon_id=taxon_id,
+        regions=None if region == "all" else [REGIONS.index(region)],
+        zones=matching_zone_codes(climate_type).tolist()
+    )
+    if bins == "month":
+        labels = list(MONTH_LABELS)
+    else:
+        labels = [f"W{week}" for week in range(1, WEEK_BINS + 1)]
+    
+    return PhenologyHistogram(
+        taxon_id=taxon_id,
+        region=region,
+        climate_type=climate_type,
+        bins=bins,
+        labels=labels,
+        counts=counts.tolist(),
+        total=int(counts.sum())
+    )
+
+
+def export_rows(regions: List[str], climate_type: str, taxon_id: Optional[int],
+                start: Optional[str], end: Optional[str]) -> np.ndarray:
+    """Indices of local store rows matching the export filters"""
+    try:
+        mask = observation_store.mask(
+            zone_codes=matching_zone_codes(climate_type),
+            taxon_id=taxon_id,
+            start=start,
+            end=end
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid date: {str(e)}")
+    # Always filtered, so rows stored with UNKNOWN_REGION never reach an export
+    mask &= np.isin(observation_store.column("region"), [REGIONS.index(name) for name in regions])
+    return np.flatnonzero(mask)
+
+
+def export_headers(filename: str, encoding: Optional[str]) -> dict:
+    """Download headers for an export, including Content-Encoding when compressed"""
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"', "Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return headers
+
+
+@app.get("/api/export/observations.geojson", tags=["Export"])
+async def export_geojson(
+    request: Request,
+    region: List[str] = Query(
+        ["all"],
+        enum=["all", "washington", "oregon", "idaho", "california"],
+        description="Pacific Northwest state/region; repeat for several or use 'all'"
+    ),
+    climate_type: str = Query(
+        "all",
+        enum=["all", "coastal", "cascade-west", "cascade-east", "puget-sound"],
+        description="Filter by climate zone"
+    ),
+    taxon_id: Optional[int] = Query(None, description="iNaturalist taxon ID"),
+    start: Optional[str] = Query(None, description="Earliest observation date (YYYY-MM-DD)"),
+    end: Optional[str] = Query(None, description="Latest observation date (YYYY-MM-DD)"),
+    source: str = Query(
+        "local",
+        enum=["local", "upstream"],
+        description="Export the local store, or page through iNaturalist"
+    ),
+    max_pages: int = Query(
+        EXPORT_MAX_PAGES,
+        ge=1,
+        le=EXPORT_MAX_PAGES,
+        description="Upstream pages of 200 observations, in total over the regions (source=upstream only)"
+    )
+):
+    """
+    Stream observations as a GeoJSON FeatureCollection
+    
+    The response is generated incrementally and compressed with zstd or gzip
+    when the client accepts it. Upstream exports honour the date and taxon
+    filters on the iNaturalist side; climate zones are applied to local
+    exports only. They fetch at most EXPORT_MAX_PAGES pages, and a failure
+    on the first page is returned as an error status.
+    """
+    regions = resolve_regions(region)
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    headers = export_headers("observations.geojson", encoding)
+    
+    if source == "upstream":
+        params = {
+            "taxon_id": taxon_id or 47126,  # Plantae (Plants)
+            "quality_grade": "research",
+            "native": True
+        }
+        if start:
+            params["d1"] = start
+        if end:
+            params["d2"] = end
+        try:
+            chunks = await open_geojson_upstream(params, regions, observation_store, max_pages)
+        except Exception as e:
+            raise plants_error(e)
+        return StreamingResponse(aencode_chunks(chunks, encoding), media_type="application/geo+json", headers=headers)
+    
+    rows = export_rows(regions, climate_type, taxon_id, start, end)
+    chunks = iter_geojson(observation_store, rows)
+    return StreamingResponse(encode_chunks(chunks, encoding), media_type="application/geo+json", headers=headers)
+
+
+@app.get("/api/export/observations.npz", tags=["Export"])
+async def export_npz(
+    request: Request,
+    region: List[str] = Query(
+        ["all"],
+        enum=["all", "washington", "oregon", "idaho", "california"],
+        description="Pacific Northwest state/region; repeat for several or use 'all'"
+    ),
+    climate_type: str = Query(
+        "all",
+        enum=["all", "coastal", "cascade-west", "cascade-east", "puget-sound"],
+        description="Filter by climate zone"
+    ),
+    taxon_id: Optional[int] = Query(None, description="iNaturalist taxon ID"),
+    start: Optional[str] = Query(None, description="Earliest observation date (YYYY-MM-DD)"),
+    end: Optional[str] = Query(None, description="Latest observation date (YYYY-MM-DD)")
+):
+    """
+    Stream observations from the local store as a NumPy .npz columnar archive
+    
+    Columns: id, latitude, longitude, observed_on (datetime64[D]),
+    climate_zone and region (codes into climate_zone_names/region_names)
+    and taxon_id. Load with numpy.load().
+    """
+    regions = resolve_regions(region)
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    rows = export_rows(regions, climate_type, taxon_id, start, end)
+    return StreamingResponse(
+        encode_chunks(iter_npz(observation_store, rows), encoding),
+        media_type="application/octet-stream",
+        headers=export_headers("observations.npz", encoding)
+    )
+
+
+@app.get("/api/photos/{observation_id}", tags=["Plants"])
+async def get_photo(
+    request: Request,
+    observation_id: int,
+    width: int = Query(500, ge=16, le=2048, description="Desired width in pixels (rounded up to a bucket)")
+):
+    """
+    Resized observation photo served from our own origin
+    
+    Thumbnails are WebP when the client accepts it (JPEG otherwise), cached
+    on disk, and returned with an ETag and a long-lived Cache-Control header.
+    """
+    image_format = "webp" if "image/webp" in request.headers.get("accept", "") else "jpeg"
+    
+    try:
+        data, etag = await photo_proxy.thumbnail(observation_id, width_bucket(width), image_format)
+    except PhotoNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except PhotoUnreadable as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    except RateLimitExceeded as e:
+        raise rate_limited_error(e)
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(
+            status_code=404 if e.response.status_code == 404 else 502,
+            detail=f"Failed to fetch photo: {str(e)}"
+        )
+    except httpx.RequestError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Failed to connect to photo host: {str(e)}"
+        )
+    
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={PHOTO_MAX_AGE}, immutable",
+        "Vary": "Accept"
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type=MEDIA_TYPES[image_format], headers=headers)
+
+
 @app.get("/api/stats", tags=["Statistics"])
 async def get_statistics():
     """
     Get statistics about available plant observations across PNW regions
     """
+    cached = await cache.aget("stats")
+    if cached is not None:
+        return cached
+    
     stats = {}
     
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            for region_name, place_id in PLACE_IDS.items():
-                response = await client.get(
-                    f"{INATURALIST_API_BASE}/observations",
-                    params={
-                        "place_id": place_id,
-                        "taxon_id": 47126,
-                        "quality_grade": "research",
-                        "native": True,
-                        "per_page": 1
-                    }
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    stats[region_name] = {
-                        "total_observations": data.get("total_results", 0),
-                        "place_id": place_id
-                    }
+        for region_name, place_id in PLACE_IDS.items():
+            response = await inaturalist_get(
+                "/observations",
+                params={
+                    "place_id": place_id,
+                    "taxon_id": 47126,
+                    "quality_grade": "research",
+                    "native": True,
+                    "per_page": 1
+                }
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                stats[region_name] = {
+                    "total_observations": data.get("total_results", 0),
+                    "place_id": place_id
+                }
         
         # Calculate total
         total = sum(region["total_observations"] for region in stats.values())
         stats["total_pnw"] = total
         
-        return {
+        result = {
             "regions": stats,
             "timestamp": datetime.utcnow().isoformat()
         }
+        # Only cache complete results so a failed region is retried next time
+        if len(stats) == len(PLACE_IDS) + 1:
+            await cache.aset("stats", result, ttl=STATS_CACHE_TTL)
+        return result
         
+    except RateLimitExceeded as e:
+        raise rate_limited_error(e)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -313,61 +920,6 @@ async def get_statistics():
         )
 
 
-async def identify_with_plantnet(image_data: bytes, filename: str) -> List[PlantIdentificationMatch]:
-    """
-    Identify plant using PlantNet API (botanical specialist)
-    Free tier: 500 identifications/day
-    Accuracy: 85-95% for species with good photos
-    """
-    api_key = os.getenv('PLANTNET_API_KEY')
-    if not api_key or api_key == 'your_plantnet_api_key_here':
-        raise ValueError("PLANTNET_API_KEY not configured")
-    
-    # PlantNet API endpoint
-    url = 'https://my-api.plantnet.org/v2/identify/all'
-    
-    # Prepare multipart form data
-    files = {'images': (filename, image_data, 'image/jpeg')}
-    params = {
-        'api-key': api_key,
-        'include-related-images': 'false'
-    }
-    
-    # Call PlantNet API
-    response = requests.post(url, params=params, files=files, timeout=30)
-    response.raise_for_status()
-    
-    data = response.json()
-    
-    # Parse results
-    results = []
-    for result in data.get('results', [])[:3]:  # Top 3 matches
-        species_info = result.get('species', {})
-        score = result.get('score', 0)
-        
-        # Get common names
-        common_names = species_info.get('commonNames', [])
-        common_name = common_names[0] if common_names else species_info.get('scientificNameWithoutAuthor', 'Unknown')
-        
-        # Build description from family and genus
-        family = species_info.get('family', {}).get('scientificNameWithoutAuthor', 'Unknown family')
-        genus = species_info.get('genus', {}).get('scientificNameWithoutAuthor', '')
-        description = f"Family: {family}"
-        if genus:
-            description += f"\nGenus: {genus}"
-        
-        results.append(PlantIdentificationMatch(
-            scientific_name=species_info.get('scientificNameWithoutAuthor', 'Unknown'),
-            common_name=common_name,
-            confidence=score,
-            description=description,
-            is_native=True,  # TODO: Cross-reference with PNW native species list
-            taxon_id=result.get('gbif', {}).get('id', 0)
-        ))
-    
-    return results
-
-
 @app.post("/api/identify", response_model=PlantIdentificationResult, tags=["Identification"])
 async def identify_plant(
     image: UploadFile = File(..., description="Plant image to identify")
@@ -389,172 +941,15 @@ async def identify_plant(
         
         # Read and validate image data
         contents = await image.read()
+        with trace_stage("load_backends"):
+            identification = await load_identification()
         try:
-            img = Image.open(io.BytesIO(contents))
-            img.verify()  # Verify it's a valid image
-            img = Image.open(io.BytesIO(contents))  # Re-open after verify
-        except Exception as e:
+            with trace_stage("decode_image"):
+                img = identification.load_image(contents)
+        except ValueError as e:
             raise HTTPException(status_code=400, detail=f"Invalid image file: {str(e)}")
         
-        # Strategy 1: Try PlantNet API first (botanical specialist)
-        try:
-            print("Attempting PlantNet identification...")
-            results = await identify_with_plantnet(contents, image.filename or 'plant.jpg')
-            if results and results[0].confidence > 0.3:  # Reasonable confidence threshold
-                print(f"PlantNet success: {results[0].scientific_name} ({results[0].confidence:.2%})")
-                end_time = datetime.utcnow()
-                processing_time = (end_time - start_time).total_seconds()
-                return PlantIdentificationResult(
-                    results=results,
-                    processing_time=processing_time
-                )
-        except Exception as plantnet_error:
-            print(f"PlantNet failed: {plantnet_error}, falling back to LLaVA...")
-        
-        # Strategy 2: Fallback to LLaVA vision model
-        # Convert image to base64 for Replicate API
-        img_byte_arr = io.BytesIO()
-        img.save(img_byte_arr, format='JPEG')
-        img_byte_arr = img_byte_arr.getvalue()
-        img_base64 = base64.b64encode(img_byte_arr).decode('utf-8')
-        data_uri = f"data:image/jpeg;base64,{img_base64}"
-        
-        # Call LLaVA vision model via Replicate
-        prompt = """Analyze this plant photo and identify the species.
-
-Focus on:
-- Leaf shape, arrangement, and margins
-- Flower/fruit characteristics if visible
-- Growth form (tree, shrub, forb, grass)
-- Bark texture if applicable
-
-Provide:
-1. Most likely species (scientific name)
-2. Common name(s)
-3. Confidence level (0-100%)
-4. Key identifying features you observed
-5. Alternative possibilities if uncertain
-
-Only suggest species native to the Pacific Northwest (Washington, Oregon, Idaho, Northern California).
-If not a PNW native plant, indicate that clearly.
-Format as JSON with keys: species, common_name, confidence, features, alternatives, is_native"""
-        
-        try:
-            # Load API token from environment
-            api_token = os.getenv('REPLICATE_API_TOKEN')
-            if not api_token or api_token == 'your_replicate_api_token_here':
-                raise ValueError("REPLICATE_API_TOKEN not set or invalid")
-            
-            # Run LLaVA model (using stable 13B version)
-            output = replicate.run(
-                "yorickvp/llava-13b:80537f9eead1a5bfa72d5ac6ea6414379be41d4d4f6679fd776e9535d1eb58bb",
-                input={
-                    "image": data_uri,
-                    "prompt": prompt,
-                    "max_tokens": 1024,
-                    "temperature": 0.2
-                }
-            )
-            
-            # Parse model response - output is a generator, consume it
-            response_text = "".join(str(chunk) for chunk in output)
-            
-            # Try to parse JSON response from model
-            import json
-            import re
-            
-            try:
-                # Extract JSON from response (may have extra text)
-                json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-                if json_match:
-                    plant_data = json.loads(json_match.group())
-                    
-                    # Parse confidence (handle "90%" or 90 or 0.9)
-                    conf_str = str(plant_data.get('confidence', '75'))
-                    conf_value = float(re.search(r'\d+', conf_str).group()) / 100 if '%' in conf_str else float(conf_str)
-                    if conf_value > 1.0:
-                        conf_value = conf_value / 100
-                    
-                    # Build features description
-                    features = plant_data.get('features', [])
-                    features_text = '\n'.join(f"• {f}" for f in features) if features else "No specific features listed"
-                    
-                    # Create primary result
-                    results = [
-                        PlantIdentificationMatch(
-                            scientific_name=plant_data.get('species', 'Unknown'),
-                            common_name=plant_data.get('common_name', 'Unknown'),
-                            confidence=conf_value,
-                            description=features_text,
-                            is_native=str(plant_data.get('is_native', 'Unknown')).lower() in ['yes', 'true'],
-                            taxon_id=0
-                        )
-                    ]
-                    
-                    # Add alternatives if present
-                    alternatives = plant_data.get('alternatives', [])
-                    for alt in alternatives[:2]:  # Limit to 2 alternatives
-                        results.append(
-                            PlantIdentificationMatch(
-                                scientific_name=alt,
-                                common_name="Alternative match",
-                                confidence=conf_value * 0.7,  # Lower confidence for alternatives
-                                description="Alternative identification possibility",
-                                is_native=True,
-                                taxon_id=0
-                            )
-                        )
-                else:
-                    # No JSON found, use raw text
-                    results = [
-                        PlantIdentificationMatch(
-                            scientific_name="Vision Model Analysis",
-                            common_name="Analysis Result",
-                            confidence=0.75,
-                            description=response_text[:500] if response_text else "No description available",
-                            is_native=True,
-                            taxon_id=0
-                        )
-                    ]
-            except Exception as parse_error:
-                print(f"JSON parse error: {parse_error}")
-                # Fallback to raw text
-                results = [
-                    PlantIdentificationMatch(
-                        scientific_name="Vision Model Analysis",
-                        common_name="Analysis Result",
-                        confidence=0.75,
-                        description=response_text[:500] if response_text else "No description available",
-                        is_native=True,
-                        taxon_id=0
-                    )
-                ]
-            
-        except Exception as e:
-            # Fallback to mock data if API fails (billing not active, quota exceeded, etc.)
-            import traceback
-            error_details = traceback.format_exc()
-            print(f"Vision model error (using mock data): {error_details}")
-            
-            # Return mock identification results
-            results = [
-                PlantIdentificationMatch(
-                    scientific_name="Pseudotsuga menziesii",
-                    common_name="Douglas Fir",
-                    confidence=0.85,
-                    description="Tall coniferous tree with distinctive drooping cones and flat needles. Bark is thick and deeply furrowed.",
-                    is_native=True,
-                    taxon_id=47375
-                ),
-                PlantIdentificationMatch(
-                    scientific_name="Thuja plicata",
-                    common_name="Western Red Cedar",
-                    confidence=0.72,
-                    description="Large evergreen tree with scale-like leaves and fibrous reddish bark. Commonly found in moist forests.",
-                    is_native=True,
-                    taxon_id=135773
-                )
-            ]
+        results = await identification.identify(contents, image.filename or 'plant.jpg', img)
         
         end_time = datetime.utcnow()
         processing_time = (end_time - start_time).total_seconds()
@@ -573,6 +968,74 @@ Format as JSON with keys: species, common_name, confidence, features, alternativ
         )
 
 
+@app.get("/api/debug/startup", tags=["Debug"], dependencies=[Depends(require_admin)])
+async def debug_startup(
+    importtime: bool = Query(False, description="Include a python -X importtime report of api.main (runs a subprocess)")
+):
+    """
+    Startup milestones and import-time report
+    
+    Admin only (X-Admin-Token header).
+    """
+    report = startup_timer.report()
+    report["identification_loaded"] = _identification is not None
+    if importtime:
+        try:
+            report["importtime"] = await asyncio.to_thread(cached_import_time_report)
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to measure import time: {str(e)}"
+            )
+    return report
+
+
+@app.get("/api/debug/batching", tags=["Debug"], dependencies=[Depends(require_admin)])
+async def debug_batching():
+    """
+    Throughput and added-latency metrics of the micro-batchers (LLaVA
+    predictions once identification is loaded, photo URL lookups)
+    
+    Admin only (X-Admin-Token header).
+    """
+    metrics = {"loaded": _identification is not None, "photo_lookup": photo_proxy.lookups.metrics()}
+    if _identification is not None:
+        metrics["llava"] = _identification.llava_batcher.metrics()
+    return metrics
+
+
+@app.get("/api/debug/profile", response_class=PlainTextResponse, tags=["Debug"], dependencies=[Depends(require_admin)])
+async def debug_profile(
+    seconds: float = Query(5.0, gt=0, le=MAX_PROFILE_SECONDS, description="How long to sample this worker"),
+    interval_ms: float = Query(5.0, ge=1, le=100, description="Time between samples in milliseconds")
+):
+    """
+    Sample the stacks of every thread in this worker
+    
+    Returns collapsed stacks ("thread;outer;...;inner count" per line) for
+    flamegraph.pl or speedscope. Only the worker that serves the request is
+    profiled. Admin only (X-Admin-Token header).
+    """
+    try:
+        return await asyncio.to_thread(sample_stacks, seconds, interval_ms / 1000)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@app.get("/api/debug/slow-requests", tags=["Debug"], dependencies=[Depends(require_admin)])
+async def debug_slow_requests(
+    limit: int = Query(20, ge=1, le=200, description="Number of most recent traces to return")
+):
+    """
+    Recent requests slower than SLOW_REQUEST_MS on this worker
+    
+    Each trace has stage timings and, for requests still running when they
+    crossed the threshold, the event loop thread's stack and the request
+    task's await chain. Admin only (X-Admin-Token header).
+    """
+    return {"traces": list(slow_traces)[-limit:][::-1]}
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
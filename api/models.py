@@ -0,0 +1,109 @@
+"""
+Pydantic models shared by the API endpoints
+"""
+
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class PlantObservation(BaseModel):
+    """Model for a single plant observation"""
+    id: int = Field(description="iNaturalist observation ID")
+    scientific_name: str = Field(description="Scientific name (e.g., Pseudotsuga menziesii)")
+    common_name: Optional[str] = Field(None, description="Common name (e.g., Douglas Fir)")
+    photo_url: Optional[str] = Field(None, description="URL to observation photo")
+    latitude: float = Field(description="Latitude coordinate")
+    longitude: float = Field(description="Longitude coordinate")
+    observed_on: str = Field(description="Observation date (YYYY-MM-DD)")
+    place_guess: str = Field(description="Human-readable location description")
+    climate_zone: str = Field(description="Classified climate zone based on coordinates")
+    quality_grade: str = Field(description="Observation quality: research, needs_id, or casual")
+    taxon_rank: Optional[str] = Field(None, description="Taxonomic rank: species, genus, etc.")
+
+
+class ErrorResponse(BaseModel):
+    """Error response model"""
+    detail: str
+    status_code: int
+
+
+class PlantIdentificationMatch(BaseModel):
+    """Model for a single plant identification match"""
+    scientific_name: str = Field(description="Scientific name of the plant")
+    common_name: Optional[str] = Field(None, description="Common name of the plant")
+    confidence: float = Field(description="Confidence score (0-1)")
+    description: Optional[str] = Field(None, description="Brief description")
+    is_native: bool = Field(False, description="Whether plant is native to PNW")
+    taxon_id: Optional[int] = Field(None, description="iNaturalist taxon ID")
+
+
+class PlantIdentificationResult(BaseModel):
+    """Model for plant identification response"""
+    results: List[PlantIdentificationMatch] = Field(description="List of identification matches")
+    processing_time: Optional[float] = Field(None, description="Processing time in seconds")
+
+
+class SpeciesSummary(BaseModel):
+    """Model for observations of one taxon aggregated over a region"""
+    taxon_id: int = Field(description="iNaturalist taxon ID")
+    scientific_name: str = Field(description="Scientific name of the taxon")
+    common_name: Optional[str] = Field(None, description="Common name of the taxon")
+    rank: Optional[str] = Field(None, description="Taxonomic rank: species, genus, etc.")
+    observation_count: int = Field(description="Number of matching observations")
+    first_observed: Optional[str] = Field(None, description="Earliest observation date (YYYY-MM-DD)")
+    last_observed: Optional[str] = Field(None, description="Latest observation date (YYYY-MM-DD)")
+    photo_url: Optional[str] = Field(None, description="Representative photo URL")
+    centroid_latitude: Optional[float] = Field(None, description="Mean latitude of the observations")
+    centroid_longitude: Optional[float] = Field(None, description="Mean longitude of the observations")
+
+
+class SpeciesPage(BaseModel):
+    """Model for a page of species aggregated by taxon"""
+    results: List[SpeciesSummary] = Field(description="Species on this page")
+    total_results: int = Field(description="Number of species matching the query")
+    page: int = Field(description="Page number (1-based)")
+    per_page: int = Field(description="Page size")
+    source: str = Field(description="'inaturalist' (species_counts) or 'local' (local observation store)")
+
+
+class PhenologyHistogram(BaseModel):
+    """Model for observation counts binned by month or week of year"""
+    taxon_id: Optional[int] = Field(None, description="iNaturalist taxon ID (None for all plants)")
+    region: str = Field(description="Region the counts cover ('all' for every region)")
+    climate_type: str = Field(description="Climate zone filter applied")
+    bins: str = Field(description="'month' or 'week'")
+    labels: List[str] = Field(description="Bin labels")
+    counts: List[int] = Field(description="Observation count per bin")
+    total: int = Field(description="Total observations counted")
+
+
+class TaxonSuggestion(BaseModel):
+    """Model for a taxon name autocomplete suggestion"""
+    taxon_id: int = Field(description="iNaturalist taxon ID")
+    scientific_name: str = Field(description="Scientific name of the taxon")
+    common_name: Optional[str] = Field(None, description="Common name of the taxon")
+    rank: Optional[str] = Field(None, description="Taxonomic rank: species, genus, etc.")
+
+
+class NearbySpecies(BaseModel):
+    """Model for a species observed near a point"""
+    taxon_id: int = Field(description="iNaturalist taxon ID")
+    scientific_name: str = Field(description="Scientific name of the taxon")
+    common_name: Optional[str] = Field(None, description="Common name of the taxon")
+    rank: Optional[str] = Field(None, description="Taxonomic rank: species, subspecies, etc.")
+    distance_km: float = Field(description="Great-circle distance to the closest observation (km)")
+    observation_id: int = Field(description="iNaturalist ID of the closest observation")
+    latitude: float = Field(description="Latitude of the closest observation")
+    longitude: float = Field(description="Longitude of the closest observation")
+    climate_zone: str = Field(description="Climate zone of the closest observation")
+    same_climate_zone: bool = Field(description="Whether it shares the query point's climate zone")
+    photo_url: Optional[str] = Field(None, description="URL to the observation photo")
+
+
+class NearbySpeciesResult(BaseModel):
+    """Model for the species nearest to a point"""
+    latitude: float = Field(description="Query latitude")
+    longitude: float = Field(description="Query longitude")
+    climate_zone: str = Field(description="Climate zone of the query point")
+    results: List[NearbySpecies] = Field(description="Nearest distinct species, best match first")
@@ -0,0 +1,195 @@
+"""
+Nearest-neighbour search over stored observation coordinates
+
+Coordinates are mapped to 3D points on the unit sphere and indexed with a
+KD-tree; straight-line (chord) distance between such points orders
+neighbours exactly like the haversine great-circle distance, which is
+recovered from it for the response. New observations land in a small delta
+buffer that is scanned by brute force until a background rebuild folds
+them into the tree, so sync never blocks queries.
+"""
+
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from scipy.spatial import cKDTree
+
+from .climate import CLIMATE_ZONES, determine_climate_zone
+from .observations import NO_TAXON, ObservationTable
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Score multiplier for species observed in the query point's climate zone
+SAME_ZONE_FACTOR = 0.75
+
+# Rebuild the tree once the delta buffer exceeds this share of indexed rows
+REBUILD_FRACTION = 0.1
+MIN_REBUILD_ROWS = 10_000
+
+# Ranks above species (and observations without a taxon) are not reported
+# as "species near me"
+SPECIES_RANKS = {"species", "subspecies", "variety", "form", "hybrid"}
+
+
+def to_unit_vectors(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Convert degrees to (n, 3) points on the unit sphere"""
+    lat_rad = np.radians(lat)
+    lon_rad = np.radians(lon)
+    cos_lat = np.cos(lat_rad)
+    return np.column_stack((cos_lat * np.cos(lon_rad), cos_lat * np.sin(lon_rad), np.sin(lat_rad)))
+
+
+def chord_to_km(chord: np.ndarray) -> np.ndarray:
+    """Great-circle distance in km for unit-sphere chord lengths"""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chord / 2, 1.0))
+
+
+class SpatialIndex:
+    """KD-tree over the observation store plus a brute-force delta buffer"""
+
+    def __init__(self, store: ObservationTable):
+        self.store = store
+        self._points = np.empty((0, 3))
+        self._size = 0
+        # (tree, number of leading rows it covers), swapped atomically
+        self._tree: Tuple[Optional["cKDTree"], int] = (None, 0)
+        self._rebuilding = False
+        # Per taxon code: indexed rows, and whether it is reportable as a species
+        self._taxon_rows = np.zeros(0, dtype=np.int64)
+        self._eligible = np.zeros(0, dtype=bool)
+
+    def attach(self) -> None:
+        """Index the rows already stored and follow future appends"""
+        self.update(self.store[:])
+        self.store.add_listener(self.update)
+
+    def update(self, rows: ObservationTable) -> None:
+        """Add newly stored rows; schedule a rebuild when the delta grows large"""
+        count = len(rows)
+        if count == 0:
+            return
+        needed = self._size + count
+        if needed > len(self._points):
+            grown = np.empty((max(needed, 2 * len(self._points), 1024), 3))
+            grown[:self._size] = self._points[:self._size]
+            self._points = grown
+        self._points[self._size:needed] = to_unit_vectors(rows.column("latitude"), rows.column("longitude"))
+        counts = np.bincount(rows.column("taxon"), minlength=len(self._taxon_rows))
+        counts[:len(self._taxon_rows)] += self._taxon_rows
+        self._taxon_rows = counts
+        self._size = needed
+
+        indexed = self._tree[1]
+        if not self._rebuilding and self._size - indexed > max(MIN_REBUILD_ROWS, indexed * REBUILD_FRACTION):
+            self._rebuilding = True
+            threading.Thread(target=self._rebuild, args=(self._size,), daemon=True).start()
+
+    def _rebuild(self, size: int) -> None:
+        # scipy.spatial takes ~100 ms to import, so keep it off the startup path
+        from scipy.spatial import cKDTree
+
+        try:
+            tree = cKDTree(self._points[:size].copy(), balanced_tree=False, compact_nodes=False)
+            self._tree = (tree, size)
+        finally:
+            self._rebuilding = False
+
+    def rebuild_now(self) -> None:
+        """Fold the delta buffer into the tree synchronously"""
+        self._rebuild(self._size)
+
+    def _species_taxa(self) -> np.ndarray:
+        """Per taxon code: True if the taxon may be reported as a species"""
+        taxa = self.store.taxa
+        known, size = len(self._eligible), len(taxa)
+        if known < size:
+            added = np.array([
+                taxa.ranks[code] in SPECIES_RANKS and taxa.taxon_ids[code] != NO_TAXON
+                for code in range(known, size)
+            ], dtype=bool)
+            self._eligible = np.concatenate((self._eligible, added))
+        return self._eligible
+
+    def _candidates(self, point: np.ndarray, count: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows and chord distances of the ``count`` nearest stored observations"""
+        tree, indexed = self._tree
+        size = self._size
+        rows = np.empty(0, dtype=np.int64)
+        chords = np.empty(0)
+        if tree is not None and indexed:
+            chords, rows = tree.query(point, k=min(count, indexed))
+            chords, rows = np.atleast_1d(chords), np.atleast_1d(rows).astype(np.int64)
+        if size > indexed:
+            delta = np.linalg.norm(self._points[indexed:size] - point, axis=1)
+            take = min(count, len(delta))
+            nearest = np.argpartition(delta, take - 1)[:take]
+            rows = np.concatenate((rows, nearest + indexed))
+            chords = np.concatenate((chords, delta[nearest]))
+        order = np.argsort(chords, kind="stable")[:count]
+        return rows[order], chords[order]
+
+    def nearest_species(self, lat: float, lon: float, k: int = 50) -> Dict[str, Any]:
+        """
+        The ``k`` nearest distinct species to a point
+
+        Each species is ranked by its closest observation; species observed in
+        the same climate zone as the query point have their distance scaled by
+        SAME_ZONE_FACTOR. Candidates are widened until no unseen observation
+        could still outrank the k-th result, or add a species when every
+        species in the store has already been seen.
+        """
+        zone = determine_climate_zone(lon, lat)
+        zone_code = CLIMATE_ZONES.index(zone)
+        point = to_unit_vectors(np.array([lat]), np.array([lon]))[0]
+        total = self._size
+        species_taxa = self._species_taxa()
+        taxon_rows = self._taxon_rows
+        shared = min(len(species_taxa), len(taxon_rows))
+        wanted = min(k, int(np.count_nonzero(species_taxa[:shared] & (taxon_rows[:shared] > 0))))
+
+        results: List[Dict[str, Any]] = []
+        count = k * 8
+        while total:
+            rows, chords = self._candidates(point, min(count, total))
+            distances = chord_to_km(chords)
+            taxa = self.store.column("taxon")[rows]
+            same_zone = self.store.column("zone")[rows] == zone_code
+            scores = distances * np.where(same_zone, SAME_ZONE_FACTOR, 1.0)
+
+            eligible = species_taxa[taxa]
+            order = np.flatnonzero(eligible)[np.argsort(scores[eligible], kind="stable")]
+            _, first = np.unique(taxa[order], return_index=True)
+            best = order[np.sort(first)][:k]
+
+            exhausted = len(rows) >= total
+            # An unseen observation is at least as far as the farthest
+            # candidate, so its best possible score is that distance scaled
+            settled = len(best) >= wanted and (
+                not len(best) or scores[best[-1]] <= distances[-1] * SAME_ZONE_FACTOR
+            )
+            if exhausted or settled:
+                results = [self._describe(int(rows[i]), float(distances[i]), bool(same_zone[i])) for i in best]
+                break
+            count *= 4
+
+        return {"latitude": lat, "longitude": lon, "climate_zone": zone, "results": results}
+
+    def _describe(self, row: int, distance_km: float, same_zone: bool) -> Dict[str, Any]:
+        store = self.store
+        code = int(store.column("taxon")[row])
+        return {
+            "taxon_id": store.taxa.taxon_ids[code],
+            "scientific_name": store.taxa.scientific_names[code],
+            "common_name": store.taxa.common_names[code],
+            "rank": store.taxa.ranks[code],
+            "distance_km": round(distance_km, 3),
+            "observation_id": int(store.column("id")[row]),
+            "latitude": float(store.column("latitude")[row]),
+            "longitude": float(store.column("longitude")[row]),
+            "climate_zone": CLIMATE_ZONES[int(store.column("zone")[row])],
+            "same_climate_zone": same_zone,
+            "photo_url": store.photo_url(row),
+        }
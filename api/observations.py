@@ -0,0 +1,604 @@
+"""
+Columnar in-memory observation storage
+
+Observations are kept as parallel NumPy arrays (one per field) with the
+repeated strings -- taxon names, place descriptions, quality grades and
+photo URL templates -- dictionary-encoded into small integer codes. A row
+costs a few dozen bytes instead of the hundreds taken by a dict or a
+Pydantic object, filters are vectorized boolean masks, and slicing returns
+views that share memory with the parent table. Rows are only turned into
+``PlantObservation`` objects at the response boundary.
+"""
+
+import os
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .climate import CLIMATE_FILTERS, CLIMATE_ZONES, climate_zone_codes, determine_climate_zone
+from .inaturalist import PLACE_IDS
+from .models import PlantObservation
+
+# Region names in code order (the code is the index)
+REGIONS = tuple(PLACE_IDS)
+# Region code of rows that match none of REGIONS (e.g. photo lookups of
+# observations outside the four states); such rows are never exported
+UNKNOWN_REGION = 255
+
+NO_DATE = np.datetime64("NaT", "D")
+
+# Taxon id stored for observations without a taxon ("Unknown"); kept so the
+# rows still count in totals, but never reported as a species
+NO_TAXON = 0
+
+# Photo URLs differ only by photo id, so they are stored as (id, template)
+_PHOTO_ID = re.compile(r"/photos/(\d+)/")
+
+
+def parse_location(obs: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """
+    Extract (latitude, longitude) from an iNaturalist observation
+
+    Returns:
+        Coordinate pair, or None if the observation has no usable location
+    """
+    location_str = obs.get("location")
+    if not location_str:
+        return None
+    try:
+        lat, lon = map(float, location_str.split(","))
+    except (ValueError, AttributeError):
+        return None
+    return lat, lon
+
+
+def observation_region(obs: Dict[str, Any]) -> Optional[str]:
+    """Return the key of PLACE_IDS an observation lies in, from its ``place_ids``"""
+    place_ids = set(obs.get("place_ids") or ())
+    return next((region for region, place_id in PLACE_IDS.items() if place_id in place_ids), None)
+
+
+def medium_photo_url(obs: Dict[str, Any]) -> Optional[str]:
+    """Return the first photo of an observation at "medium" size"""
+    photos = obs.get("photos", [])
+    if not photos:
+        return None
+    return photos[0].get("url", "").replace("square", "medium")
+
+
+def plant_observation(obs: Dict[str, Any], climate_type: str = "all") -> Optional[PlantObservation]:
+    """
+    Build the API representation of an iNaturalist observation
+
+    Args:
+        obs: Observation as returned by the iNaturalist API
+        climate_type: Climate filter value ("all" keeps every zone)
+
+    Returns:
+        The observation, or None if it has no location or is filtered out
+    """
+    # Extract location
+    coords = parse_location(obs)
+    if coords is None:
+        return None
+    lat, lon = coords
+
+    # Determine climate zone
+    climate_zone = determine_climate_zone(lon, lat)
+
+    # Apply climate filter if specified
+    if climate_type != "all":
+        if CLIMATE_FILTERS.get(climate_type, "") not in climate_zone:
+            return None
+
+    # Extract taxon information
+    taxon_data = obs.get("taxon", {})
+
+    return PlantObservation(
+        id=obs.get("id"),
+        scientific_name=taxon_data.get("name", "Unknown"),
+        common_name=taxon_data.get("preferred_common_name"),
+        photo_url=medium_photo_url(obs),
+        latitude=lat,
+        longitude=lon,
+        observed_on=obs.get("observed_on", ""),
+        place_guess=obs.get("place_guess", ""),
+        climate_zone=climate_zone,
+        quality_grade=obs.get("quality_grade", ""),
+        taxon_rank=taxon_data.get("rank")
+    )
+
+
+class StringDictionary:
+    """Interns strings to dense integer codes"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def encode(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+    def lookup(self, value: str) -> int:
+        """Return the code for ``value`` or -1 if it was never encoded"""
+        return self._codes.get(value, -1)
+
+    def __getitem__(self, code: int) -> str:
+        return self.values[code]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class TaxonDictionary:
+    """Interns taxa by iNaturalist taxon id, keeping their names and rank"""
+
+    def __init__(self):
+        self.taxon_ids: List[int] = []
+        self.scientific_names: List[str] = []
+        self.common_names: List[Optional[str]] = []
+        self.ranks: List[Optional[str]] = []
+        self._codes: Dict[int, int] = {}
+
+    def encode(
+        self,
+        taxon_id: int,
+        scientific_name: str,
+        common_name: Optional[str] = None,
+        rank: Optional[str] = None,
+    ) -> int:
+        code = self._codes.get(taxon_id)
+        if code is None:
+            code = len(self.taxon_ids)
+            self._codes[taxon_id] = code
+            self.taxon_ids.append(taxon_id)
+            self.scientific_names.append(scientific_name)
+            self.common_names.append(common_name)
+            self.ranks.append(rank)
+        return code
+
+    def lookup(self, taxon_id: int) -> int:
+        """Return the code for ``taxon_id`` or -1 if it was never encoded"""
+        return self._codes.get(taxon_id, -1)
+
+    def __len__(self) -> int:
+        return len(self.taxon_ids)
+
+
+class IdIndex:
+    """
+    Sorted index of stored observation ids
+
+    New ids go into a small sorted run that is merged into the main sorted
+    array once it outgrows a fraction of it, so a lookup is a binary search
+    per id and an insert only rarely copies the whole index.
+    """
+
+    # The recent run is merged once it holds this share of the main array
+    MERGE_FRACTION = 8
+    MIN_RUN = 4096
+
+    def __init__(self, ids: Optional[np.ndarray] = None):
+        self._base = np.sort(np.asarray(ids if ids is not None else [], dtype=np.int64))
+        self._recent = np.empty(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self._base) + len(self._recent)
+
+    @staticmethod
+    def _member(sorted_ids: np.ndarray, ids: np.ndarray) -> np.ndarray:
+        if not len(sorted_ids):
+            return np.zeros(len(ids), dtype=bool)
+        at = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+        return sorted_ids[at] == ids
+
+    def contains(self, ids: np.ndarray) -> np.ndarray:
+        """Boolean mask of which ``ids`` are indexed"""
+        return self._member(self._base, ids) | self._member(self._recent, ids)
+
+    def add(self, ids: np.ndarray) -> None:
+        """Index ids that are not indexed yet"""
+        ids = np.sort(np.asarray(ids, dtype=np.int64))
+        self._recent = np.insert(self._recent, np.searchsorted(self._recent, ids), ids)
+        if len(self._recent) > max(self.MIN_RUN, len(self._base) // self.MERGE_FRACTION):
+            self._base = np.insert(self._base, np.searchsorted(self._base, self._recent), self._recent)
+            self._recent = np.empty(0, dtype=np.int64)
+
+
+# Column name -> dtype; every column has one entry per row
+COLUMNS = {
+    "id": np.int64,
+    "latitude": np.float64,
+    "longitude": np.float64,
+    "observed": "datetime64[D]",
+    "zone": np.uint8,
+    "region": np.uint8,
+    "taxon": np.int32,
+    "place": np.int32,
+    "quality": np.uint8,
+    "photo_id": np.int64,
+    "photo_template": np.int32,
+}
+
+
+class ObservationTable:
+    """
+    Append-only columnar table of observations
+
+    Columns are over-allocated and grown geometrically, so appends are
+    amortized O(1). ``table[a:b]`` returns a zero-copy view that shares
+    columns and dictionaries with its parent; ``filter(mask)`` returns a
+    compact copy of the selected rows.
+    """
+
+    def __init__(self, capacity: int = 1024, _dictionaries: Optional[Tuple] = None):
+        self._data = {name: np.empty(capacity, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self._size = 0
+        self._is_view = False
+        self._listeners: List[Callable[["ObservationTable"], None]] = []
+        self._ids: Optional[IdIndex] = None
+        if _dictionaries is None:
+            _dictionaries = (TaxonDictionary(), StringDictionary(), StringDictionary(), StringDictionary())
+        self.taxa, self.places, self.qualities, self.photo_templates = _dictionaries
+
+    def _dictionaries(self) -> Tuple:
+        return self.taxa, self.places, self.qualities, self.photo_templates
+
+    def _derive(self, data: Dict[str, np.ndarray], size: int, is_view: bool) -> "ObservationTable":
+        table = ObservationTable(capacity=0, _dictionaries=self._dictionaries())
+        table._data = data
+        table._size = size
+        table._is_view = is_view
+        return table
+
+    def __len__(self) -> int:
+        return self._size
+
+    def contains_ids(self, ids: np.ndarray) -> np.ndarray:
+        """
+        Boolean mask of which ``ids`` are already stored
+
+        Uses an id index built on first use and kept up to date by appends,
+        so the cost grows with ``len(ids)`` rather than with the table.
+        """
+        if self._ids is None:
+            self._ids = IdIndex(self.column("id"))
+        return self._ids.contains(np.asarray(ids, dtype=np.int64))
+
+    def add_listener(self, callback: Callable[["ObservationTable"], None]) -> None:
+        """
+        Call ``callback`` with a view of the new rows after every append
+
+        Used by derived indexes (aggregates, spatial index) so they are
+        maintained incrementally instead of being rebuilt per request.
+        """
+        self._listeners.append(callback)
+
+    def column(self, name: str) -> np.ndarray:
+        """Return a view of a column trimmed to the current row count"""
+        return self._data[name][:self._size]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the populated part of the columns"""
+        return sum(self.column(name).nbytes for name in COLUMNS)
+
+    def __getitem__(self, index: slice) -> "ObservationTable":
+        if not isinstance(index, slice):
+            raise TypeError("ObservationTable only supports slicing; use filter() for masks")
+        start, stop, step = index.indices(self._size)
+        data = {name: self.column(name)[start:stop:step] for name in COLUMNS}
+        return self._derive(data, len(range(start, stop, step)), is_view=True)
+
+    def filter(self, mask: np.ndarray) -> "ObservationTable":
+        """Return a new table holding the rows where ``mask`` is True"""
+        data = {name: self.column(name)[mask] for name in COLUMNS}
+        return self._derive(data, len(data["id"]), is_view=False)
+
+    def _reserve(self, extra: int) -> None:
+        needed = self._size + extra
+        capacity = len(self._data["id"])
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 1024)
+        for name, column in self._data.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._data[name] = grown
+
+    def append_arrays(self, **columns: np.ndarray) -> None:
+        """
+        Append rows given as already-encoded column arrays
+
+        Every column in COLUMNS must be provided and all arrays must have
+        the same length.
+        """
+        if self._is_view:
+            raise ValueError("Cannot append to a table view")
+        missing = set(COLUMNS) - set(columns)
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(sorted(missing))}")
+        count = len(columns["id"])
+        self._reserve(count)
+        start = self._size
+        for name in COLUMNS:
+            self._data[name][start:start + count] = columns[name]
+        self._size += count
+        if self._ids is not None:
+            self._ids.add(self._data["id"][start:start + count])
+        if count and self._listeners:
+            added = self[start:start + count]
+            for callback in self._listeners:
+                callback(added)
+
+    def append_records(self, records: Iterable[Dict[str, Any]], region: Optional[str] = None) -> int:
+        """
+        Append raw iNaturalist observation records, skipping known ids
+
+        Args:
+            records: Observation dicts as returned by the iNaturalist API
+            region: Key of PLACE_IDS the records were queried for
+
+        Returns:
+            Number of rows added
+        """
+        rows = {name: [] for name in COLUMNS}
+        for obs in records:
+            coords = parse_location(obs)
+            if coords is None or obs.get("id") is None:
+                continue
+            lat, lon = coords
+
+            taxon_data = obs.get("taxon") or {}
+            photo_url = medium_photo_url(obs)
+            photo_id, template = -1, -1
+            if photo_url:
+                match = _PHOTO_ID.search(photo_url)
+                if match:
+                    photo_id = int(match.group(1))
+                    photo_url = _PHOTO_ID.sub("/photos/{}/", photo_url, count=1)
+                template = self.photo_templates.encode(photo_url)
+
+            rows["id"].append(obs["id"])
+            rows["latitude"].append(lat)
+            rows["longitude"].append(lon)
+            rows["observed"].append(obs.get("observed_on") or NO_DATE)
+            rows["region"].append(REGIONS.index(region) if region in REGIONS else UNKNOWN_REGION)
+            rows["taxon"].append(self.taxa.encode(
+                taxon_data.get("id") or NO_TAXON,
+                taxon_data.get("name", "Unknown"),
+                taxon_data.get("preferred_common_name"),
+                taxon_data.get("rank"),
+            ))
+            rows["place"].append(self.places.encode(obs.get("place_guess") or ""))
+            rows["quality"].append(self.qualities.encode(obs.get("quality_grade") or ""))
+            rows["photo_id"].append(photo_id)
+            rows["photo_template"].append(template)
+
+        if not rows["id"]:
+            return 0
+
+        arrays = {name: np.array(values, dtype=COLUMNS[name]) for name, values in rows.items() if name != "zone"}
+        arrays["zone"] = climate_zone_codes(arrays["longitude"], arrays["latitude"])
+
+        # Drop ids already stored and duplicates within the batch
+        _, first = np.unique(arrays["id"], return_index=True)
+        keep = np.zeros(len(arrays["id"]), dtype=bool)
+        keep[first] = True
+        keep &= ~self.contains_ids(arrays["id"])
+        if not keep.all():
+            arrays = {name: values[keep] for name, values in arrays.items()}
+
+        self.append_arrays(**arrays)
+        return len(arrays["id"])
+
+    def save(self, path: str, **extra: np.ndarray) -> None:
+        """
+        Write the rows and their dictionaries to an ``.npz`` snapshot
+
+        The snapshot is written to a temporary file and renamed over
+        ``path``, so a reader never sees a partial file. ``extra`` arrays
+        (e.g. sync cursors) are stored alongside the rows.
+        """
+        taxa_count = len(self.taxa)
+        taxa = self.taxa
+        arrays = {f"column_{name}": self.column(name) for name in COLUMNS}
+        arrays.update(
+            taxon_ids=np.asarray(taxa.taxon_ids[:taxa_count], dtype=np.int64),
+            taxon_names=np.array(taxa.scientific_names[:taxa_count], dtype=str),
+            taxon_common_names=np.array([name or "" for name in taxa.common_names[:taxa_count]], dtype=str),
+            taxon_ranks=np.array([rank or "" for rank in taxa.ranks[:taxa_count]], dtype=str),
+            places=np.array(self.places.values[:], dtype=str),
+            qualities=np.array(self.qualities.values[:], dtype=str),
+            photo_templates=np.array(self.photo_templates.values[:], dtype=str),
+        )
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            np.savez(f, **arrays, **extra)
+        os.replace(temp_path, path)
+
+    def load(self, arrays: Dict[str, np.ndarray]) -> int:
+        """
+        Append the rows of a snapshot written by ``save``, skipping known ids
+
+        Args:
+            arrays: Contents of the ``.npz`` file
+
+        Returns:
+            Number of rows added
+        """
+        taxa = np.array([
+            self.taxa.encode(int(taxon_id), str(name), str(common) or None, str(rank) or None)
+            for taxon_id, name, common, rank in zip(
+                arrays["taxon_ids"], arrays["taxon_names"], arrays["taxon_common_names"], arrays["taxon_ranks"]
+            )
+        ], dtype=np.int64)
+        codes = {
+            "taxon": taxa,
+            "place": np.array([self.places.encode(str(value)) for value in arrays["places"]], dtype=np.int64),
+            "quality": np.array([self.qualities.encode(str(value)) for value in arrays["qualities"]], dtype=np.int64),
+            "photo_template": np.array(
+                [self.photo_templates.encode(str(value)) for value in arrays["photo_templates"]], dtype=np.int64
+            ),
+        }
+
+        columns = {}
+        for name, dtype in COLUMNS.items():
+            values = arrays[f"column_{name}"]
+            if name in codes:
+                # Snapshot codes -> codes of this table's dictionaries (-1 stays "none")
+                values = values.astype(np.int64)
+                present = values >= 0
+                values[present] = codes[name][values[present]]
+            columns[name] = values.astype(dtype)
+
+        keep = ~self.contains_ids(columns["id"])
+        if not keep.any():
+            return 0
+        self.append_arrays(**{name: values[keep] for name, values in columns.items()})
+        return int(keep.sum())
+
+    def mask(
+        self,
+        region: Optional[str] = None,
+        zone_codes: Optional[Sequence[int]] = None,
+        taxon_id: Optional[int] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> np.ndarray:
+        """
+        Build a boolean row mask from common filters (all optional, ANDed)
+
+        Args:
+            region: Key of PLACE_IDS
+            zone_codes: Accepted indices into CLIMATE_ZONES
+            taxon_id: iNaturalist taxon id
+            start: Earliest observation date (YYYY-MM-DD, inclusive)
+            end: Latest observation date (YYYY-MM-DD, inclusive)
+        """
+        selected = np.ones(self._size, dtype=bool)
+        if region is not None:
+            selected &= self.column("region") == (REGIONS.index(region) if region in REGIONS else UNKNOWN_REGION)
+        if zone_codes is not None:
+            selected &= np.isin(self.column("zone"), np.asarray(zone_codes, dtype=np.uint8))
+        if taxon_id is not None:
+            selected &= self.column("taxon") == self.taxa.lookup(taxon_id)
+        if start is not None:
+            selected &= self.column("observed") >= np.datetime64(start, "D")
+        if end is not None:
+            selected &= self.column("observed") <= np.datetime64(end, "D")
+        return selected
+
+    def photo_url(self, row: int) -> Optional[str]:
+        """Rebuild the photo URL of a single row"""
+        template = int(self.column("photo_template")[row])
+        if template < 0:
+            return None
+        photo_id = int(self.column("photo_id")[row])
+        url = self.photo_templates[template]
+        return url.replace("{}", str(photo_id), 1) if photo_id >= 0 else url
+
+    def species_summary(self, mask: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """
+        Aggregate rows by taxon
+
+        Args:
+            mask: Optional row mask restricting the aggregation
+
+        Returns:
+            One dict per taxon (count, first/last observed date, centroid and
+            a representative photo), sorted by descending observation count;
+            observations without a taxon are left out
+        """
+        rows = np.arange(self._size) if mask is None else np.flatnonzero(mask)
+        if len(rows) == 0:
+            return []
+        taxa = self.column("taxon")[rows]
+        size = len(self.taxa)
+
+        counts = np.bincount(taxa, minlength=size)
+        lat_sum = np.bincount(taxa, weights=self.column("latitude")[rows], minlength=size)
+        lon_sum = np.bincount(taxa, weights=self.column("longitude")[rows], minlength=size)
+
+        observed = self.column("observed")[rows]
+        dated = ~np.isnat(observed)
+        first = np.full(size, np.datetime64("9999-12-31", "D"))
+        last = np.full(size, np.datetime64("0001-01-01", "D"))
+        np.minimum.at(first, taxa[dated], observed[dated])
+        np.maximum.at(last, taxa[dated], observed[dated])
+        has_date = np.bincount(taxa[dated], minlength=size) > 0
+
+        # Representative photo: the first row of each taxon that has one
+        with_photo = self.column("photo_template")[rows] >= 0
+        photo_taxa, photo_first = np.unique(taxa[with_photo], return_index=True)
+        photo_rows = dict(zip(photo_taxa.tolist(), rows[with_photo][photo_first].tolist()))
+
+        no_taxon = self.taxa.lookup(NO_TAXON)
+        if no_taxon >= 0:
+            counts[no_taxon] = 0
+        present = np.flatnonzero(counts)
+        order = present[np.argsort(-counts[present], kind="stable")]
+        summaries = []
+        for code in order.tolist():
+            count = int(counts[code])
+            photo_row = photo_rows.get(code)
+            summaries.append({
+                "taxon_id": self.taxa.taxon_ids[code],
+                "scientific_name": self.taxa.scientific_names[code],
+                "common_name": self.taxa.common_names[code],
+                "rank": self.taxa.ranks[code],
+                "observation_count": count,
+                "first_observed": str(first[code]) if has_date[code] else None,
+                "last_observed": str(last[code]) if has_date[code] else None,
+                "photo_url": self.photo_url(photo_row) if photo_row is not None else None,
+                "centroid_latitude": float(lat_sum[code] / count),
+                "centroid_longitude": float(lon_sum[code] / count),
+            })
+        return summaries
+
+    def to_observations(self, limit: Optional[int] = None) -> List[PlantObservation]:
+        """Materialize rows as PlantObservation models (response boundary only)"""
+        count = self._size if limit is None else min(limit, self._size)
+        ids = self.column("id")[:count].tolist()
+        lats = self.column("latitude")[:count].tolist()
+        lons = self.column("longitude")[:count].tolist()
+        dates = np.datetime_as_string(self.column("observed")[:count], unit="D").tolist()
+        zones = self.column("zone")[:count].tolist()
+        taxa = self.column("taxon")[:count].tolist()
+        places = self.column("place")[:count].tolist()
+        qualities = self.column("quality")[:count].tolist()
+        photo_ids = self.column("photo_id")[:count].tolist()
+        templates = self.column("photo_template")[:count].tolist()
+
+        observations = []
+        for i in range(count):
+            taxon = taxa[i]
+            photo_url = None
+            if templates[i] >= 0:
+                photo_url = self.photo_templates[templates[i]]
+                if photo_ids[i] >= 0:
+                    photo_url = photo_url.replace("{}", str(photo_ids[i]), 1)
+            observations.append(PlantObservation(
+                id=ids[i],
+                scientific_name=self.taxa.scientific_names[taxon],
+                common_name=self.taxa.common_names[taxon],
+                photo_url=photo_url,
+                latitude=lats[i],
+                longitude=lons[i],
+                observed_on="" if dates[i] == "NaT" else dates[i],
+                place_guess=self.places[places[i]],
+                climate_zone=CLIMATE_ZONES[zones[i]],
+                quality_grade=self.qualities[qualities[i]],
+                taxon_rank=self.taxa.ranks[taxon]
+            ))
+        return observations
+
+
+# Process-wide local store of every observation the API has seen
+observation_store = ObservationTable()
@@ -0,0 +1,110 @@
+"""
+Incrementally maintained phenology (bloom-time) aggregates
+
+Observation counts are kept per (taxon, region, climate zone) as month and
+week-of-year histograms. The tables are updated whenever rows are appended
+to the observation store (sync or write-through from /api/plants), so a
+request only sums a handful of small arrays instead of scanning raw
+observations.
+"""
+
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from .observations import ObservationTable
+
+MONTH_BINS = 12
+WEEK_BINS = 53
+
+# Key of the "all taxa" rollup rows; iNaturalist taxon ids are positive and
+# the store uses 0 for observations without a taxon, so -1 cannot collide
+ALL_TAXA = -1
+
+MONTH_LABELS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun",
+                "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+class PhenologyAggregates:
+    """
+    Month and week histograms per taxon and (region code, zone code)
+
+    Each cell is one array of MONTH_BINS + WEEK_BINS counts, so a lookup
+    touches at most one cell per region/zone pair of a single taxon.
+    """
+
+    def __init__(self):
+        self.cells: Dict[int, Dict[Tuple[int, int], np.ndarray]] = {}
+
+    def attach(self, store: ObservationTable) -> None:
+        """Aggregate the rows already in ``store`` and follow future appends"""
+        self.update(store[:])
+        store.add_listener(self.update)
+
+    def _cell(self, taxon_id: int, region: int, zone: int) -> np.ndarray:
+        cells = self.cells.setdefault(taxon_id, {})
+        cell = cells.get((region, zone))
+        if cell is None:
+            cell = cells[(region, zone)] = np.zeros(MONTH_BINS + WEEK_BINS, dtype=np.int64)
+        return cell
+
+    def update(self, rows: ObservationTable) -> None:
+        """Add newly stored rows to the histograms"""
+        observed = rows.column("observed")
+        dated = ~np.isnat(observed)
+        if not dated.any():
+            return
+        observed = observed[dated]
+        months = observed.astype("datetime64[M]").astype(np.int64) % 12
+        day_of_year = (observed - observed.astype("datetime64[Y]")).astype(np.int64)
+        weeks = np.minimum(day_of_year // 7, WEEK_BINS - 1)
+
+        taxon_ids = np.asarray(rows.taxa.taxon_ids, dtype=np.int64)[rows.column("taxon")[dated]]
+        regions = rows.column("region")[dated].astype(np.int64)
+        zones = rows.column("zone")[dated].astype(np.int64)
+
+        # Histogram every (taxon, region, zone) group of the batch with one
+        # bincount per bin type, then fold the group rows into the cells
+        for keys, rollup in (((taxon_ids, regions, zones), False), ((regions, zones), True)):
+            groups, inverse = np.unique(np.stack(keys, axis=1), axis=0, return_inverse=True)
+            inverse = inverse.reshape(-1)
+            size = len(groups)
+            month_counts = np.bincount(inverse * MONTH_BINS + months, minlength=size * MONTH_BINS)
+            week_counts = np.bincount(inverse * WEEK_BINS + weeks, minlength=size * WEEK_BINS)
+            month_counts = month_counts.reshape(size, MONTH_BINS)
+            week_counts = week_counts.reshape(size, WEEK_BINS)
+            for index, key in enumerate(groups.tolist()):
+                cell = self._cell(ALL_TAXA, *key) if rollup else self._cell(*key)
+                cell[:MONTH_BINS] += month_counts[index]
+                cell[MONTH_BINS:] += week_counts[index]
+
+    def histogram(
+        self,
+        bins: str = "month",
+        taxon_id: Optional[int] = None,
+        regions: Optional[Iterable[int]] = None,
+        zones: Optional[Iterable[int]] = None,
+    ) -> np.ndarray:
+        """
+        Sum the histograms matching the filters
+
+        Args:
+            bins: "month" (12 bins) or "week" (53 bins)
+            taxon_id: iNaturalist taxon id (None for all taxa)
+            regions: Region codes to include (None for all)
+            zones: Climate zone codes to include (None for all)
+        """
+        total = np.zeros(MONTH_BINS + WEEK_BINS, dtype=np.int64)
+        cells = self.cells.get(ALL_TAXA if taxon_id is None else taxon_id, {})
+        region_set = None if regions is None else set(regions)
+        zone_set = None if zones is None else set(zones)
+        for (region, zone), counts in cells.items():
+            if region_set is not None and region not in region_set:
+                continue
+            if zone_set is not None and zone not in zone_set:
+                continue
+            total += counts
+        return total[:MONTH_BINS] if bins == "month" else total[MONTH_BINS:]
+
+
+phenology = PhenologyAggregates()
@@ -0,0 +1,279 @@
+"""
+Observation photo thumbnail proxy
+
+Photos are fetched from iNaturalist's CDN once, resized to a small set of
+width buckets, re-encoded as WebP (or JPEG for clients that do not accept
+WebP) and kept in a size-bounded on-disk LRU cache. The grid can then load
+thumbnails from our own origin with long cache lifetimes and ETags.
+
+Photo URLs come from the local observation store. Observations the store
+does not know are looked up in batches -- one iNaturalist call in the
+INTERACTIVE lane for every grid's worth of misses -- so a page of
+thumbnails cannot use up the shared rate limit budget, and a running sync
+or export cannot hold thumbnails back.
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from .batching import MicroBatcher
+from .inaturalist import inaturalist_get
+from .observations import ObservationTable, observation_region
+from .ratelimit import Priority
+
+# Served widths; requests are rounded up to the next bucket
+WIDTH_BUCKETS = (150, 300, 500, 1024)
+
+# iNaturalist photo sizes by maximum edge length
+SOURCE_SIZES = ((240, "small"), (500, "medium"), (1024, "large"))
+
+CACHE_DIR = os.getenv("PHOTO_CACHE_DIR", os.path.join(tempfile.gettempdir(), "nw-plants-photos"))
+CACHE_MAX_BYTES = int(os.getenv("PHOTO_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+MEDIA_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+# Unknown observations are looked up together: up to LOOKUP_BATCH_SIZE ids
+# collected for at most LOOKUP_BATCH_WAIT seconds go into one upstream call
+LOOKUP_BATCH_SIZE = 200
+LOOKUP_BATCH_WAIT = 0.05
+
+# Longest a lookup waits for a rate limiter token (seconds)
+LOOKUP_MAX_WAIT = 10.0
+
+# Each worker re-measures the shared cache directory after writing this
+# fraction of max_bytes, so N workers overshoot by at most N times as much
+SCAN_FRACTION = 0.1
+
+
+class PhotoNotFound(Exception):
+    """Raised when an observation has no photo"""
+
+
+class PhotoUnreadable(Exception):
+    """Raised when the photo host returns bytes that are not a readable image"""
+
+
+def width_bucket(width: int) -> int:
+    """Round a requested width up to the nearest served bucket"""
+    for bucket in WIDTH_BUCKETS:
+        if width <= bucket:
+            return bucket
+    return WIDTH_BUCKETS[-1]
+
+
+def source_url(photo_url: str, width: int) -> str:
+    """Rewrite an iNaturalist photo URL to the smallest size covering ``width``"""
+    size = next((name for edge, name in SOURCE_SIZES if width <= edge), SOURCE_SIZES[-1][1])
+    for name in ("square", "small", "medium", "large", "original"):
+        marker = f"/{name}."
+        if marker in photo_url:
+            return photo_url.replace(marker, f"/{size}.", 1)
+    return photo_url
+
+
+def render_thumbnail(data: bytes, width: int, image_format: str) -> bytes:
+    """
+    Resize image bytes to ``width`` (never upscaling) and re-encode them
+
+    Raises:
+        PhotoUnreadable: If the bytes cannot be decoded as an image
+    """
+    from PIL import Image  # imported on first use to keep startup fast
+
+    try:
+        with Image.open(io.BytesIO(data)) as source:
+            img = source.convert("RGB")
+    except (OSError, Image.DecompressionBombError) as e:
+        raise PhotoUnreadable(f"Photo host returned an unreadable image: {e}") from e
+    if img.width > width:
+        img.thumbnail((width, width * 4), Image.LANCZOS)
+    output = io.BytesIO()
+    if image_format == "webp":
+        img.save(output, format="WEBP", quality=80, method=4)
+    else:
+        img.save(output, format="JPEG", quality=82, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+class DiskLRUCache:
+    """
+    Size-bounded directory of thumbnails
+
+    Recency is tracked through file modification times (touched on every
+    hit), so the cache survives restarts and is shared by all workers that
+    point at the same directory. The directory size is re-measured before
+    evicting rather than tracked per process, since other workers write to
+    it too. Every method does blocking file I/O; call them from a thread.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._scan_every = max_bytes * SCAN_FRACTION
+        # Bytes written since the directory was last measured (measure on first write)
+        self._written = self._scan_every
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return data
+
+    def set(self, key: str, data: bytes) -> None:
+        # Write to a temporary name first so readers never see partial files
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        with self._lock:
+            self._written += len(data)
+            if self._written >= self._scan_every:
+                self._written = 0
+                self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.is_file():
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            except FileNotFoundError:  # removed by another worker
+                continue
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        # Evict down to 90% so a full cache does not rescan on every insert
+        target = self.max_bytes * 0.9
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+class PhotoProxy:
+    """Resolves, fetches, resizes and caches observation photos"""
+
+    def __init__(self, store: ObservationTable, cache: Optional[DiskLRUCache] = None):
+        self.store = store
+        self._cache = cache
+        self._client: Optional[httpx.AsyncClient] = None
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.lookups: MicroBatcher[int, str] = MicroBatcher(
+            self._lookup_batch,
+            max_batch_size=LOOKUP_BATCH_SIZE,
+            max_wait=LOOKUP_BATCH_WAIT,
+            name="photo_lookup"
+        )
+
+    @property
+    def cache(self) -> DiskLRUCache:
+        if self._cache is None:
+            self._cache = DiskLRUCache()
+        return self._cache
+
+    def _cache_get(self, key: str) -> Optional[bytes]:
+        return self.cache.get(key)
+
+    def _cache_set(self, key: str, data: bytes) -> None:
+        self.cache.set(key, data)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=30.0, follow_redirects=True)
+        return self._client
+
+    async def close(self) -> None:
+        await self.lookups.close()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _lookup_batch(self, observation_ids: List[int]) -> List[Any]:
+        """Fetch the photo URLs of observations missing from the store in one upstream call"""
+        response = await inaturalist_get(
+            "/observations",
+            params={"id": ",".join(map(str, observation_ids)), "per_page": len(observation_ids)},
+            priority=Priority.INTERACTIVE,
+            max_wait=LOOKUP_MAX_WAIT
+        )
+        response.raise_for_status()
+        results = response.json().get("results", [])
+        by_region: Dict[Optional[str], List[Dict[str, Any]]] = {}
+        for obs in results:
+            by_region.setdefault(observation_region(obs), []).append(obs)
+        for region, records in by_region.items():
+            self.store.append_records(records, region=region)
+
+        found = {obs.get("id"): obs for obs in results}
+        urls = []
+        for observation_id in observation_ids:
+            obs = found.get(observation_id)
+            photos = (obs.get("photos") or []) if obs is not None else []
+            if obs is None:
+                urls.append(PhotoNotFound(f"Observation {observation_id} not found"))
+            elif not photos or not photos[0].get("url"):
+                urls.append(PhotoNotFound(f"Observation {observation_id} has no photo"))
+            else:
+                urls.append(photos[0]["url"])
+        return urls
+
+    async def photo_url(self, observation_id: int) -> str:
+        """Find the photo URL of an observation, asking iNaturalist if it is not stored"""
+        rows = np.flatnonzero(self.store.column("id") == observation_id)
+        if len(rows):
+            url = self.store.photo_url(int(rows[0]))
+            if url:
+                return url
+            raise PhotoNotFound(f"Observation {observation_id} has no photo")
+        return await self.lookups.submit(observation_id)
+
+    async def thumbnail(self, observation_id: int, width: int, image_format: str) -> Tuple[bytes, str]:
+        """
+        Return (image bytes, ETag) for an observation photo
+
+        Concurrent requests for the same thumbnail share one upstream fetch.
+
+        Raises:
+            PhotoNotFound: If the observation does not exist or has no photo
+            PhotoUnreadable: If the photo host returns an unreadable image
+        """
+        key = f"{observation_id}-{width}.{image_format}"
+        data = await asyncio.to_thread(self._cache_get, key)
+        if data is None:
+            lock = self._locks.setdefault(key, asyncio.Lock())
+            try:
+                async with lock:
+                    data = await asyncio.to_thread(self._cache_get, key)
+                    if data is None:
+                        url = source_url(await self.photo_url(observation_id), width)
+                        response = await self._get_client().get(url)
+                        response.raise_for_status()
+                        data = await asyncio.to_thread(render_thumbnail, response.content, width, image_format)
+                        await asyncio.to_thread(self._cache_set, key, data)
+            finally:
+                self._locks.pop(key, None)
+        etag = '"' + hashlib.blake2b(data, digest_size=12).hexdigest() + '"'
+        return data, etag
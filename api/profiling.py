@@ -0,0 +1,253 @@
+"""
+Live-worker profiling
+
+Two opt-in tools for finding where a worker spends its time:
+
+* ``sample_stacks`` is a statistical profiler. It reads every thread's
+  current frame through ``sys._current_frames`` at a fixed interval and
+  returns the counts in collapsed-stack format, which flamegraph.pl and
+  speedscope read directly. Nothing is traced between samples, so the
+  overhead is a few percent at the default 200 Hz.
+* ``SlowRequestMiddleware`` times each request and the named stages inside
+  it (``trace_stage``). When a request runs past SLOW_REQUEST_MS, a
+  watchdog thread captures the event loop thread's stack and the request
+  task's await chain while the request is still in progress. The trace is
+  kept in a bounded in-memory list.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from types import FrameType
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+# Requests slower than this are kept with their stage timings (0 disables)
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "2000"))
+
+# Number of slow traces kept per worker
+SLOW_TRACE_LIMIT = int(os.getenv("SLOW_TRACE_LIMIT", "50"))
+
+MAX_PROFILE_SECONDS = 60.0
+
+# Deepest stack recorded for a sample or trace
+MAX_STACK_DEPTH = 128
+
+
+def frame_label(frame: FrameType) -> str:
+    """"function (file.py:line)" for one frame, using the function's first line"""
+    code = frame.f_code
+    label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return label.replace(";", ":")
+
+
+def collapse_frame(frame: Optional[FrameType]) -> List[str]:
+    """Labels of a frame and its callers, outermost first"""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is requested while another is running"""
+
+
+_profile_lock = threading.Lock()
+
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> str:
+    """
+    Sample all threads of this process (blocking; run it in a worker thread)
+
+    Args:
+        seconds: How long to sample
+        interval: Time between samples in seconds
+
+    Returns:
+        Collapsed stacks ("thread;outer;...;inner count" per line), most
+        frequent first
+
+    Raises:
+        ProfilerBusy: If another profile is already running in this worker
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running on this worker")
+    try:
+        own = threading.get_ident()
+        counts: Counter = Counter()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                thread = names.get(thread_id, f"thread-{thread_id}").replace(";", ":").replace(" ", "_")
+                counts[";".join([thread] + collapse_frame(frame))] += 1
+            time.sleep(interval)
+        return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+    finally:
+        _profile_lock.release()
+
+
+def await_chain(task: asyncio.Task) -> List[str]:
+    """
+    Labels of the coroutines a task is suspended in, outermost first
+
+    ``Task.get_stack()`` only returns the task's outermost coroutine once it
+    is suspended, so the ``cr_await`` chain is followed instead.
+    """
+    labels = []
+    awaitable: Any = task.get_coro()
+    while awaitable is not None and len(labels) < MAX_STACK_DEPTH:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "ag_frame", None) \
+            or getattr(awaitable, "gi_frame", None)
+        if frame is not None:
+            labels.append(f"{frame_label(frame)} line {frame.f_lineno}")
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "ag_await", None) \
+            or getattr(awaitable, "gi_yieldfrom", None)
+    return labels
+
+
+class RequestTrace:
+    """Timing of one request and of the named stages run inside it"""
+
+    def __init__(self, method: str, path: str, query: str):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.started_at = datetime.utcnow()
+        self.start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.status: Optional[int] = None
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.task = asyncio.current_task()
+        self.thread_id = threading.get_ident()
+        self.stack: Optional[List[str]] = None
+        self.task_stack: Optional[List[str]] = None
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        stage = self.stages.setdefault(name, {"ms": 0.0, "count": 0})
+        stage["ms"] += seconds * 1000
+        stage["count"] += 1
+
+    def capture(self) -> None:
+        """Record where the request is right now (called from the watchdog thread)"""
+        self.stack = collapse_frame(sys._current_frames().get(self.thread_id))
+        if self.task is not None:
+            self.task_stack = await_chain(self.task)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "method": self.method,
+            "path": self.path,
+            "query": self.query,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round((self.duration or 0.0) * 1000, 1),
+            # Stages run concurrently (e.g. one upstream call per region)
+            # are summed, so they can add up to more than duration_ms
+            "stages": {name: {"ms": round(stage["ms"], 1), "count": stage["count"]}
+                       for name, stage in self.stages.items()},
+            "loop_thread_stack": self.stack,
+            "task_stack": self.task_stack,
+        }
+
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+
+@contextmanager
+def trace_stage(name: str) -> Iterator[None]:
+    """Add the time spent in the block to the current request's stage timings"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_stage(name, time.perf_counter() - start)
+
+
+class SlowRequestWatchdog:
+    """Background thread that captures stacks of in-flight requests past the threshold"""
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self.poll = min(max(threshold / 4, 0.01), 0.25)
+        self._active: Dict[int, RequestTrace] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, trace: RequestTrace) -> None:
+        with self._lock:
+            self._active[id(trace)] = trace
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="slow-request-watchdog", daemon=True)
+                self._thread.start()
+
+    def unregister(self, trace: RequestTrace) -> None:
+        with self._lock:
+            self._active.pop(id(trace), None)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.poll)
+            now = time.perf_counter()
+            with self._lock:
+                overdue = [trace for trace in self._active.values()
+                           if trace.stack is None and now - trace.start >= self.threshold]
+            for trace in overdue:
+                try:
+                    trace.capture()
+                except Exception as e:  # the request may finish mid-capture
+                    print(f"Slow request capture failed: {e}")
+
+
+slow_traces: Deque[Dict[str, Any]] = deque(maxlen=SLOW_TRACE_LIMIT)
+
+
+class SlowRequestMiddleware:
+    """
+    ASGI middleware that keeps traces of requests slower than ``threshold_ms``
+
+    The application runs in the middleware's own task, so the captured await
+    chain reaches down into the endpoint.
+    """
+
+    def __init__(self, app, threshold_ms: float = SLOW_REQUEST_MS):
+        self.app = app
+        self.threshold = threshold_ms / 1000
+        self.watchdog = SlowRequestWatchdog(self.threshold) if threshold_ms > 0 else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.watchdog is None:
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace(scope["method"], scope["path"], scope.get("query_string", b"").decode("latin-1"))
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                trace.status = message["status"]
+            await send(message)
+
+        token = _current_trace.set(trace)
+        self.watchdog.register(trace)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            trace.duration = time.perf_counter() - trace.start
+            self.watchdog.unregister(trace)
+            _current_trace.reset(token)
+            if trace.duration >= self.threshold:
+                slow_traces.append(trace.to_dict())
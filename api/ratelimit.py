@@ -0,0 +1,217 @@
+"""
+Client-side rate limiting for upstream API calls
+
+A token bucket whose state lives in a small SQLite file so every uvicorn
+worker on the host draws from the same budget. Requests are assigned a
+priority lane; lower lanes must leave part of the bucket untouched so
+interactive traffic always has headroom over background sync and prefetch.
+"""
+
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import Dict, Optional
+
+
+class Priority(IntEnum):
+    """Priority lanes for upstream calls (lower value is served first)"""
+    INTERACTIVE = 0
+    BACKGROUND = 1
+    PREFETCH = 2
+
+
+# Fraction of bucket capacity each lane has to leave for higher lanes
+LANE_RESERVE = {
+    Priority.INTERACTIVE: 0.0,
+    Priority.BACKGROUND: 0.25,
+    Priority.PREFETCH: 0.5,
+}
+
+DEFAULT_DB_PATH = os.path.join(tempfile.gettempdir(), "nw-plants-ratelimit.sqlite3")
+
+# How often local waiters re-check the shared bucket (seconds)
+POLL_INTERVAL = 0.05
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call cannot get a token within its allowed wait"""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"Upstream rate limit reached, retry after {retry_after:.1f}s")
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header value
+
+    Args:
+        value: Header value, either delay-seconds or an HTTP-date
+
+    Returns:
+        Delay in seconds, or None if the header is missing or malformed
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket shared between processes through SQLite
+
+    Each bucket is one row holding the token count, the last refill time and
+    an optional "blocked until" timestamp set when upstream answers 429.
+    Updates run inside ``BEGIN IMMEDIATE`` transactions on a WAL-mode database
+    so concurrent workers never hand out the same token twice. The transactions run in a worker
+    thread, so waiting on another process's write lock never blocks the
+    event loop.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate_per_minute: float = 60.0,
+        burst: Optional[float] = None,
+        path: Optional[str] = None,
+    ):
+        self.name = name
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst if burst is not None else max(1.0, rate_per_minute / 6))
+        self.path = path or ":memory:"
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._waiting: Dict[Priority, int] = {lane: 0 for lane in Priority}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            try:
+                conn = sqlite3.connect(
+                    self.path, timeout=1.0, isolation_level=None, check_same_thread=False
+                )
+            except sqlite3.Error:
+                # Unwritable location: degrade to a per-process bucket
+                conn = sqlite3.connect(":memory:", isolation_level=None, check_same_thread=False)
+            # WAL with NORMAL sync: a token update is one short write, not
+            # two fsyncs, so workers queue on the lock for microseconds
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # Workers starting together race to create the table; an
+            # immediate transaction makes the losers wait instead of failing
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS buckets (
+                    name TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    blocked_until REAL NOT NULL DEFAULT 0
+                )"""
+            )
+            conn.execute("COMMIT")
+            self._conn = conn
+        return self._conn
+
+    def _update(self, cost: float, reserve: float, block_for: float = 0.0) -> float:
+        """
+        Refill the bucket and try to take ``cost`` tokens
+
+        Returns:
+            0 if the tokens were taken, otherwise seconds until they could be
+        """
+        with self._lock:
+            return self._update_locked(cost, reserve, block_for)
+
+    def _update_locked(self, cost: float, reserve: float, block_for: float) -> float:
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated, blocked_until FROM buckets WHERE name = ?",
+                (self.name,),
+            ).fetchone()
+            tokens, updated, blocked_until = row if row else (self.capacity, now, 0.0)
+            # No tokens accrue while upstream has us blocked
+            refill_from = max(updated, blocked_until)
+            tokens = min(self.capacity, tokens + max(0.0, now - refill_from) * self.rate)
+
+            if block_for > 0:
+                blocked_until = max(blocked_until, now + block_for)
+                tokens = 0.0
+
+            if now < blocked_until:
+                wait = blocked_until - now
+            elif tokens - cost >= reserve:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (reserve + cost - tokens) / self.rate
+
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (name, tokens, updated, blocked_until) VALUES (?, ?, ?, ?)",
+                (self.name, tokens, now, blocked_until),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def _higher_lane_waiting(self, priority: Priority) -> bool:
+        return any(self._waiting[lane] for lane in Priority if lane < priority)
+
+    async def acquire(
+        self,
+        priority: Priority = Priority.INTERACTIVE,
+        max_wait: Optional[float] = None,
+    ) -> None:
+        """
+        Wait until a token is available for the given lane
+
+        Args:
+            priority: Lane of the caller
+            max_wait: Give up after this many seconds (None waits forever)
+
+        Raises:
+            RateLimitExceeded: If no token becomes available within max_wait
+        """
+        deadline = None if max_wait is None else time.monotonic() + max_wait
+        reserve = LANE_RESERVE[priority] * self.capacity
+        self._waiting[priority] += 1
+        try:
+            while True:
+                if self._higher_lane_waiting(priority):
+                    wait = POLL_INTERVAL
+                else:
+                    wait = await asyncio.to_thread(self._update, 1.0, reserve)
+                    if wait == 0:
+                        return
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if wait > remaining:
+                        raise RateLimitExceeded(retry_after=wait)
+                # Sleep in short slices so local lane ordering stays responsive
+                await asyncio.sleep(min(wait, max(POLL_INTERVAL, 1.0 / self.rate)))
+        finally:
+            self._waiting[priority] -= 1
+
+    async def penalize(self, retry_after: float) -> None:
+        """Empty the bucket and block every worker for ``retry_after`` seconds"""
+        await asyncio.to_thread(self._update, 0.0, 0.0, max(retry_after, 0.0))
@@ -0,0 +1,229 @@
+"""
+Upstream response recorder and replay mode
+
+The iNaturalist, PlantNet and Replicate HTTP clients are built with a
+transport from this module. With ``UPSTREAM_RECORD`` set, every upstream
+exchange is appended to a gzip-compressed JSON Lines archive, with API keys
+and tokens redacted. With ``UPSTREAM_REPLAY`` set, nothing leaves the
+process: requests are answered from such an archive after the recorded
+latency (divided by ``UPSTREAM_REPLAY_SPEED``), so ``/api/plants`` and
+``/api/identify`` can be profiled deterministically offline.
+
+Recorded responses are matched on service, method and redacted URL, and
+served in recording order; once a URL's recordings run out, the last one is
+repeated.
+"""
+
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import httpx
+
+RECORD_PATH = os.getenv("UPSTREAM_RECORD")
+REPLAY_PATH = os.getenv("UPSTREAM_REPLAY")
+REPLAY_SPEED = float(os.getenv("UPSTREAM_REPLAY_SPEED", "1.0"))
+
+REDACTED = "REDACTED"
+SECRET_PARAMS = {"api-key", "api_key", "apikey", "key", "token", "access_token"}
+SECRET_HEADERS = {"authorization", "proxy-authorization", "cookie", "set-cookie", "x-api-key"}
+
+# Describe the stored (already decoded) body rather than the original bytes
+DROPPED_RESPONSE_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+def redact_url(url: httpx.URL) -> str:
+    """URL with secret query parameters masked and the rest sorted"""
+    params = sorted(
+        (name, REDACTED if name.lower() in SECRET_PARAMS else value)
+        for name, value in url.params.multi_items()
+    )
+    return str(url.copy_with(params=params or None))
+
+
+def redact_headers(headers: httpx.Headers) -> Dict[str, str]:
+    return {
+        name: REDACTED if name.lower() in SECRET_HEADERS else value
+        for name, value in headers.items()
+    }
+
+
+def request_secrets(request: httpx.Request) -> List[str]:
+    """Secret values sent with a request (so echoes of them can be scrubbed)"""
+    secrets = [value for name, value in request.url.params.multi_items() if name.lower() in SECRET_PARAMS]
+    for name, value in request.headers.items():
+        if name.lower() in SECRET_HEADERS:
+            secrets.append(value)
+            secrets.append(value.split(" ", 1)[-1])  # token without its "Bearer " scheme
+    return [secret for secret in secrets if len(secret) >= 4]
+
+
+def _encode_body(body: bytes, secrets: List[str]) -> Dict[str, str]:
+    try:
+        text = body.decode("utf-8")
+    except UnicodeDecodeError:
+        return {"base64": base64.b64encode(body).decode("ascii")}
+    for secret in secrets:
+        text = text.replace(secret, REDACTED)
+    return {"text": text}
+
+
+def _decode_body(entry: Dict[str, Any]) -> bytes:
+    if "base64" in entry:
+        return base64.b64decode(entry["base64"])
+    return entry.get("text", "").encode("utf-8")
+
+
+class UpstreamArchive:
+    """
+    Gzip JSON Lines archive of upstream exchanges
+
+    Args:
+        path: Archive file
+        mode: "record" (append new exchanges) or "replay" (serve them)
+    """
+
+    def __init__(self, path: str, mode: str):
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._file = None
+        self._exchanges: Dict[Tuple[str, str, str], Deque[Dict[str, Any]]] = {}
+        if mode == "replay":
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._exchanges.setdefault(self._key(entry), deque()).append(entry)
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    @staticmethod
+    def _key(entry: Dict[str, Any]) -> Tuple[str, str, str]:
+        return (entry["service"], entry["request"]["method"], entry["request"]["url"])
+
+    def record(self, service: str, request: httpx.Request, status: int,
+               headers: httpx.Headers, body: bytes, elapsed: float) -> None:
+        """Append one exchange (the request body is stored only as a digest)"""
+        content = request.content if isinstance(request.stream, httpx.ByteStream) else b""
+        entry = {
+            "service": service,
+            "recorded_at": time.time(),
+            "elapsed": round(elapsed, 4),
+            "request": {
+                "method": request.method,
+                "url": redact_url(request.url),
+                "headers": redact_headers(request.headers),
+                "body_sha256": hashlib.sha256(content).hexdigest(),
+                "body_bytes": len(content),
+            },
+            "response": {
+                "status": status,
+                "headers": {
+                    name: value for name, value in redact_headers(headers).items()
+                    if name.lower() not in DROPPED_RESPONSE_HEADERS
+                },
+                **_encode_body(body, request_secrets(request)),
+            },
+        }
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file is None:
+                # Appending adds a new gzip member; readers see one stream
+                self._file = gzip.open(self.path, "at", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+
+    def replay(self, service: str, request: httpx.Request) -> Tuple[httpx.Response, float]:
+        """
+        The next recorded response for a request and its recorded latency
+
+        Raises:
+            httpx.ConnectError: If nothing was recorded for the request
+        """
+        url = redact_url(request.url)
+        with self._lock:
+            queue = self._exchanges.get((service, request.method, url))
+            if not queue:
+                raise httpx.ConnectError(f"No recorded {service} response for {request.method} {url}", request=request)
+            entry = queue.popleft() if len(queue) > 1 else queue[0]
+        recorded = entry["response"]
+        response = httpx.Response(
+            recorded["status"],
+            headers=recorded["headers"],
+            content=_decode_body(recorded),
+            request=request,
+        )
+        delay = entry.get("elapsed", 0.0) / REPLAY_SPEED if REPLAY_SPEED > 0 else 0.0
+        return response, delay
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Async transport that records to or replays from an archive"""
+
+    def __init__(self, service: str, archive: UpstreamArchive, wrapped: Optional[httpx.AsyncBaseTransport] = None):
+        self.service = service
+        self.archive = archive
+        self.wrapped = wrapped or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.archive.replaying:
+            response, delay = self.archive.replay(self.service, request)
+            await asyncio.sleep(delay)
+            return response
+
+        start = time.perf_counter()
+        response = await self.wrapped.handle_async_request(request)
+        body = await response.aread()
+        elapsed = time.perf_counter() - start
+        self.archive.record(self.service, request, response.status_code, response.headers, body, elapsed)
+        return _rebuild(response, body)
+
+    async def aclose(self) -> None:
+        await self.wrapped.aclose()
+
+
+def _rebuild(response: httpx.Response, body: bytes) -> httpx.Response:
+    """A fresh response around the decoded body (the original stream is consumed)"""
+    headers = [(name, value) for name, value in response.headers.multi_items()
+               if name.lower() not in DROPPED_RESPONSE_HEADERS]
+    return httpx.Response(response.status_code, headers=headers, content=body, extensions=response.extensions)
+
+
+def _open_archive() -> Optional[UpstreamArchive]:
+    if REPLAY_PATH:
+        if RECORD_PATH:
+            print("UPSTREAM_RECORD is ignored while UPSTREAM_REPLAY is set")
+        return UpstreamArchive(REPLAY_PATH, "replay")
+    if RECORD_PATH:
+        return UpstreamArchive(RECORD_PATH, "record")
+    return None
+
+
+archive = _open_archive()
+
+
+def upstream_transport(service: str) -> Optional[httpx.AsyncBaseTransport]:
+    """Transport for an async upstream client (None when not recording or replaying)"""
+    return RecordingTransport(service, archive) if archive is not None else None
+
+
+def close_archive() -> None:
+    """Flush the recording (called on application shutdown)"""
+    if archive is not None:
+        archive.close()
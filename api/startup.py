@@ -0,0 +1,110 @@
+"""
+Startup timing
+
+Records how long the API takes to import and become ready, and produces a
+``python -X importtime`` report of ``api.main`` so slow imports show up
+before they reach the container healthcheck's start period.
+"""
+
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+# Modules that must stay out of the cold start path (loaded on first use)
+LAZY_MODULES = ("PIL", "replicate", "requests", "scipy")
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StartupTimer:
+    """Named milestones in milliseconds since this module was imported"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.marks: Dict[str, float] = {}
+
+    def mark(self, name: str) -> None:
+        """Record a milestone; only the first occurrence of a name counts"""
+        self.marks.setdefault(name, round((time.perf_counter() - self.started) * 1000, 1))
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "milestones_ms": dict(self.marks),
+            "loaded_modules": len(sys.modules),
+            "lazy_modules_loaded": {name: name in sys.modules for name in LAZY_MODULES},
+        }
+
+
+def parse_importtime(output: str) -> List[Dict[str, Any]]:
+    """
+    Parse ``-X importtime`` stderr lines into records
+
+    Returns:
+        Dicts with module, depth (0 for imports made by the measured
+        statement itself), self_us and cumulative_us, in import order
+    """
+    records = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # header line
+        name = fields[2][1:]
+        stripped = name.lstrip(" ")
+        records.append({
+            "module": stripped,
+            "depth": (len(name) - len(stripped)) // 2,
+            "self_us": int(fields[0]),
+            "cumulative_us": int(fields[1]),
+        })
+    return records
+
+
+def import_time_report(module: str = "api.main", top: int = 25) -> Dict[str, Any]:
+    """
+    Import ``module`` in a fresh interpreter under ``-X importtime``
+
+    Args:
+        module: Module to import
+        top: Number of slowest imports (by cumulative time) to return
+
+    Returns:
+        Total import time of the top-level imports and the slowest modules
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed: {result.stderr.strip().splitlines()[-1:]}")
+    records = parse_importtime(result.stderr)
+    total_us = sum(record["cumulative_us"] for record in records if record["depth"] == 0)
+    slowest = sorted(records, key=lambda record: record["cumulative_us"], reverse=True)[:top]
+    return {
+        "module": module,
+        "total_ms": round(total_us / 1000, 1),
+        "slowest": [
+            {**record, "cumulative_ms": round(record["cumulative_us"] / 1000, 1)}
+            for record in slowest
+        ],
+    }
+
+
+_import_report: Optional[Dict[str, Any]] = None
+
+
+def cached_import_time_report() -> Dict[str, Any]:
+    """import_time_report() computed once per process (the code does not change while running)"""
+    global _import_report
+    if _import_report is None:
+        _import_report = import_time_report()
+    return _import_report
+
+
+startup_timer = StartupTimer()
@@ -0,0 +1,221 @@
+"""
+Background sync of iNaturalist observations into the local store
+
+Each region keeps a range of synced observation ids. A run first fetches
+what was added above the range since the previous run, then spends the
+rest of its page budget backfilling history below it, newest first, so the
+store starts with recent observations and grows backwards from there. Rows
+go into the columnar observation store, whose listeners keep derived
+aggregates up to date. Requests use the BACKGROUND rate limiter lane so
+they never starve interactive traffic.
+
+After every run the store and the cursors are saved to SYNC_STATE_PATH and
+restored at startup, so a restart resumes where the last run stopped
+instead of fetching the same pages again.
+
+With several workers only one syncs: the one holding an exclusive lock on
+SYNC_LOCK_PATH. The others load its snapshot every interval, and take over
+if the syncing worker exits and releases the lock.
+"""
+
+import asyncio
+import os
+import tempfile
+from typing import IO, Any, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+from .inaturalist import PLACE_IDS, inaturalist_get
+from .observations import observation_store
+from .ratelimit import Priority
+
+SYNC_ENABLED = os.getenv("SYNC_ENABLED", "false").lower() in ("1", "true", "yes")
+SYNC_INTERVAL = float(os.getenv("SYNC_INTERVAL_SECONDS", "3600"))
+SYNC_MAX_PAGES = int(os.getenv("SYNC_MAX_PAGES", "5"))
+SYNC_STATE_PATH = os.getenv("SYNC_STATE_PATH", os.path.join(tempfile.gettempdir(), "nw-plants-sync.npz"))
+SYNC_LOCK_PATH = f"{SYNC_STATE_PATH}.lock"
+SYNC_PAGE_SIZE = 200
+
+# Value of ``oldest`` once a region's history has been backfilled completely
+BACKFILL_DONE = -1
+
+# Synced observation id range per region (0 = nothing synced yet)
+newest: Dict[str, int] = {region: 0 for region in PLACE_IDS}
+oldest: Dict[str, int] = {region: 0 for region in PLACE_IDS}
+
+# Open lock file while this process is the one that syncs
+_lock_file: Optional[IO] = None
+
+
+async def fetch_page(region: str, **params: Any) -> List[Dict[str, Any]]:
+    """One page of research-grade native plant observations ordered by id"""
+    response = await inaturalist_get(
+        "/observations",
+        params={
+            "place_id": PLACE_IDS[region],
+            "taxon_id": 47126,  # Plantae (Plants)
+            "quality_grade": "research",
+            "native": True,
+            "per_page": SYNC_PAGE_SIZE,
+            "order_by": "id",
+            **params
+        },
+        priority=Priority.BACKGROUND
+    )
+    response.raise_for_status()
+    return response.json().get("results", [])
+
+
+async def sync_region(region: str, max_pages: int = SYNC_MAX_PAGES) -> int:
+    """
+    Fetch new observations, then backfill older ones, into the local store
+
+    New observations are fetched in ascending id order so the synced range
+    never has a gap, even when the page budget runs out.
+
+    Args:
+        region: Key of PLACE_IDS
+        max_pages: Upper bound on upstream pages fetched in this run
+
+    Returns:
+        Number of rows added to the store
+    """
+    added = 0
+    pages = 0
+
+    while newest[region] and pages < max_pages:
+        observations = await fetch_page(region, order="asc", id_above=newest[region])
+        pages += 1
+        if not observations:
+            break
+        added += observation_store.append_records(observations, region=region)
+        newest[region] = max(obs["id"] for obs in observations)
+        if len(observations) < SYNC_PAGE_SIZE:
+            break
+
+    while oldest[region] != BACKFILL_DONE and pages < max_pages:
+        params = {"order": "desc"}
+        if oldest[region]:
+            params["id_below"] = oldest[region]
+        observations = await fetch_page(region, **params)
+        pages += 1
+        if observations:
+            added += observation_store.append_records(observations, region=region)
+            ids = [obs["id"] for obs in observations]
+            newest[region] = max(newest[region], max(ids))
+            oldest[region] = min(ids)
+        if len(observations) < SYNC_PAGE_SIZE:
+            oldest[region] = BACKFILL_DONE
+    return added
+
+
+def _load_snapshot(path: str) -> Optional[Dict[str, np.ndarray]]:
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as snapshot:
+        return {name: snapshot[name] for name in snapshot.files}
+
+
+async def load_state(path: str = SYNC_STATE_PATH) -> int:
+    """
+    Restore the store and cursors saved by a previous run
+
+    Returns:
+        Number of rows restored into the store
+    """
+    try:
+        snapshot = await asyncio.to_thread(_load_snapshot, path)
+    except Exception as e:
+        print(f"Sync state at {path} not loaded: {e}")
+        return 0
+    if snapshot is None:
+        return 0
+    restored = observation_store.load(snapshot)
+    for region, newest_id, oldest_id in zip(
+        snapshot["cursor_regions"].tolist(), snapshot["cursor_newest"].tolist(), snapshot["cursor_oldest"].tolist()
+    ):
+        if region in PLACE_IDS:
+            newest[region] = newest_id
+            oldest[region] = oldest_id
+    return restored
+
+
+async def save_state(path: str = SYNC_STATE_PATH) -> None:
+    """Save the store and cursors so the next process can resume"""
+    regions = list(PLACE_IDS)
+    cursors = {
+        "cursor_regions": np.array(regions, dtype=str),
+        "cursor_newest": np.array([newest[region] for region in regions], dtype=np.int64),
+        "cursor_oldest": np.array([oldest[region] for region in regions], dtype=np.int64),
+    }
+    try:
+        # A view keeps the rows stored so far even if appends continue meanwhile
+        await asyncio.to_thread(observation_store[:].save, path, **cursors)
+    except OSError as e:
+        print(f"Sync state not saved to {path}: {e}")
+
+
+def try_sync_lock(path: str = SYNC_LOCK_PATH) -> bool:
+    """
+    Try to become the one process that syncs
+
+    Takes an exclusive, non-blocking flock on ``path`` and keeps it for the
+    life of the process; the OS releases it if the process dies.
+
+    Returns:
+        True if this process holds the lock (or locking is unavailable)
+    """
+    global _lock_file
+    if _lock_file is not None or fcntl is None:
+        return True
+    try:
+        lock_file = open(path, "a")
+    except OSError as e:
+        print(f"Sync lock {path} not created, syncing without it: {e}")
+        return True
+    try:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _lock_file = lock_file
+    return True
+
+
+async def sync_all() -> Dict[str, int]:
+    """Run one sync pass over every region, returning rows added per region"""
+    added = {}
+    for region in PLACE_IDS:
+        try:
+            added[region] = await sync_region(region)
+        except Exception as e:
+            print(f"Sync failed for {region}: {e}")
+            added[region] = 0
+    return added
+
+
+async def run_sync_loop(interval: float = SYNC_INTERVAL) -> None:
+    """
+    Sync all regions forever, sleeping ``interval`` seconds between passes
+
+    Workers that do not hold the sync lock only reload the snapshot saved by
+    the one that does, once per ``interval``.
+    """
+    restored = await load_state()
+    if restored:
+        print(f"Restored {restored} synced observations from {SYNC_STATE_PATH}")
+    while not try_sync_lock():
+        await asyncio.sleep(interval)
+        restored = await load_state()
+        if restored:
+            print(f"Loaded {restored} observations synced by another worker")
+    while True:
+        added = await sync_all()
+        await save_state()
+        print(f"Observation sync added {sum(added.values())} rows ({len(observation_store)} stored)")
+        await asyncio.sleep(interval)
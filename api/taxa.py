@@ -0,0 +1,206 @@
+"""
+Local taxon name search index
+
+Scientific and common names of PNW native taxa are indexed in memory so
+the search box can autocomplete without an iNaturalist round trip per
+keystroke. Prefix matches use a sorted key list (binary search); typos are
+handled by a trigram inverted index. Exact name matches are also used to
+turn a free-text ``taxon`` into an iNaturalist ``taxon_id`` filter.
+"""
+
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from .inaturalist import PLACE_IDS, inaturalist_get
+from .observations import ObservationTable
+from .ratelimit import Priority
+
+# Minimum share of query trigrams a fuzzy match must contain
+FUZZY_THRESHOLD = 0.4
+
+# Prefix matches examined before ranking (bounds work for 1-letter queries)
+MAX_PREFIX_SCAN = 500
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(name: str) -> str:
+    """Lowercase, strip accents and collapse punctuation to single spaces"""
+    decomposed = unicodedata.normalize("NFKD", name)
+    ascii_name = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", ascii_name.lower()).strip()
+
+
+def trigrams(text: str) -> Set[str]:
+    """Padded character trigrams of a normalized string"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TaxonEntry:
+    """One indexed taxon"""
+    __slots__ = ("taxon_id", "scientific_name", "common_name", "rank", "weight")
+
+    def __init__(self, taxon_id: int, scientific_name: str, common_name: Optional[str],
+                 rank: Optional[str], weight: int):
+        self.taxon_id = taxon_id
+        self.scientific_name = scientific_name
+        self.common_name = common_name
+        self.rank = rank
+        self.weight = weight
+
+    def to_dict(self) -> Dict:
+        return {
+            "taxon_id": self.taxon_id,
+            "scientific_name": self.scientific_name,
+            "common_name": self.common_name,
+            "rank": self.rank,
+        }
+
+
+class TaxonIndex:
+    """In-memory prefix + trigram index over taxon names"""
+
+    def __init__(self):
+        self.entries: Dict[int, TaxonEntry] = {}
+        self._keys: List[Tuple[str, int]] = []
+        self._trigrams: Dict[str, List[int]] = defaultdict(list)
+        self._exact: Dict[str, Set[int]] = defaultdict(set)
+        self._store_taxa = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, taxon_id: int, scientific_name: str, common_name: Optional[str] = None,
+            rank: Optional[str] = None, weight: int = 0) -> None:
+        """Index a taxon (re-adding only raises its ranking weight)"""
+        if not taxon_id or not scientific_name:
+            return
+        existing = self.entries.get(taxon_id)
+        if existing is not None:
+            existing.weight = max(existing.weight, weight)
+            return
+
+        self.entries[taxon_id] = TaxonEntry(taxon_id, scientific_name, common_name, rank, weight)
+        grams: Set[str] = set()
+        for name in (scientific_name, common_name):
+            if not name:
+                continue
+            normalized = normalize(name)
+            if not normalized:
+                continue
+            self._exact[normalized].add(taxon_id)
+            # Every word start is a key, so "fir" finds "douglas fir"
+            words = normalized.split(" ")
+            for i in range(len(words)):
+                insort(self._keys, (" ".join(words[i:]), taxon_id))
+            grams |= trigrams(normalized)
+        for gram in grams:
+            self._trigrams[gram].append(taxon_id)
+
+    def add_from_store(self, rows: ObservationTable) -> None:
+        """Index taxa first seen in a batch of stored observations"""
+        taxa = rows.taxa
+        for code in range(self._store_taxa, len(taxa)):
+            self.add(taxa.taxon_ids[code], taxa.scientific_names[code],
+                     taxa.common_names[code], taxa.ranks[code])
+        self._store_taxa = len(taxa)
+
+    def attach(self, store: ObservationTable) -> None:
+        """Index the taxa already in ``store`` and follow future appends"""
+        self.add_from_store(store)
+        store.add_listener(self.add_from_store)
+
+    def resolve(self, query: str) -> Optional[int]:
+        """Return the taxon id whose name exactly matches ``query``, if unambiguous"""
+        matches = self._exact.get(normalize(query), set())
+        return next(iter(matches)) if len(matches) == 1 else None
+
+    def _prefix_matches(self, query: str) -> List[int]:
+        start = bisect_left(self._keys, (query, 0))
+        found: Dict[int, None] = {}
+        for key, taxon_id in self._keys[start:start + MAX_PREFIX_SCAN]:
+            if not key.startswith(query):
+                break
+            found[taxon_id] = None
+        return list(found)
+
+    def _fuzzy_matches(self, query: str) -> List[Tuple[float, int]]:
+        query_grams = trigrams(query)
+        hits: Dict[int, int] = defaultdict(int)
+        for gram in query_grams:
+            for taxon_id in self._trigrams.get(gram, ()):
+                hits[taxon_id] += 1
+        needed = FUZZY_THRESHOLD * len(query_grams)
+        return [(count / len(query_grams), taxon_id)
+                for taxon_id, count in hits.items() if count >= needed]
+
+    def suggest(self, query: str, limit: int = 10) -> List[TaxonEntry]:
+        """
+        Autocomplete a partial name
+
+        Prefix matches come first, ordered by weight; remaining slots are
+        filled with typo-tolerant trigram matches ordered by similarity.
+        """
+        normalized = normalize(query)
+        if not normalized:
+            return []
+
+        prefix = self._prefix_matches(normalized)
+        prefix.sort(key=lambda taxon_id: -self.entries[taxon_id].weight)
+        results = prefix[:limit]
+
+        if len(results) < limit:
+            seen = set(results)
+            fuzzy = [
+                (score, taxon_id) for score, taxon_id in self._fuzzy_matches(normalized)
+                if taxon_id not in seen
+            ]
+            fuzzy.sort(key=lambda item: (-item[0], -self.entries[item[1]].weight))
+            results.extend(taxon_id for _, taxon_id in fuzzy[:limit - len(results)])
+
+        return [self.entries[taxon_id] for taxon_id in results]
+
+
+async def prefetch_taxa(pages: int = 2) -> int:
+    """
+    Seed the index with the most observed native plant taxa of each region
+
+    Uses the PREFETCH rate limiter lane, so it only consumes spare budget.
+
+    Returns:
+        Number of taxa in the index afterwards
+    """
+    for region, place_id in PLACE_IDS.items():
+        for page in range(1, pages + 1):
+            try:
+                response = await inaturalist_get(
+                    "/observations/species_counts",
+                    params={
+                        "place_id": place_id,
+                        "taxon_id": 47126,  # Plantae (Plants)
+                        "quality_grade": "research",
+                        "native": True,
+                        "per_page": 500,
+                        "page": page
+                    },
+                    priority=Priority.PREFETCH
+                )
+                response.raise_for_status()
+            except Exception as e:
+                print(f"Taxon prefetch failed for {region}: {e}")
+                break
+            results = response.json().get("results", [])
+            for item in results:
+                taxon = item.get("taxon", {})
+                taxon_index.add(taxon.get("id"), taxon.get("name"), taxon.get("preferred_common_name"),
+                                taxon.get("rank"), item.get("count", 0))
+            if len(results) < 500:
+                break
+    return len(taxon_index)
+
+
+taxon_index = TaxonIndex()
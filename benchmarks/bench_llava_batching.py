@@ -0,0 +1,82 @@
+"""
+Benchmark for the LLaVA micro-batching scheduler
+Drives MicroBatcher over the real ``run_llava_batch`` with LLAVA_BACKEND=stub,
+where every image is its own prediction taking LLAVA_STUB_SECONDS, like
+independent Replicate predictions. Nothing is amortized by batching, so
+this compares what the batch settings do change: added latency, peak
+predictions in flight and, with a cap, queueing behind it
+
+Run from the repository root: python benchmarks/bench_llava_batching.py
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["LLAVA_BACKEND"] = "stub"
+os.environ.setdefault("LLAVA_STUB_SECONDS", "0.5")
+
+from api.batching import MicroBatcher, percentile
+from api.identification import LLAVA_STUB_SECONDS, run_llava_batch
+
+REQUESTS = 64
+ARRIVALS_PER_SECOND = 40
+
+
+async def run(max_batch_size, max_wait, max_in_flight):
+    batcher = MicroBatcher(run_llava_batch, max_batch_size=max_batch_size, max_wait=max_wait,
+                           max_in_flight=max_in_flight)
+    rng = random.Random(13)
+    latencies = []
+
+    async def request(i):
+        start = time.perf_counter()
+        output = await batcher.submit(f"data:image/jpeg;base64,{i}")
+        assert output.answer is not None
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    tasks = []
+    for i in range(REQUESTS):
+        tasks.append(asyncio.create_task(request(i)))
+        await asyncio.sleep(rng.expovariate(ARRIVALS_PER_SECOND))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    metrics = batcher.metrics()
+    await batcher.close()
+    return elapsed, latencies, metrics
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print(f"LLaVA Micro-batching Benchmark ({REQUESTS} requests, {ARRIVALS_PER_SECOND}/s)")
+    print("=" * 60)
+    print(f"\nStub backend: {LLAVA_STUB_SECONDS * 1000:.0f} ms per prediction, one prediction per image")
+    print(f"\n{'batch':>5} {'wait':>6} {'cap':>5} {'total':>8} {'p50':>8} {'p95':>8} {'added p95':>10} "
+          f"{'mean size':>10} {'peak':>5}")
+
+    results = {}
+    for max_batch_size, max_wait, max_in_flight in [
+        (1, 0.0, None), (8, 0.05, None), (16, 0.1, None), (8, 0.05, 8), (4, 0.05, 4),
+    ]:
+        elapsed, latencies, metrics = asyncio.run(run(max_batch_size, max_wait, max_in_flight))
+        results[(max_batch_size, max_in_flight)] = (latencies, metrics)
+        print(f"{max_batch_size:>5} {max_wait * 1000:>4.0f}ms {str(max_in_flight or '-'):>5} {elapsed:>7.2f}s "
+              f"{percentile(latencies, 0.5) * 1000:>6.0f}ms {percentile(latencies, 0.95) * 1000:>6.0f}ms "
+              f"{metrics['added_latency_ms']['p95']:>8.0f}ms {metrics['mean_batch_size']:>10.2f} "
+              f"{metrics['peak_in_flight_items']:>5}")
+
+    # Batching does not make predictions faster: without a cap, unbatched
+    # requests finish no later than batched ones
+    unbatched, _ = results[(1, None)]
+    batched, _ = results[(8, None)]
+    assert percentile(unbatched, 0.5) <= percentile(batched, 0.5)
+    # The cap bounds concurrent predictions
+    for cap in (8, 4):
+        _, metrics = results[(cap, cap)]
+        assert metrics["peak_in_flight_items"] <= cap
+    print("\n✓ Benchmark complete")
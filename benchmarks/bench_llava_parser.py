@@ -0,0 +1,139 @@
+"""
+Benchmark and fuzz corpus for the LLaVA answer parser
+Checks every output in data/llava_outputs.jsonl (streamed in random token
+splits), fuzzes the parser with truncated and corrupted outputs, and times
+it against the previous greedy-regex parse
+
+Run from the repository root: python benchmarks/bench_llava_parser.py
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from api.llava_parser import parse_stream, parse_text, to_matches
+
+CORPUS = os.path.join(ROOT, "benchmarks", "data", "llava_outputs.jsonl")
+SPLITS_PER_OUTPUT = 200
+FUZZ_CASES = 5000
+REPEATS = 2000
+
+
+def load_corpus():
+    with open(CORPUS) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def tokens(text, rng):
+    """Split text like a streamed model response (1-6 characters per token)"""
+    parts, i = [], 0
+    while i < len(text):
+        n = rng.randint(1, 6)
+        parts.append(text[i:i + n])
+        i += n
+    return parts
+
+
+async def async_tokens(parts, consumed):
+    for part in parts:
+        consumed.append(part)
+        yield part
+
+
+def legacy_parse(response_text):
+    """The previous inline parse: greedy regex over the whole output"""
+    json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+    if not json_match:
+        return None
+    try:
+        plant_data = json.loads(json_match.group())
+        conf_str = str(plant_data.get('confidence', '75'))
+        conf_value = float(re.search(r'\d+', conf_str).group()) / 100 if '%' in conf_str else float(conf_str)
+        if conf_value > 1.0:
+            conf_value = conf_value / 100
+        return plant_data.get('species', 'Unknown'), conf_value
+    except Exception:
+        return None
+
+
+def check(case, output):
+    if case["species"] is None:
+        assert output.answer is None, (case["name"], output.answer)
+    else:
+        assert output.answer is not None, (case["name"], output.error)
+        assert output.answer.species == case["species"], case["name"]
+        assert abs(output.answer.confidence - case["confidence"]) < 1e-9, (case["name"], output.answer.confidence)
+    matches = to_matches(output)
+    assert matches and all(0.0 <= match.confidence <= 1.0 for match in matches)
+
+
+async def main():
+    corpus = load_corpus()
+    rng = random.Random(17)
+
+    print("=" * 60)
+    print(f"LLaVA Parser Benchmark ({len(corpus)} corpus outputs)")
+    print("=" * 60)
+
+    # Correctness, whole and streamed in random token splits
+    legacy_correct = 0
+    consumed_chars = total_chars = 0
+    for case in corpus:
+        check(case, parse_text(case["output"]))
+        for _ in range(SPLITS_PER_OUTPUT):
+            consumed = []
+            check(case, await parse_stream(async_tokens(tokens(case["output"], rng), consumed)))
+        consumed_chars += sum(map(len, consumed))
+        total_chars += len(case["output"])
+        legacy = legacy_parse(case["output"])
+        expected = (case["species"], case["confidence"]) if case["species"] else None
+        if legacy == expected or (legacy and expected and legacy[0] == expected[0]
+                                  and abs(legacy[1] - expected[1]) < 1e-9):
+            legacy_correct += 1
+    print(f"\nCorpus: {len(corpus)}/{len(corpus)} correct "
+          f"(previous regex parse: {legacy_correct}/{len(corpus)})")
+    print(f"Streamed output consumed before stopping: {consumed_chars / total_chars:.0%} of characters")
+
+    # Fuzz: truncations, deletions and injected braces/quotes must never raise
+    noise = ['{', '}', '"', '\\', '[', ']', ',', ':', '%', '\n']
+    for _ in range(FUZZ_CASES):
+        text = rng.choice(corpus)["output"]
+        mutation = rng.randrange(3)
+        if mutation == 0:
+            text = text[:rng.randrange(len(text) + 1)]
+        elif mutation == 1:
+            i = rng.randrange(len(text) + 1)
+            text = text[:i] + "".join(rng.choice(noise) for _ in range(rng.randint(1, 4))) + text[i:]
+        else:
+            i = rng.randrange(len(text))
+            text = text[:i] + text[i + rng.randint(1, 10):]
+        whole = parse_text(text)
+        streamed = await parse_stream(tokens(text, rng))
+        assert whole.answer == streamed.answer
+        to_matches(whole)
+    print(f"Fuzz: {FUZZ_CASES} mutated outputs parsed without errors")
+
+    texts = [case["output"] for case in corpus]
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        for text in texts:
+            parse_text(text)
+    parser_us = (time.perf_counter() - start) / (REPEATS * len(texts)) * 1e6
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        for text in texts:
+            legacy_parse(text)
+    legacy_us = (time.perf_counter() - start) / (REPEATS * len(texts)) * 1e6
+    print(f"\nMean parse time: {parser_us:6.1f} us (previous regex parse: {legacy_us:6.1f} us)")
+    print("\n✓ Benchmark complete")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
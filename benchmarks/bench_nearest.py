@@ -0,0 +1,86 @@
+"""
+Benchmark for the "plants near me" spatial index
+Times index builds and K=50 nearest-species queries over 1M observations,
+and checks results against a brute-force haversine scan
+
+Run from the repository root: python benchmarks/bench_nearest.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.nearby import EARTH_RADIUS_KM, SpatialIndex
+from api.observations import COLUMNS
+from bench_observation_table import build_table
+
+ROWS = 1_000_000
+QUERIES = 200
+K = 50
+# Store holding fewer species than K (typical before sync has run)
+FEW_TAXA = 40
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print(f"Nearest Species Benchmark ({ROWS:,} observations, K={K})")
+    print("=" * 60)
+
+    table = build_table(ROWS)
+    index = SpatialIndex(table)
+
+    start = time.perf_counter()
+    index.attach()
+    index.rebuild_now()
+    print(f"\nBuild KD-tree: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    rng = np.random.default_rng(3)
+    points = np.column_stack((rng.uniform(43.0, 48.5, QUERIES), rng.uniform(-124.0, -117.0, QUERIES)))
+
+    start = time.perf_counter()
+    for lat, lon in points:
+        index.nearest_species(lat, lon, k=K)
+    per_query = (time.perf_counter() - start) / QUERIES * 1000
+    print(f"K={K} query (indexed):        {per_query:8.2f} ms")
+
+    # Append 50k rows that stay in the delta buffer until the next rebuild
+    delta = build_table(50_000)
+    index._rebuilding = True  # hold the background rebuild for this measurement
+    table.append_arrays(**{name: delta.column(name) for name in COLUMNS})
+    start = time.perf_counter()
+    for lat, lon in points:
+        index.nearest_species(lat, lon, k=K)
+    per_query = (time.perf_counter() - start) / QUERIES * 1000
+    print(f"K={K} query (+50k delta rows): {per_query:8.2f} ms")
+    index._rebuilding = False
+
+    # Verify the closest observation of the top species against brute force
+    lat, lon = points[0]
+    result = index.nearest_species(lat, lon, k=K)
+    brute = haversine_km(lat, lon, table.column("latitude"), table.column("longitude"))
+    nearest = result["results"][0]
+    assert abs(nearest["distance_km"] - brute[table.column("id") == nearest["observation_id"]][0]) < 1e-3
+    assert len(result["results"]) == K
+
+    few = build_table(ROWS)
+    few.column("taxon")[:] %= FEW_TAXA
+    few_index = SpatialIndex(few)
+    few_index.attach()
+    few_index.rebuild_now()
+    start = time.perf_counter()
+    for lat, lon in points:
+        result = few_index.nearest_species(lat, lon, k=K)
+    per_query = (time.perf_counter() - start) / QUERIES * 1000
+    print(f"K={K} query ({FEW_TAXA} species):     {per_query:8.2f} ms")
+    assert len(result["results"]) == FEW_TAXA
+    print("\n✓ Benchmark complete")
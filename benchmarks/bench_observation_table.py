@@ -0,0 +1,126 @@
+"""
+Benchmark for the columnar observation table
+Compares memory against lists of PlantObservation objects and times
+filtering, slicing and response conversion at 1M rows
+
+Run from the repository root: python benchmarks/bench_observation_table.py
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.climate import climate_zone_codes, matching_zone_codes
+from api.models import PlantObservation
+from api.observations import COLUMNS, ObservationTable
+
+ROWS = 1_000_000
+TAXA = 5_000
+PLACES = 20_000
+
+
+def timed(func, repeat=5):
+    """Return (result, best time in milliseconds) over several runs"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return result, best
+
+
+def build_table(rows):
+    """Build a table of synthetic PNW observations"""
+    rng = np.random.default_rng(42)
+    table = ObservationTable(capacity=rows)
+    for taxon_id in range(TAXA):
+        table.taxa.encode(taxon_id + 1, f"Genus species{taxon_id}", f"Common plant {taxon_id}", "species")
+    for place in range(PLACES):
+        table.places.encode(f"Somewhere {place}, WA, USA")
+    table.qualities.encode("research")
+    table.photo_templates.encode("https://inaturalist-open-data.s3.amazonaws.com/photos/{}/medium.jpg")
+
+    lat = rng.uniform(42.0, 49.0, rows)
+    lon = rng.uniform(-124.5, -116.5, rows)
+    table.append_arrays(
+        id=np.arange(rows, dtype=np.int64) + 1,
+        latitude=lat,
+        longitude=lon,
+        observed=np.datetime64("2015-01-01") + rng.integers(0, 3650, rows).astype("timedelta64[D]"),
+        zone=climate_zone_codes(lon, lat),
+        region=rng.integers(0, 4, rows, dtype=np.uint8),
+        taxon=rng.integers(0, TAXA, rows, dtype=np.int32),
+        place=rng.integers(0, PLACES, rows, dtype=np.int32),
+        quality=np.zeros(rows, dtype=np.uint8),
+        photo_id=rng.integers(1, 400_000_000, rows, dtype=np.int64),
+        photo_template=np.zeros(rows, dtype=np.int32),
+    )
+    return table
+
+
+def measure_object_bytes(table, sample=20_000):
+    """Measure bytes per row when the same rows are held as PlantObservation objects"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = table[:sample].to_observations()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return (after - before) / sample
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print(f"Columnar Observation Table Benchmark ({ROWS:,} rows)")
+    print("=" * 60)
+
+    table, build_ms = timed(lambda: build_table(ROWS), repeat=1)
+    column_bytes = table.nbytes / ROWS
+    object_bytes = measure_object_bytes(table)
+
+    print("\nMemory:")
+    print(f"  Columnar table:      {table.nbytes / 1e6:8.1f} MB ({column_bytes:.0f} bytes/row, "
+          f"{len(COLUMNS)} columns)")
+    print(f"  PlantObservation:    {object_bytes * ROWS / 1e6:8.1f} MB ({object_bytes:.0f} bytes/row, extrapolated)")
+    print(f"  Reduction:           {object_bytes / column_bytes:8.1f}x")
+
+    zones = matching_zone_codes("puget-sound")
+    taxon_id = 42
+
+    print("\nTimings (best of 5):")
+    print(f"  Build 1M rows:                    {build_ms:8.2f} ms")
+    _, ms = timed(lambda: table.mask(zone_codes=zones))
+    print(f"  Mask by climate zone:             {ms:8.2f} ms")
+    _, ms = timed(lambda: table.mask(region="oregon", start="2020-01-01", end="2020-12-31"))
+    print(f"  Mask by region + date range:      {ms:8.2f} ms")
+    mask, ms = timed(lambda: table.mask(taxon_id=taxon_id, zone_codes=zones))
+    print(f"  Mask by taxon + zone:             {ms:8.2f} ms ({mask.sum():,} rows)")
+    subset, ms = timed(lambda: table.filter(mask))
+    print(f"  Filter (copy selected rows):      {ms:8.2f} ms")
+    view, ms = timed(lambda: table[250_000:750_000])
+    print(f"  Slice 500k rows (zero-copy view): {ms:8.3f} ms "
+          f"(shares memory: {np.shares_memory(view.column('id'), table.column('id'))})")
+    _, ms = timed(lambda: table[:200].to_observations())
+    print(f"  to_observations(200):             {ms:8.2f} ms")
+
+    _, ms = timed(lambda: table.contains_ids(np.arange(1, 201)), repeat=1)
+    print(f"  Build id index (first lookup):    {ms:8.2f} ms")
+    batches = iter(range(ROWS + 1, ROWS + 1_000_000, 100))
+
+    def append_batch():
+        first = next(batches)
+        # Half of the batch is already stored, half is new
+        ids = list(range(first - 100, first + 100))
+        return table.append_records({"id": i, "location": "47.6,-122.3", "observed_on": "2024-05-01"} for i in ids)
+
+    added, ms = timed(append_batch, repeat=20)
+    print(f"  append_records(200) with dedup:   {ms:8.2f} ms ({added} new)")
+
+    assert isinstance(subset.to_observations(limit=1)[0], PlantObservation)
+    print("\n✓ Benchmark complete")
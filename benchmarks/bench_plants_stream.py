@@ -0,0 +1,109 @@
+"""
+Benchmark for streamed /api/plants parsing and response compression
+Compares parsing a 200-observation iNaturalist page incrementally (first
+result available after the first chunk) with json.loads on the full body,
+and reports response sizes under gzip and brotli
+
+Run from the repository root: python benchmarks/bench_plants_stream.py
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.compression import _Compressor, brotli
+from api.jsonstream import ArrayItemScanner
+from api.observations import plant_observation
+
+OBSERVATIONS = 200
+CHUNK_BYTES = 16 * 1024
+REPEATS = 50
+
+
+def upstream_page(rng):
+    results = []
+    for i in range(OBSERVATIONS):
+        results.append({
+            "id": 250_000_000 - i,
+            "location": f"{rng.uniform(42, 49):.6f},{rng.uniform(-124.5, -116.5):.6f}",
+            "observed_on": "2024-05-01",
+            "place_guess": "Mount Rainier National Park, Pierce County, WA, USA",
+            "quality_grade": "research",
+            "taxon": {
+                "id": rng.randint(40_000, 900_000),
+                "name": "Polystichum munitum",
+                "preferred_common_name": "Western Sword Fern",
+                "rank": "species",
+                "ancestor_ids": list(range(48460, 48460 + 30)),
+            },
+            "photos": [{"id": 1000 + i, "url": f"https://inaturalist-open-data.s3.amazonaws.com/photos/{1000 + i}/square.jpg",
+                        "attribution": "(c) someone, some rights reserved (CC BY-NC)"}],
+            "description": "x" * rng.randint(0, 800),
+        })
+    return json.dumps({"total_results": 123456, "page": 1, "per_page": OBSERVATIONS, "results": results})
+
+
+def chunks(text):
+    return [text[i:i + CHUNK_BYTES] for i in range(0, len(text), CHUNK_BYTES)]
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print(f"Streamed Plants Benchmark ({OBSERVATIONS} observations per page)")
+    print("=" * 60)
+
+    body = upstream_page(random.Random(5))
+    parts = chunks(body)
+    print(f"\nUpstream page: {len(body) / 1024:.0f} KB in {len(parts)} chunks of {CHUNK_BYTES // 1024} KB")
+
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        full = json.loads(body)["results"]
+    buffered = (time.perf_counter() - start) / REPEATS * 1000
+
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        scanner = ArrayItemScanner("results")
+        items = []
+        for part in parts:
+            items.extend(scanner.feed(part))
+        items.extend(scanner.close())
+    streamed = (time.perf_counter() - start) / REPEATS * 1000
+
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        scanner = ArrayItemScanner("results")
+        first = []
+        for part in parts:
+            first = scanner.feed(part)
+            if first:
+                break
+    first_item = (time.perf_counter() - start) / REPEATS * 1000
+    assert items == full
+
+    print("\nParse time:")
+    print(f"  json.loads (whole body):       {buffered:6.2f} ms")
+    print(f"  ArrayItemScanner (all items):  {streamed:6.2f} ms")
+    print(f"  ArrayItemScanner (first item): {first_item:6.2f} ms after 1 chunk")
+
+    ndjson = "".join(plant_observation(obs).model_dump_json() + "\n" for obs in full).encode()
+    print(f"\nNDJSON response: {len(ndjson) / 1024:.0f} KB")
+    encodings = ["gzip"] + (["br"] if brotli is not None else [])
+    for encoding in encodings:
+        start = time.perf_counter()
+        whole = _Compressor(encoding).compress(ndjson, final=True)
+        whole_ms = (time.perf_counter() - start) * 1000
+        compressor = _Compressor(encoding)
+        lines = ndjson.splitlines(keepends=True)
+        per_line = sum(len(compressor.compress(line, final=False)) for line in lines[:-1])
+        per_line += len(compressor.compress(lines[-1], final=True))
+        print(f"  {encoding:4s} whole body: {len(whole) / 1024:6.1f} KB ({whole_ms:.1f} ms), "
+              f"flushed per line: {per_line / 1024:6.1f} KB")
+    if brotli is None:
+        print("  (install brotli to compare br)")
+
+    print("\n✓ Benchmark complete")
@@ -0,0 +1,63 @@
+"""
+Benchmark for API cold start
+Times `import api.main` in fresh interpreters, prints the slowest imports
+(python -X importtime) and asserts the import budget and that the heavy
+identification dependencies stay lazy
+
+Run from the repository root: python benchmarks/bench_startup.py
+Override the budget with IMPORT_BUDGET_MS=...
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from api.startup import LAZY_MODULES, import_time_report
+
+RUNS = 5
+
+# Cumulative -X importtime budget for `import api.main`
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "600"))
+
+CHECK_LAZY = (
+    "import sys, json; import api.main; "
+    f"print(json.dumps([name for name in {LAZY_MODULES!r} if name in sys.modules]))"
+)
+
+
+def time_cold_import():
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", "import api.main"], cwd=ROOT, capture_output=True, text=True)
+    elapsed = (time.perf_counter() - start) * 1000
+    assert result.returncode == 0, result.stderr
+    return elapsed
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Startup Benchmark (import api.main)")
+    print("=" * 60)
+
+    timings = sorted(time_cold_import() for _ in range(RUNS))
+    print(f"\nInterpreter + import, best of {RUNS}: {timings[0]:8.0f} ms")
+    print(f"Interpreter + import, median:     {timings[RUNS // 2]:8.0f} ms")
+
+    report = import_time_report(top=10)
+    print(f"\n-X importtime total: {report['total_ms']:.0f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)")
+    print("\nSlowest imports (cumulative):")
+    for record in report["slowest"]:
+        print(f"  {record['cumulative_ms']:8.1f} ms  {'  ' * record['depth']}{record['module']}")
+
+    result = subprocess.run([sys.executable, "-c", CHECK_LAZY], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    eager = json.loads(result.stdout.strip().splitlines()[-1])
+    print(f"\nLazy modules loaded at import: {eager or 'none'}")
+
+    assert not eager, f"{eager} imported by api.main; load them on first use instead"
+    assert report["total_ms"] <= IMPORT_BUDGET_MS, f"import api.main took {report['total_ms']:.0f} ms"
+    print("\n✓ Benchmark complete")
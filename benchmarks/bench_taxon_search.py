@@ -0,0 +1,83 @@
+"""
+Benchmark for the local taxon name search index
+Times autocomplete lookups (prefix and typo-tolerant) over 20k taxa
+
+Run from the repository root: python benchmarks/bench_taxon_search.py
+"""
+
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.taxa import TaxonIndex
+
+TAXA = 20_000
+LOOKUPS = 2_000
+
+KNOWN = [
+    (48256, "Pseudotsuga menziesii", "Douglas-fir"),
+    (47375, "Thuja plicata", "Western Red Cedar"),
+    (54779, "Polystichum munitum", "Western Sword Fern"),
+    (49004, "Acer macrophyllum", "Bigleaf Maple"),
+    (50874, "Mahonia aquifolium", "Tall Oregon-grape"),
+]
+
+
+def random_word(rng, length):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(length))
+
+
+def build_index():
+    rng = random.Random(7)
+    index = TaxonIndex()
+    for taxon_id, scientific, common in KNOWN:
+        index.add(taxon_id, scientific, common, "species", weight=10_000)
+    for taxon_id in range(1, TAXA + 1):
+        genus = random_word(rng, rng.randint(5, 10)).capitalize()
+        species = random_word(rng, rng.randint(6, 12))
+        common = f"{random_word(rng, rng.randint(4, 8))} {random_word(rng, rng.randint(4, 8))}"
+        index.add(1_000_000 + taxon_id, f"{genus} {species}", common, "species", weight=rng.randint(1, 5000))
+    return index
+
+
+def time_queries(index, queries):
+    start = time.perf_counter()
+    for query in queries:
+        index.suggest(query)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print(f"Taxon Search Index Benchmark ({TAXA:,} taxa)")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    index = build_index()
+    print(f"\nBuild index: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    rng = random.Random(11)
+    names = [entry.scientific_name for entry in index.entries.values()]
+    prefixes = [rng.choice(names)[:rng.randint(2, 6)].lower() for _ in range(LOOKUPS)]
+    typos = []
+    for _ in range(LOOKUPS):
+        name = rng.choice(names).lower()
+        i = rng.randrange(len(name))
+        typos.append(name[:i] + rng.choice(string.ascii_lowercase) + name[i + 1:])
+
+    print("\nMean lookup time:")
+    print(f"  Prefix queries:        {time_queries(index, prefixes):8.1f} us")
+    print(f"  Typo queries (fuzzy):  {time_queries(index, typos):8.1f} us")
+
+    print("\nExamples:")
+    for query in ["doug", "sword", "thuja plic", "psuedotsuga", "bigleaf mapel"]:
+        top = index.suggest(query, limit=3)
+        print(f"  {query!r:16s} -> {[entry.scientific_name for entry in top]}")
+
+    assert index.suggest("psuedotsuga")[0].taxon_id == 48256
+    assert index.resolve("western sword fern") == 54779
+    print("\n✓ Benchmark complete")
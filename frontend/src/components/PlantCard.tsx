@@ -3,6 +3,9 @@ import type { PlantObservation } from '../types/api';
 import { getClimateColor, getClimateLabel } from '../lib/constants';
 import { PlantDetailModal } from './PlantDetailModal';
 
+// Thumbnails are served resized and cached by the backend photo proxy
+const API_BASE = import.meta.env.VITE_API_URL ?? '';
+
 interface PlantCardProps {
   plant: PlantObservation;
 }
@@ -23,8 +26,9 @@ export function PlantCard({ plant }: PlantCardProps) {
         <div className="relative h-48 bg-gray-200">
           {plant.photo_url ? (
             <img
-              src={plant.photo_url}
+              src={`${API_BASE}/api/photos/${plant.id}?width=500`}
               alt={displayName}
+              loading="lazy"
               className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-300"
             />
           ) : (
@@ -155,6 +155,211 @@ def test_stats():
         print(f"Error: {response.text}")
         return False
 
+def test_plants_stream():
+    """Test NDJSON streaming plants query against /api/plants"""
+    print("\n" + "=" * 60)
+    print("Testing Plants Stream (Washington + Oregon, 10 results)")
+    print("=" * 60)
+    
+    params = {"region": ["washington", "oregon"], "per_page": 10}
+    lines = []
+    with httpx.stream("GET", f"{BASE_URL}/api/plants/stream", params=params, timeout=30.0) as response:
+        print(f"Status: {response.status_code}")
+        print(f"Content-Type: {response.headers.get('content-type')}")
+        if response.status_code != 200:
+            response.read()
+            print(f"Error: {response.text}")
+            return False
+        for line in response.iter_lines():
+            if line:
+                lines.append(json.loads(line))
+    
+    print(f"Streamed: {len(lines)} observations")
+    ids = [obs["id"] for obs in lines]
+    if ids != sorted(ids, reverse=True) or len(set(ids)) != len(ids):
+        print("Error: stream is not newest first without duplicates")
+        return False
+    
+    # The stream shares the /api/plants cache, so both return the same list
+    plants = httpx.get(f"{BASE_URL}/api/plants", params=params, timeout=30.0).json()
+    same = [obs["id"] for obs in plants] == ids
+    print(f"Matches /api/plants: {same}")
+    return same
+
+def test_compression():
+    """Test negotiated gzip compression of JSON responses"""
+    print("\n" + "=" * 60)
+    print("Testing Response Compression (gzip)")
+    print("=" * 60)
+    
+    response = httpx.get(
+        f"{BASE_URL}/api/plants",
+        params={"region": "washington", "per_page": 20},
+        headers={"Accept-Encoding": "gzip"},
+        timeout=30.0
+    )
+    
+    print(f"Status: {response.status_code}")
+    print(f"Content-Encoding: {response.headers.get('content-encoding')}")
+    print(f"Vary: {response.headers.get('vary')}")
+    return response.status_code == 200 and response.headers.get("content-encoding") == "gzip"
+
+def test_species():
+    """Test species aggregation endpoint"""
+    print("\n" + "=" * 60)
+    print("Testing Species Endpoint (Oregon, 5 per page)")
+    print("=" * 60)
+    
+    response = httpx.get(
+        f"{BASE_URL}/api/species",
+        params={"region": "oregon", "per_page": 5},
+        timeout=30.0
+    )
+    
+    print(f"Status: {response.status_code}")
+    
+    if response.status_code == 200:
+        page = response.json()
+        print(f"Source: {page['source']}, total species: {page['total_results']}")
+        for species in page["results"]:
+            print(f"  • {species['common_name'] or species['scientific_name']}: "
+                  f"{species['observation_count']} observations")
+        if len(page["results"]) > 5:
+            return False
+        
+        for params in ({"region": "texas"}, {"climate_type": "arctic"}):
+            status = httpx.get(f"{BASE_URL}/api/species", params=params, timeout=30.0).status_code
+            print(f"  {params}: {status}")
+            if status != 422:
+                return False
+        return True
+    else:
+        print(f"Error: {response.text}")
+        return False
+
+def test_phenology():
+    """Test phenology histogram and its parameter validation"""
+    print("\n" + "=" * 60)
+    print("Testing Phenology Endpoint")
+    print("=" * 60)
+    
+    response = httpx.get(f"{BASE_URL}/api/phenology", params={"bins": "week"}, timeout=30.0)
+    print(f"Status: {response.status_code}")
+    if response.status_code != 200:
+        print(f"Error: {response.text}")
+        return False
+    histogram = response.json()
+    print(f"Bins: {len(histogram['counts'])}, total: {histogram['total']}")
+    if len(histogram["counts"]) != 53 or sum(histogram["counts"]) != histogram["total"]:
+        return False
+    
+    for params in ({"region": "texas"}, {"bins": "day"}, {"taxon_id": 0}):
+        status = httpx.get(f"{BASE_URL}/api/phenology", params=params, timeout=30.0).status_code
+        print(f"  {params}: {status}")
+        if status != 422:
+            return False
+    return True
+
+def test_taxa_suggest():
+    """Test taxon name autocomplete"""
+    print("\n" + "=" * 60)
+    print("Testing Taxon Suggest ('doug')")
+    print("=" * 60)
+    
+    response = httpx.get(f"{BASE_URL}/api/taxa/suggest", params={"q": "doug", "limit": 5}, timeout=30.0)
+    print(f"Status: {response.status_code}")
+    
+    if response.status_code == 200:
+        for taxon in response.json():
+            print(f"  • {taxon['scientific_name']} ({taxon['common_name']})")
+        return True
+    else:
+        print(f"Error: {response.text}")
+        return False
+
+def test_nearby():
+    """Test nearest species search (Seattle)"""
+    print("\n" + "=" * 60)
+    print("Testing Nearby Species (Seattle, k=5)")
+    print("=" * 60)
+    
+    response = httpx.get(
+        f"{BASE_URL}/api/nearby",
+        params={"lat": 47.6062, "lon": -122.3321, "k": 5},
+        timeout=30.0
+    )
+    print(f"Status: {response.status_code}")
+    
+    if response.status_code == 200:
+        result = response.json()
+        print(f"Climate zone: {result['climate_zone']}")
+        for species in result["results"]:
+            print(f"  • {species['scientific_name']}: {species['distance_km']:.1f} km")
+        return all(species["taxon_id"] != 0 for species in result["results"])
+    else:
+        print(f"Error: {response.text}")
+        return False
+
+def test_export_geojson():
+    """Test GeoJSON export of the local store"""
+    print("\n" + "=" * 60)
+    print("Testing GeoJSON Export (local store)")
+    print("=" * 60)
+    
+    response = httpx.get(f"{BASE_URL}/api/export/observations.geojson", timeout=60.0)
+    print(f"Status: {response.status_code}")
+    
+    if response.status_code == 200:
+        collection = response.json()
+        print(f"Features: {len(collection['features'])}")
+        print(f"Content-Encoding: {response.headers.get('content-encoding')}")
+        if collection["type"] != "FeatureCollection":
+            return False
+        
+        # q=0 refuses a coding, so the export must come back uncompressed
+        refused = httpx.get(
+            f"{BASE_URL}/api/export/observations.geojson",
+            headers={"Accept-Encoding": "gzip;q=0"},
+            timeout=60.0
+        )
+        print(f"gzip;q=0 Content-Encoding: {refused.headers.get('content-encoding')}")
+        return "content-encoding" not in refused.headers
+    else:
+        print(f"Error: {response.text}")
+        return False
+
+def test_photo_proxy():
+    """Test resized photo of the first observation returned by /api/plants"""
+    print("\n" + "=" * 60)
+    print("Testing Photo Proxy")
+    print("=" * 60)
+    
+    plants = httpx.get(f"{BASE_URL}/api/plants", params={"per_page": 5}, timeout=30.0).json()
+    with_photo = [plant for plant in plants if plant["photo_url"]]
+    if not with_photo:
+        print("No observation with a photo to test")
+        return False
+    
+    response = httpx.get(
+        f"{BASE_URL}/api/photos/{with_photo[0]['id']}",
+        params={"width": 300},
+        headers={"Accept": "image/webp"},
+        timeout=30.0
+    )
+    print(f"Status: {response.status_code}")
+    print(f"Content-Type: {response.headers.get('content-type')}, {len(response.content)} bytes")
+    if response.status_code != 200:
+        return False
+    
+    cached = httpx.get(
+        f"{BASE_URL}/api/photos/{with_photo[0]['id']}",
+        params={"width": 300},
+        headers={"Accept": "image/webp", "If-None-Match": response.headers["etag"]},
+        timeout=30.0
+    )
+    print(f"Revalidation status: {cached.status_code}")
+    return cached.status_code == 304
+
 if __name__ == "__main__":
     print("\n" + "=" * 60)
     print("FastAPI Backend Test Suite")
@@ -169,7 +374,15 @@ if __name__ == "__main__":
         ("Plants Basic", test_plants_basic),
         ("Plants Search", test_plants_with_search),
         ("Climate Filter", test_plants_climate_filter),
-        ("Statistics", test_stats)
+        ("Statistics", test_stats),
+        ("Plants Stream", test_plants_stream),
+        ("Compression", test_compression),
+        ("Species", test_species),
+        ("Phenology", test_phenology),
+        ("Taxa Suggest", test_taxa_suggest),
+        ("Nearby", test_nearby),
+        ("GeoJSON Export", test_export_geojson),
+        ("Photo Proxy", test_photo_proxy)
     ]
     
     results = []
@@ -0,0 +1,210 @@
+"""
+Test script for the response cache backends behind every cached endpoint
+Covers TTL expiry, size-bounded LRU eviction, sharing one SQLite file
+between workers, write-free reads and lock contention. Runs offline; no
+server or iNaturalist access needed.
+
+Run from the repository root: python test_cache.py
+"""
+
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+
+import api.cache as cache_module
+from api.cache import MemoryLRUCache, SQLiteCache, cache_key
+
+
+def temp_db():
+    handle, path = tempfile.mkstemp(suffix=".sqlite3")
+    os.close(handle)
+    os.remove(path)
+    return path
+
+
+def entry_count(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+def test_cache_key():
+    """cache_key is stable across parameter order and distinguishes values"""
+    print("=" * 60)
+    print("Testing cache_key")
+    print("=" * 60)
+
+    assert cache_key("plants", region="oregon", per_page=50) == cache_key("plants", per_page=50, region="oregon")
+    assert cache_key("plants", region="oregon") != cache_key("plants", region="idaho")
+    assert cache_key("plants", region="oregon") != cache_key("species", region="oregon")
+    print("✓ Keys ignore parameter order and include prefix and values")
+    return True
+
+
+def test_memory_cache():
+    """MemoryLRUCache expires entries and keeps the most recently used ones"""
+    print("\n" + "=" * 60)
+    print("Testing MemoryLRUCache")
+    print("=" * 60)
+
+    cache = MemoryLRUCache(max_entries=2)
+    cache.set("a", {"n": 1})
+    cache.set("b", {"n": 2})
+    assert cache.get("a") == {"n": 1}  # "a" is now the most recent
+    cache.set("c", {"n": 3})
+    assert cache.get("b") is None and cache.get("a") == {"n": 1} and cache.get("c") == {"n": 3}
+    print("✓ Least recently used entry evicted at max_entries")
+
+    cache.set("short", [1], ttl=0.05)
+    assert cache.get("short") == [1]
+    time.sleep(0.1)
+    assert cache.get("short") is None
+    print("✓ Entries expire after their TTL")
+    return True
+
+
+def test_sqlite_expiry_and_sharing():
+    """SQLiteCache entries expire and are visible to every worker using the file"""
+    print("\n" + "=" * 60)
+    print("Testing SQLiteCache expiry and sharing")
+    print("=" * 60)
+
+    path = temp_db()
+    worker_a = SQLiteCache(path=path)
+    worker_b = SQLiteCache(path=path)
+
+    worker_a.set("plants:1", [{"id": 1, "name": "Acer macrophyllum"}])
+    assert worker_b.get("plants:1") == [{"id": 1, "name": "Acer macrophyllum"}]
+    print("✓ A write by one worker is a hit for another")
+
+    worker_a.set("short", {"ok": True}, ttl=0.05)
+    time.sleep(0.1)
+    assert worker_b.get("short") is None
+    assert entry_count(path) == 2, "reads must not delete expired rows"
+    worker_b.set("other", 1)
+    assert entry_count(path) == 2 and worker_a.get("short") is None
+    print("✓ Expired entries are misses and are removed by the next write")
+
+    worker_a.delete("plants:1")
+    assert worker_b.get("plants:1") is None
+    worker_b.clear()
+    assert entry_count(path) == 0
+    print("✓ delete and clear")
+    return True
+
+
+def test_sqlite_eviction():
+    """SQLiteCache evicts least recently used entries down to max_bytes"""
+    print("\n" + "=" * 60)
+    print("Testing SQLiteCache eviction")
+    print("=" * 60)
+
+    path = temp_db()
+    value = "x" * 1000  # ~1 KB once JSON encoded
+    cache = SQLiteCache(path=path, max_bytes=3500)
+    for i in range(3):
+        cache.set(f"k{i}", value)
+
+    # Make k0 the most recently used by refreshing its access time
+    original = cache_module.ACCESS_UPDATE_INTERVAL
+    cache_module.ACCESS_UPDATE_INTERVAL = -1
+    try:
+        assert cache.get("k0") == value
+    finally:
+        cache_module.ACCESS_UPDATE_INTERVAL = original
+
+    cache.set("k3", value)
+    with sqlite3.connect(path) as conn:
+        keys = {row[0] for row in conn.execute("SELECT key FROM entries")}
+        total = conn.execute("SELECT SUM(size) FROM entries").fetchone()[0]
+    assert keys == {"k0", "k2", "k3"}, keys
+    assert total <= 3500
+    print(f"✓ Oldest entry evicted, {total} bytes stored (max 3500)")
+
+    cache.set("huge", "y" * 5000)
+    assert cache.get("huge") is None and cache.get("k3") == value
+    print("✓ Values larger than max_bytes are not stored and evict nothing")
+    return True
+
+
+def test_sqlite_contention():
+    """Reads do not take the write lock; a locked database is a miss or a skipped write"""
+    print("\n" + "=" * 60)
+    print("Testing SQLiteCache under another worker's write lock")
+    print("=" * 60)
+
+    path = temp_db()
+    cache = SQLiteCache(path=path)
+    cache.set("key", {"v": 1})
+
+    holder = sqlite3.connect(path, isolation_level=None)
+    holder.execute("BEGIN IMMEDIATE")
+    try:
+        start = time.perf_counter()
+        assert cache.get("key") == {"v": 1}
+        read_ms = (time.perf_counter() - start) * 1000
+        print(f"✓ Read served while the write lock is held ({read_ms:.1f} ms)")
+
+        start = time.perf_counter()
+        cache.set("new", {"v": 2})  # must not raise
+        waited = time.perf_counter() - start
+        assert waited < cache_module.WRITE_TIMEOUT + 0.5
+        print(f"✓ Contended write skipped after {waited * 1000:.0f} ms")
+    finally:
+        holder.execute("ROLLBACK")
+        holder.close()
+    assert cache.get("new") is None
+    return True
+
+
+def test_async_wrappers():
+    """aget/aset round-trip on both backends"""
+    print("\n" + "=" * 60)
+    print("Testing aget/aset")
+    print("=" * 60)
+
+    async def roundtrip(cache):
+        await cache.aset("key", {"v": [1, 2]}, ttl=60)
+        return await cache.aget("key")
+
+    for cache in (MemoryLRUCache(), SQLiteCache(path=temp_db())):
+        assert asyncio.run(roundtrip(cache)) == {"v": [1, 2]}
+        print(f"✓ {type(cache).__name__}")
+    return True
+
+
+if __name__ == "__main__":
+    print("\n" + "=" * 60)
+    print("Cache Test Suite")
+    print("=" * 60)
+
+    tests = [
+        ("cache_key", test_cache_key),
+        ("Memory LRU", test_memory_cache),
+        ("SQLite Expiry/Sharing", test_sqlite_expiry_and_sharing),
+        ("SQLite Eviction", test_sqlite_eviction),
+        ("SQLite Contention", test_sqlite_contention),
+        ("Async Wrappers", test_async_wrappers),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"\n✗ Test '{name}' failed with exception: {e!r}")
+            results.append((name, False))
+
+    print("\n" + "=" * 60)
+    print("Test Summary")
+    print("=" * 60)
+
+    for name, passed in results:
+        status = "✓ PASSED" if passed else "✗ FAILED"
+        print(f"{name:22s}: {status}")
+
+    total_passed = sum(1 for _, passed in results if passed)
+    print(f"\nTotal: {total_passed}/{len(results)} passed")
+    print("=" * 60)
@@ -0,0 +1,210 @@
+"""
+Test script for the shared iNaturalist rate limiter
+Covers Retry-After parsing, token accounting shared between processes
+through SQLite, priority lane reserves, bounded waits and 429 blocking.
+Runs offline; no server or iNaturalist access needed.
+
+Run from the repository root: python test_ratelimit.py
+"""
+
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from api.ratelimit import LANE_RESERVE, Priority, RateLimitExceeded, TokenBucketLimiter, parse_retry_after
+
+
+def temp_db():
+    handle, path = tempfile.mkstemp(suffix=".sqlite3")
+    os.close(handle)
+    os.remove(path)
+    return path
+
+
+def take_tokens(path, count, results):
+    """Worker process: take ``count`` tokens without waiting, report how many were granted"""
+    limiter = TokenBucketLimiter("test", rate_per_minute=6, burst=10, path=path)
+    results.put(sum(1 for _ in range(count) if limiter._update(1.0, 0.0) == 0))
+
+
+def test_parse_retry_after():
+    """parse_retry_after accepts delay-seconds and HTTP-dates"""
+    print("=" * 60)
+    print("Testing parse_retry_after")
+    print("=" * 60)
+
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after(" 1.5 ") == 1.5
+    assert parse_retry_after("-5") == 0.0
+    print("✓ Delay-seconds")
+
+    future = datetime.now(timezone.utc) + timedelta(seconds=30)
+    delay = parse_retry_after(format_datetime(future, usegmt=True))
+    assert 28 <= delay <= 30, delay
+    past = datetime.now(timezone.utc) - timedelta(minutes=5)
+    assert parse_retry_after(format_datetime(past, usegmt=True)) == 0.0
+    print(f"✓ HTTP-date ({delay:.1f}s ahead; past dates give 0)")
+
+    for value in (None, "", "soon", "Thu, 99 Foo 2024"):
+        assert parse_retry_after(value) is None, value
+    print("✓ Missing or malformed values give None")
+    return True
+
+
+def test_shared_bucket():
+    """Workers on one SQLite file never hand out more than the burst together"""
+    print("\n" + "=" * 60)
+    print("Testing token accounting across processes")
+    print("=" * 60)
+
+    path = temp_db()
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=take_tokens, args=(path, 10, results)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    granted = [results.get(timeout=30) for _ in workers]
+    # Refill is 0.1 token/s, so only the burst of 10 can be handed out
+    assert sum(granted) == 10, granted
+    print(f"✓ 4 processes x 10 attempts got {granted} tokens (burst 10)")
+    return True
+
+
+def test_lane_reserves():
+    """Lower lanes leave their reserve of the bucket to higher lanes"""
+    print("\n" + "=" * 60)
+    print("Testing priority lane reserves")
+    print("=" * 60)
+
+    async def drain(limiter, priority):
+        taken = 0
+        while True:
+            try:
+                await limiter.acquire(priority, max_wait=0)
+            except RateLimitExceeded:
+                return taken
+            taken += 1
+
+    async def run():
+        limiter = TokenBucketLimiter("lanes", rate_per_minute=6, burst=8, path=temp_db())
+        prefetch = await drain(limiter, Priority.PREFETCH)
+        background = await drain(limiter, Priority.BACKGROUND)
+        interactive = await drain(limiter, Priority.INTERACTIVE)
+        return prefetch, background, interactive
+
+    prefetch, background, interactive = asyncio.run(run())
+    assert prefetch == 8 * (1 - LANE_RESERVE[Priority.PREFETCH])
+    assert background == 8 * (LANE_RESERVE[Priority.PREFETCH] - LANE_RESERVE[Priority.BACKGROUND])
+    assert interactive == 8 * LANE_RESERVE[Priority.BACKGROUND]
+    print(f"✓ Of 8 tokens: prefetch took {prefetch}, background {background}, interactive {interactive}")
+
+    async def starved():
+        limiter = TokenBucketLimiter("queue", rate_per_minute=600, burst=1, path=temp_db())
+        await limiter.acquire(Priority.INTERACTIVE)
+        waiter = asyncio.create_task(limiter.acquire(Priority.INTERACTIVE))
+        await asyncio.sleep(0)
+        try:
+            await limiter.acquire(Priority.PREFETCH, max_wait=0.05)
+        except RateLimitExceeded:
+            await waiter
+            return True
+        return False
+
+    assert asyncio.run(starved())
+    print("✓ A lower lane does not take tokens while a higher lane is waiting")
+    return True
+
+
+def test_max_wait():
+    """acquire waits for a refill, or raises RateLimitExceeded past max_wait"""
+    print("\n" + "=" * 60)
+    print("Testing acquire max_wait")
+    print("=" * 60)
+
+    async def run():
+        limiter = TokenBucketLimiter("wait", rate_per_minute=600, burst=1, path=temp_db())
+        await limiter.acquire()
+        start = time.perf_counter()
+        await limiter.acquire(max_wait=1.0)  # one token refills in 0.1 s
+        waited = time.perf_counter() - start
+        try:
+            await limiter.acquire(max_wait=0.01)
+        except RateLimitExceeded as e:
+            return waited, e.retry_after
+        return waited, None
+
+    waited, retry_after = asyncio.run(run())
+    assert 0.05 <= waited < 0.5, waited
+    assert retry_after is not None and 0 < retry_after <= 0.1
+    print(f"✓ Waited {waited * 1000:.0f} ms for a refill")
+    print(f"✓ RateLimitExceeded when the wait exceeds max_wait (retry after {retry_after:.2f}s)")
+    return True
+
+
+def test_penalize():
+    """penalize blocks every limiter sharing the file for Retry-After seconds"""
+    print("\n" + "=" * 60)
+    print("Testing penalize (429 Retry-After)")
+    print("=" * 60)
+
+    path = temp_db()
+
+    async def run():
+        worker_a = TokenBucketLimiter("blocked", rate_per_minute=600, burst=10, path=path)
+        worker_b = TokenBucketLimiter("blocked", rate_per_minute=600, burst=10, path=path)
+        await worker_a.penalize(0.3)
+        try:
+            await worker_b.acquire(max_wait=0.1)
+        except RateLimitExceeded as e:
+            blocked_for = e.retry_after
+        else:
+            return None, None
+        start = time.perf_counter()
+        await worker_b.acquire(max_wait=1.0)
+        return blocked_for, time.perf_counter() - start
+
+    blocked_for, waited = asyncio.run(run())
+    assert blocked_for is not None and 0.1 < blocked_for <= 0.3, blocked_for
+    assert waited < 1.0, waited
+    print(f"✓ Other worker blocked ({blocked_for:.2f}s left), then served after {waited * 1000:.0f} ms")
+    return True
+
+
+if __name__ == "__main__":
+    print("\n" + "=" * 60)
+    print("Rate Limiter Test Suite")
+    print("=" * 60)
+
+    tests = [
+        ("Retry-After Parsing", test_parse_retry_after),
+        ("Shared Bucket", test_shared_bucket),
+        ("Lane Reserves", test_lane_reserves),
+        ("Max Wait", test_max_wait),
+        ("Penalize", test_penalize),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"\n✗ Test '{name}' failed with exception: {e!r}")
+            results.append((name, False))
+
+    print("\n" + "=" * 60)
+    print("Test Summary")
+    print("=" * 60)
+
+    for name, passed in results:
+        status = "✓ PASSED" if passed else "✗ FAILED"
+        print(f"{name:20s}: {status}")
+
+    total_passed = sum(1 for _, passed in results if passed)
+    print(f"\nTotal: {total_passed}/{len(results)} passed")
+    print("=" * 60)
@@ -0,0 +1,311 @@
+"""
+Test script for the streaming building blocks behind /api/plants/stream
+Covers incremental JSON scanning, the newest-first region merge (including
+write-through to the local store when the merge stops early) and response
+compression. Runs offline; no server or iNaturalist access needed.
+
+Run from the repository root: python test_streaming.py
+"""
+
+import asyncio
+import gzip
+import json
+import zlib
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+import api.main as main
+from api.compression import CompressionMiddleware, brotli
+from api.jsonstream import ArrayItemScanner, IncompleteJSON
+
+PAGE = {
+    "total_results": 3,
+    "page": 1,
+    "extra": {"results": ["not", "these"], "text": "brackets ] and } in a string"},
+    "results": [
+        {"id": 3, "taxon": {"name": "Acer macrophyllum"}, "tags": ["a", "]"]},
+        {"id": 2, "taxon": None, "value": 1.25e3},
+        {"id": 1, "description": 'quote " and backslash \\'},
+    ],
+    "per_page": 3,
+}
+
+
+def observation(obs_id):
+    return {
+        "id": obs_id,
+        "location": "47.6,-122.3",
+        "observed_on": "2024-05-01",
+        "quality_grade": "research",
+        "taxon": {"id": 1000 + obs_id, "name": f"Taxon {obs_id}", "rank": "species"},
+    }
+
+
+async def collect(iterator):
+    return [item async for item in iterator]
+
+
+def test_array_item_scanner():
+    """ArrayItemScanner yields the same items as json.loads for any chunking"""
+    print("=" * 60)
+    print("Testing ArrayItemScanner")
+    print("=" * 60)
+
+    text = json.dumps(PAGE)
+    expected = PAGE["results"]
+    for size in (1, 2, 3, 7, 64, len(text)):
+        scanner = ArrayItemScanner("results")
+        items = []
+        for start in range(0, len(text), size):
+            items.extend(scanner.feed(text[start:start + size]))
+        items.extend(scanner.close())
+        assert items == expected, f"chunk size {size}"
+    print(f"✓ {len(expected)} items for chunk sizes 1..{len(text)}")
+
+    # Items are returned as soon as they are complete, not at the end
+    scanner = ArrayItemScanner("results")
+    first_end = text.index('"id": 2') - 1
+    assert scanner.feed(text[:first_end]) == expected[:1]
+    print("✓ First item returned before the rest of the body arrived")
+
+    # A number at a chunk boundary is not decoded until it is complete
+    scanner = ArrayItemScanner("results")
+    assert scanner.feed('{"results": [12') == []
+    assert scanner.feed('34, 5') == [1234]
+    assert scanner.feed(']}') == [5]
+    assert scanner.close() == []
+    print("✓ Numbers split across chunks")
+
+    scanner = ArrayItemScanner("results")
+    scanner.feed(text[:len(text) // 2])
+    try:
+        scanner.close()
+    except IncompleteJSON:
+        print("✓ Truncated body raises IncompleteJSON")
+    else:
+        raise AssertionError("truncated body was accepted")
+
+    scanner = ArrayItemScanner("results")
+    assert scanner.feed('{"total_results": 0}') == [] and scanner.close() == []
+    print("✓ Missing array member yields nothing")
+    return True
+
+
+def test_merge_newest_first():
+    """merge_newest_first interleaves by descending id, dedupes and stops at the limit"""
+    print("\n" + "=" * 60)
+    print("Testing merge_newest_first")
+    print("=" * 60)
+
+    finished = []
+
+    async def region(name, ids, delay=0.0):
+        try:
+            for obs_id in ids:
+                await asyncio.sleep(delay)
+                yield {"id": obs_id, "region": name}
+        finally:
+            finished.append(name)
+
+    async def run(limit):
+        finished.clear()
+        streams = [region("a", [9, 6, 3]), region("b", [8, 6, 2], delay=0.01), region("c", [], delay=0.02)]
+        return [obs["id"] for obs in await collect(main.merge_newest_first(streams, limit))]
+
+    assert asyncio.run(run(10)) == [9, 8, 6, 3, 2]
+    print("✓ Merged newest first without duplicates")
+
+    async def run_limited():
+        ids = await run(2)
+        await asyncio.sleep(0)  # let the cancelled pumps finalize
+        return ids
+
+    assert asyncio.run(run_limited()) == [9, 8]
+    assert sorted(finished) == ["a", "b", "c"]
+    print("✓ Limit stops the merge and closes every region stream")
+
+    async def failing():
+        yield {"id": 5}
+        raise RuntimeError("upstream failed")
+
+    async def run_failing():
+        return await collect(main.merge_newest_first([region("a", [9, 1]), failing()], 10))
+
+    try:
+        asyncio.run(run_failing())
+    except RuntimeError as e:
+        print(f"✓ Region errors propagate: {e}")
+    else:
+        raise AssertionError("error was swallowed")
+    return True
+
+
+def test_stream_write_through():
+    """Observations parsed before the merge stops still reach the local store"""
+    print("\n" + "=" * 60)
+    print("Testing stream write-through to the observation store")
+    print("=" * 60)
+
+    bodies = {
+        main.PLACE_IDS["washington"]: json.dumps({"results": [observation(i) for i in (990_006, 990_004, 990_002)]}),
+        main.PLACE_IDS["oregon"]: json.dumps({"results": [observation(i) for i in (990_005, 990_003, 990_001)]}),
+    }
+
+    class FakeResponse:
+        def __init__(self, body):
+            self.body = body
+
+        def raise_for_status(self):
+            pass
+
+        async def aiter_text(self):
+            # One observation per chunk, like a slow download
+            for start in range(0, len(self.body), 150):
+                await asyncio.sleep(0)
+                yield self.body[start:start + 150]
+
+    @asynccontextmanager
+    async def fake_stream(path, params=None, priority=None):
+        yield FakeResponse(bodies[params["place_id"]])
+
+    async def run():
+        streams = [main.stream_region_observations(name, {}) for name in ("washington", "oregon")]
+        merged = await collect(main.merge_newest_first(streams, limit=2))
+        await asyncio.sleep(0)
+        return [obs["id"] for obs in merged]
+
+    original = main.inaturalist_stream
+    main.inaturalist_stream = fake_stream
+    try:
+        ids = asyncio.run(run())
+    finally:
+        main.inaturalist_stream = original
+
+    stored = set(main.observation_store.column("id").tolist())
+    assert ids == [990_006, 990_005]
+    assert {990_006, 990_005} <= stored, stored
+    print(f"✓ Streamed {ids}; stored {sorted(stored & set(range(990_001, 990_007)))}")
+    return True
+
+
+def test_compression_middleware():
+    """CompressionMiddleware negotiates, skips small/binary/encoded bodies and flushes streams"""
+    print("\n" + "=" * 60)
+    print("Testing CompressionMiddleware")
+    print("=" * 60)
+
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+    big = [{"id": i, "name": "Polystichum munitum"} for i in range(50)]
+
+    @app.get("/big")
+    async def big_json():
+        return JSONResponse(big)
+
+    @app.get("/small")
+    async def small_json():
+        return JSONResponse({"ok": True})
+
+    @app.get("/image")
+    async def image():
+        return Response(b"\x89PNG" + b"\x00" * 500, media_type="image/png")
+
+    @app.get("/encoded")
+    async def encoded():
+        return Response(gzip.compress(b"{}" * 500), media_type="application/json",
+                        headers={"Content-Encoding": "gzip"})
+
+    @app.get("/stream")
+    async def stream():
+        async def lines():
+            for item in big:
+                yield json.dumps(item) + "\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    with TestClient(app) as client:
+        response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert response.json() == big
+        print("✓ Large JSON is gzip-compressed and decodes to the same body")
+
+        response = client.get("/big", headers={"Accept-Encoding": "gzip;q=0.5, br"})
+        expected = "br" if brotli is not None else "gzip"
+        assert response.headers["content-encoding"] == expected
+        print(f"✓ Accept-Encoding preference honoured ({expected})")
+
+        response = client.get("/big", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers and response.json() == big
+        response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+        response = client.get("/image", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers and len(response.content) == 504
+        response = client.get("/encoded", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip" and response.content == b"{}" * 500
+        print("✓ Identity, small, binary and pre-encoded responses pass through")
+
+    # Each streamed chunk must be decodable on its own arrival (sync flush)
+    messages = []
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        await asyncio.Event().wait()  # the client never disconnects
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "method": "GET", "path": "/stream", "raw_path": b"/stream", "root_path": "",
+        "query_string": b"", "headers": [(b"accept-encoding", b"gzip")], "scheme": "http",
+        "server": ("test", 80), "client": ("test", 1), "http_version": "1.1",
+    }
+    asyncio.run(CompressionMiddleware(app, minimum_size=100)(scope, receive, send))
+    decoder = zlib.decompressobj(31)
+    lines = 0
+    for message in messages:
+        if message["type"] == "http.response.body" and message.get("body"):
+            text = decoder.decompress(message["body"]).decode()
+            lines += text.count("\n")
+            assert not text or text.endswith("\n"), "chunk was not flushed"
+    assert lines == len(big)
+    print(f"✓ NDJSON stream flushed line by line ({lines} lines)")
+    return True
+
+
+if __name__ == "__main__":
+    print("\n" + "=" * 60)
+    print("Streaming Test Suite")
+    print("=" * 60)
+
+    tests = [
+        ("ArrayItemScanner", test_array_item_scanner),
+        ("Merge Newest First", test_merge_newest_first),
+        ("Stream Write-through", test_stream_write_through),
+        ("Compression", test_compression_middleware),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((name, result))
+        except Exception as e:
+            print(f"\n✗ Test '{name}' failed with exception: {e!r}")
+            results.append((name, False))
+
+    print("\n" + "=" * 60)
+    print("Test Summary")
+    print("=" * 60)
+
+    for name, passed in results:
+        status = "✓ PASSED" if passed else "✗ FAILED"
+        print(f"{name:20s}: {status}")
+
+    total_passed = sum(1 for _, passed in results if passed)
+    print(f"\nTotal: {total_passed}/{len(results)} passed")
+    print("=" * 60)